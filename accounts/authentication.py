@@ -0,0 +1,49 @@
+from rest_framework.exceptions import AuthenticationFailed
+
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.models import TokenUser
+
+from .cache import get_cached_user, get_token_state
+
+from .tokens import TOKEN_VERSION_CLAIM
+
+
+class ClaimsUser(TokenUser):
+
+    """
+    The user of a JWT request, built from the token claims: permission
+    checks read `is_staff` / `is_superuser` without loading the user row.
+    Code that needs the `User` instance calls get_user(), which is cached for
+    AUTH_USER_CACHE_TIMEOUT seconds.
+    """
+
+    def get_user(self):
+        return get_cached_user(self.id)
+
+
+class ClaimsJWTAuthentication(JWTStatelessUserAuthentication):
+
+    """
+    JWT authentication without a user query per request. Tokens are checked
+    against the user's token version and active flag, read through a short
+    lived cache, so a revocation or deactivation takes effect within
+    AUTH_TOKEN_STATE_CACHE_TIMEOUT seconds in other processes (immediately
+    in the process that made it, or everywhere with a shared cache).
+    """
+
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+        state = get_token_state(user.id)
+
+        if state is None:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+
+        token_version, is_active = state
+
+        if not is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+
+        if validated_token.get(TOKEN_VERSION_CLAIM) != token_version:
+            raise AuthenticationFailed('Token has been revoked', code='token_revoked')
+
+        return user
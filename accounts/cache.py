@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import User
+
+
+def get_token_state_key(user_id):
+    return f'accounts:token-state:{user_id}'
+
+def get_user_key(user_id):
+    return f'accounts:user:{user_id}'
+
+def get_token_state(user_id):
+    """
+    Returns the user's (token_version, is_active), or None when the user no
+    longer exists. Cached for AUTH_TOKEN_STATE_CACHE_TIMEOUT seconds.
+    """
+    key = get_token_state_key(user_id)
+    state = cache.get(key)
+
+    if state is None:
+        state = User.objects.filter(pk=user_id).values_list('token_version', 'is_active').first()
+        # Missing users are cached too, as an empty tuple
+        cache.set(key, state or (), timeout=settings.AUTH_TOKEN_STATE_CACHE_TIMEOUT)
+
+    return state or None
+
+def get_cached_user(user_id):
+    key = get_user_key(user_id)
+    user = cache.get(key)
+
+    if user is None:
+        user = User.objects.get(pk=user_id)
+        cache.set(key, user, timeout=settings.AUTH_USER_CACHE_TIMEOUT)
+
+    return user
+
+def clear_user_cache(user_id):
+    cache.delete_many([get_token_state_key(user_id), get_user_key(user_id)])
@@ -0,0 +1,60 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.test import APIRequestFactory
+
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from accounts.authentication import ClaimsJWTAuthentication
+from accounts.models import User
+from accounts.tokens import ClaimsRefreshToken
+
+
+class Command(BaseCommand):
+
+    help = (
+        'Compares authenticating a JWT request with a user query '
+        '(simplejwt JWTAuthentication) against ClaimsJWTAuthentication'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', required=True, help='Email of the user the token is issued to')
+        parser.add_argument('--requests', type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(email=options['email'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['email']} does not exist")
+
+        access = ClaimsRefreshToken.for_user(user).access_token
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {access}')
+
+        for name, authentication in [
+            ('user query', JWTAuthentication()),
+            ('claims', ClaimsJWTAuthentication()),
+        ]:
+            self.stdout.write(self.measure(name, authentication, request, options['requests']))
+
+    def measure(self, name, authentication, request, requests):
+        # Warm up, which also fills the token state cache
+        authentication.authenticate(request)
+
+        with CaptureQueriesContext(connection) as queries:
+            authentication.authenticate(request)
+
+        started = time.perf_counter()
+
+        for _ in range(requests):
+            authentication.authenticate(request)
+
+        elapsed = time.perf_counter() - started
+
+        return (
+            f'{name:<12} {requests / elapsed:10,.0f} auth/s '
+            f'{elapsed / requests * 1_000_000:8.1f} us/request '
+            f'{len(queries)} queries/request'
+        )
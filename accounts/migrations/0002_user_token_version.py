@@ -0,0 +1,18 @@
+# Generated by Django 6.1.2 on 2026-10-18 18:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='token_version',
+            field=models.PositiveIntegerField(default=0, verbose_name='Incremented to revoke every token issued to the user'),
+        ),
+    ]
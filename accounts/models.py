@@ -5,6 +5,10 @@ from django.db import models
 class User(AbstractUser):
 
     email = models.EmailField(unique=True)
+    token_version = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Incremented to revoke every token issued to the user'
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
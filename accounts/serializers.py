@@ -1,9 +1,13 @@
 from rest_framework import serializers
 
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+
 from .models import User
 
 from .services import create_user
 
+from .tokens import ClaimsRefreshToken
+
 class UserCreateSerializer(serializers.ModelSerializer):
 
     password = serializers.CharField(write_only=True)
@@ -26,6 +30,14 @@ class UserListSerializer(serializers.ModelSerializer):
         model = User
         fields = ['email', 'username']
 
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+
+    token_class = ClaimsRefreshToken
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+
+    token_class = ClaimsRefreshToken
+
 
 
 
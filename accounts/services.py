@@ -1,4 +1,12 @@
+from django.db.models import F
+
+from .cache import clear_user_cache
+
 from .models import User
 
 def create_user(validated_data):
     return User.objects.create_user(**validated_data)
+
+def revoke_tokens(user: User):
+    User.objects.filter(pk=user.pk).update(token_version=F('token_version') + 1)
+    clear_user_cache(user.pk)
@@ -1,9 +1,25 @@
 from django.contrib.auth import get_user_model
 
+from django.core.cache import cache
+
+from django.db import connection
+
+from django.test.utils import CaptureQueriesContext
+
 from rest_framework import status
 
 from rest_framework.test import APITestCase
 
+from rest_framework_simplejwt.tokens import AccessToken
+
+from products.models import Product
+
+from .authentication import ClaimsUser
+
+from .cache import clear_user_cache
+
+from .tokens import TOKEN_VERSION_CLAIM
+
 User = get_user_model()
 
 class AccountsTest(APITestCase):
@@ -91,7 +107,7 @@ class AccountsTest(APITestCase):
         self.client.force_authenticate(self.admin_user)
 
         response = self.client.get('/accounts/users/')
-        self.assertNotIn('password', response.data[0])
+        self.assertNotIn('password', response.data['results'][0])
 
     def test_password_is_not_returned_in_response_when_create(self):
         
@@ -142,7 +158,7 @@ class AccountsTest(APITestCase):
         response = self.client.get('/accounts/users/')
 
         expected_data_keys = {'email', 'username'}
-        self.assertEqual(response.data[0].keys(), expected_data_keys)
+        self.assertEqual(response.data['results'][0].keys(), expected_data_keys)
 
 class AccountsJWTIntegrationTest(APITestCase):
 
@@ -188,3 +204,152 @@ class AccountsJWTIntegrationTest(APITestCase):
         self.assertTrue(
             User.objects.filter(email='testadmin@email.com')
         )
+
+
+class ClaimsJWTAuthenticationTest(APITestCase):
+
+    def setUp(self):
+
+        cache.clear()
+
+        self.admin_user = User.objects.create_user(
+            email='testadmin@email.com',
+            username='testadminuser',
+            password='testadminpassword',
+            is_staff=True,
+            is_superuser=True
+        )
+
+        self.user = User.objects.create_user(
+            email='testuser@email.com',
+            username='testuser',
+            password='testuserpassword',
+        )
+
+    def obtain_tokens(self, email, password):
+
+        response = self.client.post(
+            '/api/token/',
+            {'email': email, 'password': password},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return response.data
+
+    def get_with_token(self, url, access):
+
+        return self.client.get(url, HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def test_tokens_carry_user_claims(self):
+
+        tokens = self.obtain_tokens('testadmin@email.com', 'testadminpassword')
+        access = AccessToken(tokens['access'])
+
+        self.assertEqual(access['username'], 'testadminuser')
+        self.assertTrue(access['is_staff'])
+        self.assertTrue(access['is_superuser'])
+        self.assertEqual(access[TOKEN_VERSION_CLAIM], 0)
+
+    def test_authentication_does_not_query_the_user(self):
+
+        tokens = self.obtain_tokens('testadmin@email.com', 'testadminpassword')
+
+        # The first request caches the token version
+        self.get_with_token('/tables/', tokens['access'])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get_with_token('/tables/', tokens['access'])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse([query for query in queries if 'accounts_user' in query['sql']])
+
+    def test_permissions_use_claims(self):
+
+        tokens = self.obtain_tokens('testuser@email.com', 'testuserpassword')
+
+        response = self.get_with_token('/accounts/users/', tokens['access'])
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_writes_with_a_token_user_assign_the_user(self):
+
+        tokens = self.obtain_tokens('testadmin@email.com', 'testadminpassword')
+
+        response = self.client.post(
+            '/products/',
+            {'name': 'chuleta de cerdo', 'price': '10.000'},
+            format='json',
+            HTTP_AUTHORIZATION=f"Bearer {tokens['access']}"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Product.objects.get().created_by, self.admin_user)
+
+    def test_revoked_tokens_are_rejected(self):
+
+        tokens = self.obtain_tokens('testuser@email.com', 'testuserpassword')
+
+        self.assertEqual(self.get_with_token('/tables/', tokens['access']).status_code, status.HTTP_200_OK)
+
+        self.client.force_authenticate(self.admin_user)
+        response = self.client.post(f'/accounts/users/{self.user.pk}/revoke-tokens/')
+        self.client.force_authenticate(None)
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        # 403 rather than 401: SessionAuthentication comes first and sends no challenge
+        response = self.get_with_token('/tables/', tokens['access'])
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.data['detail'].code, 'token_revoked')
+
+        refresh_response = self.client.post(
+            '/api/token/refresh/',
+            {'refresh': tokens['refresh']},
+            format='json'
+        )
+
+        self.assertEqual(refresh_response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        new_tokens = self.obtain_tokens('testuser@email.com', 'testuserpassword')
+
+        self.assertEqual(self.get_with_token('/tables/', new_tokens['access']).status_code, status.HTTP_200_OK)
+
+    def test_deactivated_user_is_rejected_once_the_cache_is_cleared(self):
+
+        tokens = self.obtain_tokens('testuser@email.com', 'testuserpassword')
+
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        clear_user_cache(self.user.pk)
+
+        response = self.get_with_token('/tables/', tokens['access'])
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.data['detail'].code, 'user_inactive')
+
+    def test_refresh_reads_current_claims(self):
+
+        tokens = self.obtain_tokens('testuser@email.com', 'testuserpassword')
+
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+
+        response = self.client.post(
+            '/api/token/refresh/',
+            {'refresh': tokens['refresh']},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(AccessToken(response.data['access'])['is_staff'])
+
+    def test_claims_user_loads_the_full_user_through_the_cache(self):
+
+        tokens = self.obtain_tokens('testuser@email.com', 'testuserpassword')
+        claims_user = ClaimsUser(AccessToken(tokens['access']))
+
+        self.assertEqual(claims_user.get_user(), self.user)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(claims_user.get_user().email, 'testuser@email.com')
@@ -0,0 +1,39 @@
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import User
+
+TOKEN_VERSION_CLAIM = 'ver'
+
+
+def set_user_claims(token, user: User):
+    token['username'] = user.username
+    token['is_staff'] = user.is_staff
+    token['is_superuser'] = user.is_superuser
+    token[TOKEN_VERSION_CLAIM] = user.token_version
+
+
+class ClaimsRefreshToken(RefreshToken):
+
+    """
+    Refresh token carrying the claims ClaimsUser is built from. Refreshing
+    checks the token version against the user row and re-reads the claims,
+    so role changes reach new access tokens.
+    """
+
+    @classmethod
+    def for_user(cls, user: User):
+        token = super().for_user(user)
+        set_user_claims(token, user)
+        return token
+
+    def verify(self):
+        super().verify()
+
+        user = User.objects.filter(pk=self.get(api_settings.USER_ID_CLAIM)).first()
+
+        if user is None or self.get(TOKEN_VERSION_CLAIM) != user.token_version:
+            raise TokenError('Token has been revoked')
+
+        set_user_claims(self, user)
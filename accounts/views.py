@@ -1,15 +1,25 @@
+from rest_framework import status
+
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 
+from config.mixins import ReplicaListMixin
+from config.pagination import DateJoinedCursorPagination
+
 from .selectors import get_users
 
 from .serializers import UserCreateSerializer, UserListSerializer
 
+from .services import revoke_tokens
 
-class UserViewSet(ModelViewSet):
+
+class UserViewSet(ReplicaListMixin, ModelViewSet):
 
     serializer_class = UserListSerializer
     permission_classes = [IsAuthenticated, IsAdminUser]
+    pagination_class = DateJoinedCursorPagination
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -17,4 +27,9 @@ class UserViewSet(ModelViewSet):
         return super().get_serializer_class()
 
     def get_queryset(self):
-        return get_users()
\ No newline at end of file
+        return get_users()
+
+    @action(methods=['POST'], detail=True, url_path='revoke-tokens')
+    def revoke_tokens(self, request, pk=None):
+        revoke_tokens(self.get_object())
+        return Response(status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
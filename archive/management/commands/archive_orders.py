@@ -0,0 +1,75 @@
+import time
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from archive.services import archive_order_batch
+
+
+class Command(BaseCommand):
+
+    help = (
+        'Moves paid and cancelled orders created more than --older-than-days '
+        'ago, with their items, to the archive tables, one transaction per '
+        '--batch-size orders. Run it from cron, or keep it running as the '
+        'scheduled job with --interval.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=settings.ORDER_ARCHIVE_AFTER_DAYS)
+        parser.add_argument('--batch-size', type=int, default=settings.ORDER_ARCHIVE_BATCH_SIZE)
+        parser.add_argument('--max-batches', type=int, help='Stop after this many batches per run')
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0.0,
+            help='Seconds to sleep between batches, to leave room for other writers'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            help='Run again every this many seconds instead of exiting'
+        )
+
+    def handle(self, *args, **options):
+        if options['older_than_days'] < 0:
+            raise CommandError('--older-than-days cannot be negative')
+
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        while True:
+            self.archive(options)
+
+            if options['interval'] is None:
+                return
+
+            time.sleep(options['interval'])
+
+    def archive(self, options):
+        created_before = timezone.now() - timedelta(days=options['older_than_days'])
+        archived = 0
+        batches = 0
+
+        while options['max_batches'] is None or batches < options['max_batches']:
+            if batches and options['pause']:
+                time.sleep(options['pause'])
+
+            moved = archive_order_batch(created_before, options['batch_size'])
+
+            if not moved:
+                break
+
+            archived += moved
+            batches += 1
+            self.stdout.write(f'{archived} orders archived', ending='\r')
+
+        if batches:
+            self.stdout.write('')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {archived} orders created before {created_before:%Y-%m-%d %H:%M}'
+        ))
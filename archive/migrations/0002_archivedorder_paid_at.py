@@ -0,0 +1,40 @@
+# Generated by Django 6.1.2 on 2026-10-18 19:36
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_paid_at(apps, schema_editor):
+    # Best guess for orders paid before the column existed
+    apps.get_model('archive', 'ArchivedOrder').objects.filter(
+        status='PAID'
+    ).update(
+        paid_at=F('updated_at')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('archive', '0001_initial'),
+        ('tables', '0005_alter_table_modified_by'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='archivedorder',
+            name='archivedorder_updated_at_idx',
+        ),
+        migrations.AddField(
+            model_name='archivedorder',
+            name='paid_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_paid_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['paid_at'], name='archivedorder_paid_at_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+from django.db import models
+
+from accounts.models import User
+
+from orders.models import OrderStatus
+
+from products.models import Product
+
+from tables.models import Table
+
+
+class ArchivedOrder(models.Model):
+
+    """
+    A closed order moved out of the orders table by archive_orders, with its
+    id and values unchanged.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    table = models.ForeignKey(Table, related_name='archived_orders', on_delete=models.CASCADE)
+    status = models.CharField(max_length=20, choices=OrderStatus.choices)
+    created_by = models.ForeignKey(User, related_name='archived_orders', on_delete=models.CASCADE)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    paid_at = models.DateTimeField(null=True, blank=True)
+    item_count = models.PositiveIntegerField(default=0)
+    total = models.DecimalField(
+        max_digits=12,
+        decimal_places=3,
+        default=0
+    )
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='archivedorder_created_id_idx'),
+            # Payment time, for rebuilding the sales rollups
+            models.Index(fields=['paid_at'], name='archivedorder_paid_at_idx'),
+        ]
+
+
+class ArchivedOrderItem(models.Model):
+
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, related_name='order_items', on_delete=models.CASCADE)
+    product = models.ForeignKey(
+        Product,
+        related_name='archived_order_items',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True
+    )
+    product_name = models.CharField(max_length=100)
+    unit_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=3
+    )
+    quantity = models.PositiveIntegerField()
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
@@ -0,0 +1,50 @@
+from django.db.models import Prefetch
+
+from order_items.models import OrderItem
+
+from orders.models import Order, OrderStatus
+
+from .models import ArchivedOrder, ArchivedOrderItem
+
+ARCHIVED_STATUSES = [OrderStatus.PAID, OrderStatus.CANCELLED]
+
+
+def get_archivable_orders(created_before):
+    # Oldest first, along order_created_at_id_idx
+    return Order.objects.filter(
+        status__in=ARCHIVED_STATUSES,
+        created_at__lt=created_before,
+    ).order_by(
+        'created_at',
+        'id'
+    )
+
+def get_values_of_orders(order_ids):
+    return Order.objects.filter(pk__in=order_ids).values(
+        *[field.attname for field in Order._meta.concrete_fields]
+    )
+
+def get_values_of_items_of_orders(order_ids):
+    return OrderItem.objects.filter(order_id__in=order_ids).values(
+        *[field.attname for field in OrderItem._meta.concrete_fields]
+    )
+
+def get_archived_orders():
+    return ArchivedOrder.objects.select_related(
+        'table',
+        'created_by'
+    ).only(
+        'status',
+        'created_at',
+        'updated_at',
+        'archived_at',
+        'item_count',
+        'total',
+        'table__number',
+        'created_by__username',
+    )
+
+def get_archived_orders_with_items():
+    return get_archived_orders().prefetch_related(
+        Prefetch('order_items', queryset=ArchivedOrderItem.objects.order_by('id'))
+    )
@@ -0,0 +1,50 @@
+from rest_framework import serializers
+
+from .models import ArchivedOrder, ArchivedOrderItem
+
+class ArchivedOrderItemSerializer(serializers.ModelSerializer):
+
+    product = serializers.IntegerField(source='product_id', read_only=True)
+
+    class Meta:
+        model = ArchivedOrderItem
+        fields = [
+            'product',
+            'product_name',
+            'unit_price',
+            'quantity',
+            'created_at',
+            'updated_at',
+        ]
+
+class ArchivedOrderSerializer(serializers.ModelSerializer):
+
+    table = serializers.SerializerMethodField()
+    created_by = serializers.CharField(source='created_by.username', read_only=True)
+
+    class Meta:
+        model = ArchivedOrder
+        fields = [
+            'id',
+            'table',
+            'status',
+            'created_by',
+            'created_at',
+            'updated_at',
+            'archived_at',
+            'item_count',
+            'total',
+        ]
+
+    def get_table(self, obj):
+        return {
+            'id': obj.table.id,
+            'number': obj.table.number
+        }
+
+class ArchivedOrderDetailSerializer(ArchivedOrderSerializer):
+
+    items = ArchivedOrderItemSerializer(source='order_items', many=True, read_only=True)
+
+    class Meta(ArchivedOrderSerializer.Meta):
+        fields = ArchivedOrderSerializer.Meta.fields + ['items']
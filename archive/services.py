@@ -0,0 +1,37 @@
+from django.db import transaction
+
+from order_items.models import OrderItem
+
+from orders.models import Order
+
+from .models import ArchivedOrder, ArchivedOrderItem
+
+from .selectors import get_archivable_orders, get_values_of_items_of_orders, get_values_of_orders
+
+
+@transaction.atomic
+def archive_order_batch(created_before, batch_size):
+    """
+    Moves up to batch_size closed orders created before created_before,
+    with their items, to the archive tables. One short transaction per
+    batch, so the rows are never locked for long. Returns the number of
+    orders moved.
+    """
+    order_ids = list(
+        get_archivable_orders(created_before).select_for_update().values_list('pk', flat=True)[:batch_size]
+    )
+
+    if not order_ids:
+        return 0
+
+    ArchivedOrder.objects.bulk_create(
+        ArchivedOrder(**values) for values in get_values_of_orders(order_ids)
+    )
+    ArchivedOrderItem.objects.bulk_create(
+        ArchivedOrderItem(**values) for values in get_values_of_items_of_orders(order_ids)
+    )
+
+    OrderItem.objects.filter(order_id__in=order_ids).delete()
+    Order.objects.filter(pk__in=order_ids).delete()
+
+    return len(order_ids)
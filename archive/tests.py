@@ -0,0 +1,162 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from rest_framework import status
+
+from django.contrib.auth import get_user_model
+
+from django.core.management import call_command
+
+from django.urls import reverse
+
+from django.utils import timezone
+
+from rest_framework.test import APITestCase
+
+from order_items.models import OrderItem
+
+from order_items.services import create_order_item
+
+from orders.models import Order, OrderStatus
+
+from orders.services import pay_order
+
+from products.models import Product
+
+from reports.models import DailySales
+
+from tables.models import Table
+
+from .models import ArchivedOrder, ArchivedOrderItem
+
+from .services import archive_order_batch
+
+User = get_user_model()
+
+
+class OrderArchiveTest(APITestCase):
+
+    def setUp(self):
+
+        self.admin_user = User.objects.create_user(
+            email='testadmin@email.com',
+            username='testadminuser',
+            password='testadminpassword',
+            is_staff=True,
+            is_superuser=True
+        )
+
+        self.client.force_authenticate(self.admin_user)
+
+        self.table = Table.objects.create(number=1, capacity=4)
+        self.product = Product.objects.create(name='chuleta de cerdo', price=Decimal('10.000'))
+
+    def create_order(self, order_status, days_ago, quantity=2):
+
+        order = Order.objects.create(table=self.table, created_by=self.admin_user)
+        create_order_item(order, self.product, quantity)
+
+        if order_status == OrderStatus.PAID:
+            Order.objects.filter(pk=order.pk).update(status=OrderStatus.DELIVERED)
+            order.refresh_from_db()
+            pay_order(order)
+        else:
+            Order.objects.filter(pk=order.pk).update(status=order_status)
+
+        Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+
+        return Order.objects.get(pk=order.pk)
+
+    def archive(self, *args):
+        call_command('archive_orders', '--older-than-days', '30', *args, stdout=StringIO())
+
+    def test_old_closed_orders_move_to_the_archive_with_their_items(self):
+
+        paid = self.create_order(OrderStatus.PAID, days_ago=60)
+        cancelled = self.create_order(OrderStatus.CANCELLED, days_ago=45)
+        recent = self.create_order(OrderStatus.PAID, days_ago=1)
+        active = self.create_order(OrderStatus.DELIVERED, days_ago=60)
+
+        self.archive('--batch-size', '1')
+
+        self.assertEqual(set(Order.objects.values_list('pk', flat=True)), {recent.pk, active.pk})
+        self.assertEqual(set(OrderItem.objects.values_list('order_id', flat=True)), {recent.pk, active.pk})
+
+        archived = ArchivedOrder.objects.get(pk=paid.pk)
+
+        self.assertEqual(
+            (archived.status, archived.created_at, archived.updated_at, archived.paid_at, archived.total),
+            (paid.status, paid.created_at, paid.updated_at, paid.paid_at, paid.total)
+        )
+        self.assertEqual(ArchivedOrderItem.objects.get(order=archived).quantity, 2)
+        self.assertTrue(ArchivedOrder.objects.filter(pk=cancelled.pk).exists())
+
+    def test_batches_are_bounded_and_oldest_first(self):
+
+        orders = [self.create_order(OrderStatus.CANCELLED, days_ago=days) for days in [50, 70, 60]]
+
+        moved = archive_order_batch(timezone.now() - timedelta(days=30), batch_size=2)
+
+        self.assertEqual(moved, 2)
+        self.assertEqual(list(Order.objects.values_list('pk', flat=True)), [orders[0].pk])
+
+    def test_max_batches_limits_a_run(self):
+
+        for days in [50, 60, 70]:
+            self.create_order(OrderStatus.CANCELLED, days_ago=days)
+
+        self.archive('--batch-size', '1', '--max-batches', '2')
+
+        self.assertEqual(ArchivedOrder.objects.count(), 2)
+
+    def test_archive_endpoint_lists_and_retrieves_archived_orders(self):
+
+        paid = self.create_order(OrderStatus.PAID, days_ago=60, quantity=3)
+        self.create_order(OrderStatus.CANCELLED, days_ago=45)
+        self.archive()
+
+        response = self.client.get(reverse('archived-orders-list'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(response.data['results'][-1]['id'], paid.pk)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('archived-orders-detail', kwargs={'pk': paid.pk}))
+
+        self.assertEqual(response.data['table']['number'], 1)
+        self.assertEqual(
+            [(item['product_name'], item['quantity']) for item in response.data['items']],
+            [('chuleta de cerdo', 3)]
+        )
+
+        response = self.client.post(reverse('archived-orders-list'), {})
+
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def test_archive_endpoint_is_restricted_to_admins(self):
+
+        waiter = User.objects.create_user(
+            email='testuser@email.com',
+            username='testuser',
+            password='testuserpassword',
+        )
+        self.client.force_authenticate(waiter)
+
+        response = self.client.get(reverse('archived-orders-list'))
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_sales_rollups_rebuild_includes_archived_orders(self):
+
+        self.create_order(OrderStatus.PAID, days_ago=60)
+        self.create_order(OrderStatus.PAID, days_ago=1)
+        self.archive()
+
+        call_command('rebuild_sales_rollups', stdout=StringIO())
+
+        daily = DailySales.objects.get()
+
+        self.assertEqual(daily.order_count, 2)
+        self.assertEqual(daily.revenue, Decimal('40.000'))
@@ -0,0 +1,8 @@
+from rest_framework.routers import DefaultRouter
+
+from .views import ArchivedOrderViewSet
+
+router = DefaultRouter()
+router.register('orders', ArchivedOrderViewSet, basename='archived-orders')
+
+urlpatterns = router.urls
@@ -0,0 +1,26 @@
+from rest_framework.permissions import IsAuthenticated
+
+from rest_framework.viewsets import ReadOnlyModelViewSet
+
+from config.mixins import ReplicaListMixin
+
+from orders.permissions import IsRestaurantAdmin
+
+from .selectors import get_archived_orders, get_archived_orders_with_items
+
+from .serializers import ArchivedOrderDetailSerializer, ArchivedOrderSerializer
+
+
+class ArchivedOrderViewSet(ReplicaListMixin, ReadOnlyModelViewSet):
+
+    permission_classes = [IsAuthenticated, IsRestaurantAdmin]
+
+    def get_queryset(self):
+        if self.action == 'retrieve':
+            return get_archived_orders_with_items()
+        return get_archived_orders()
+
+    def get_serializer_class(self):
+        if self.action == 'retrieve':
+            return ArchivedOrderDetailSerializer
+        return ArchivedOrderSerializer
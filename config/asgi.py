@@ -3,6 +3,10 @@ ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The order event stream (``/orders/events/``) is an async streaming view and
+must be served through this entry point; under WSGI every open stream would
+hold a worker.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
@@ -0,0 +1,248 @@
+"""
+In-process request metrics, exposed in the Prometheus text format at
+/metrics (admin only).
+
+RequestMetricsMiddleware records, per resolved route name (e.g.
+`orders-prepare`), method and status: request count, a latency histogram,
+SQL query count and time, and response size. Each process aggregates its
+own totals behind a lock, so threaded servers are safe.
+
+With several worker processes, set METRICS_DIR to a directory shared by
+them. Every process then writes its totals to `<METRICS_DIR>/<pid>.json`
+at most every METRICS_FLUSH_SECONDS and at exit, and /metrics sums the
+files of all processes, whichever process serves the scrape. Totals of
+exited processes are kept so counters never go backwards; empty the
+directory when deploying.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+
+from bisect import bisect_left
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+COUNTERS = ['count', 'duration_sum', 'queries', 'query_seconds', 'response_bytes']
+
+request_stats = ContextVar('request_stats', default=None)
+
+
+class RequestStats:
+
+    __slots__ = ('queries', 'query_seconds', 'log')
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        # (alias, sql, seconds) of every query, kept only for profiled requests
+        self.log = None
+
+
+def record_query(execute, sql, params, many, context):
+    stats = request_stats.get()
+
+    if stats is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        stats.queries += 1
+        stats.query_seconds += duration
+
+        if stats.log is not None:
+            stats.log.append((context['connection'].alias, sql, duration))
+
+
+def install_query_recorder(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def install_query_recorders():
+    connection_created.connect(install_query_recorder)
+
+    # Connections opened before the middleware was loaded
+    for connection in connections.all(initialized_only=True):
+        install_query_recorder(connection)
+
+
+def get_route_name(request):
+    match = request.resolver_match
+
+    if match is None:
+        return 'unmatched'
+    return match.url_name or match.route
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Keeps an older snapshot from replacing a newer one
+        self._flush_lock = threading.Lock()
+        self._series = {}
+        self._last_flush = 0.0
+
+    def record(self, route, method, status, duration, queries, query_seconds, response_bytes):
+        key = (route, method, str(status))
+        now = time.monotonic()
+
+        with self._lock:
+            series = self._series.get(key)
+
+            if series is None:
+                series = self._series[key] = {
+                    **dict.fromkeys(COUNTERS, 0),
+                    'buckets': [0] * (len(DURATION_BUCKETS) + 1),
+                }
+
+            series['count'] += 1
+            series['duration_sum'] += duration
+            series['buckets'][bisect_left(DURATION_BUCKETS, duration)] += 1
+            series['queries'] += queries
+            series['query_seconds'] += query_seconds
+            series['response_bytes'] += response_bytes
+
+            # Claimed under the lock, so one thread flushes per interval
+            flush_due = bool(settings.METRICS_DIR) and now - self._last_flush > settings.METRICS_FLUSH_SECONDS
+
+            if flush_due:
+                self._last_flush = now
+
+        if flush_due:
+            self.try_flush()
+
+    def snapshot(self):
+        with self._lock:
+            return [
+                {'labels': list(key), **series, 'buckets': list(series['buckets'])}
+                for key, series in self._series.items()
+            ]
+
+    def flush(self):
+        with self._lock:
+            self._last_flush = time.monotonic()
+
+        directory = Path(settings.METRICS_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        path = directory / f'{os.getpid()}.json'
+        temporary = directory / f'{os.getpid()}.{threading.get_ident()}.tmp'
+
+        with self._flush_lock:
+            temporary.write_text(json.dumps(self.snapshot()))
+            os.replace(temporary, path)
+
+    def try_flush(self):
+        # A failed write must not fail the request or scrape that triggered it
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Could not write the metrics of process %s', os.getpid())
+
+    def collect(self):
+        if not settings.METRICS_DIR:
+            return self.snapshot()
+
+        self.try_flush()
+
+        snapshots = []
+
+        for path in Path(settings.METRICS_DIR).glob('*.json'):
+            try:
+                snapshots.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                # Removed or being replaced by its process
+                continue
+
+        return merge_snapshots(snapshots)
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+def merge_snapshots(snapshots):
+    merged = {}
+
+    for snapshot in snapshots:
+        for series in snapshot:
+            key = tuple(series['labels'])
+            total = merged.get(key)
+
+            if total is None:
+                merged[key] = {**series, 'buckets': list(series['buckets'])}
+                continue
+
+            for counter in COUNTERS:
+                total[counter] += series[counter]
+
+            total['buckets'] = [a + b for a, b in zip(total['buckets'], series['buckets'])]
+
+    return list(merged.values())
+
+
+def escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_metrics(snapshot):
+    snapshot = sorted(snapshot, key=lambda series: series['labels'])
+    lines = []
+
+    def labels_of(series, **extra):
+        route, method, status = series['labels']
+        pairs = {'route': route, 'method': method, 'status': status, **extra}
+        return ','.join(f'{name}="{escape_label(value)}"' for name, value in pairs.items())
+
+    def counter(name, help_text, field):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        lines.extend(f'{name}{{{labels_of(series)}}} {series[field]}' for series in snapshot)
+
+    counter('http_requests_total', 'Requests by route, method and status.', 'count')
+
+    lines.append('# HELP http_request_duration_seconds Request latency.')
+    lines.append('# TYPE http_request_duration_seconds histogram')
+
+    for series in snapshot:
+        cumulative = 0
+
+        for bound, count in zip([*DURATION_BUCKETS, '+Inf'], series['buckets']):
+            cumulative += count
+            lines.append(
+                f'http_request_duration_seconds_bucket{{{labels_of(series, le=str(bound))}}} {cumulative}'
+            )
+
+        lines.append(f'http_request_duration_seconds_sum{{{labels_of(series)}}} {series["duration_sum"]}')
+        lines.append(f'http_request_duration_seconds_count{{{labels_of(series)}}} {series["count"]}')
+
+    counter('http_request_db_queries_total', 'SQL queries run by requests.', 'queries')
+    counter('http_request_db_duration_seconds_total', 'Time spent in SQL queries.', 'query_seconds')
+    counter('http_response_size_bytes_total', 'Response body bytes, streamed bodies excluded.', 'response_bytes')
+
+    return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+@atexit.register
+def flush_on_exit():
+    if settings.configured and settings.METRICS_DIR:
+        registry.try_flush()
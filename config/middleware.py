@@ -0,0 +1,240 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .metrics import RequestStats, get_route_name, install_query_recorders, registry, request_stats
+from .profiling import PROFILE_REPORT_HEADER, can_profile, is_profiling_requested, profile_request
+from .routers import has_written, pin_primary
+from .traffic import (
+    TrafficRecorder,
+    connect_created_tracking,
+    created_objects,
+    is_recorded,
+    is_recorded_response,
+    read_json_body,
+)
+
+
+class PrimaryPinningMiddleware:
+
+    """
+    Scopes the router's write tracking to the request. After a request that
+    wrote, its user keeps reading from the primary for REPLICA_PIN_SECONDS,
+    so the next requests see the write despite replication lag.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        token = has_written.set(False)
+
+        try:
+            response = self.get_response(request)
+            self.pin_if_written(request)
+            return response
+        finally:
+            has_written.reset(token)
+
+    async def __acall__(self, request):
+        token = has_written.set(False)
+
+        try:
+            response = await self.get_response(request)
+            self.pin_if_written(request)
+            return response
+        finally:
+            has_written.reset(token)
+
+    def pin_if_written(self, request):
+        user = getattr(request, 'user', None)
+
+        if has_written.get() and user is not None and user.is_authenticated:
+            pin_primary(user)
+
+
+class RequestMetricsMiddleware:
+
+    """
+    Records per-route request metrics into config.metrics.registry. Listed
+    first so the latency covers every other middleware. Queries are counted
+    through a context variable, which sync_to_async carries into the
+    threads running ORM calls of async views.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_query_recorders()
+
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        started = time.perf_counter()
+
+        try:
+            response = self.get_response(request)
+        finally:
+            request_stats.reset(token)
+
+        self.record(request, response, time.perf_counter() - started, stats)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        started = time.perf_counter()
+
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_stats.reset(token)
+
+        self.record(request, response, time.perf_counter() - started, stats)
+        return response
+
+    def record(self, request, response, duration, stats):
+        registry.record(
+            get_route_name(request),
+            request.method,
+            response.status_code,
+            duration,
+            stats.queries,
+            stats.query_seconds,
+            0 if response.streaming else len(response.content),
+        )
+
+
+class ProfilingMiddleware:
+
+    """
+    Profiles the requests of superusers that ask for it (see
+    config.profiling) and answers with the report ID in the
+    X-Profile-Report header, or `busy` when another request is being
+    profiled. Streamed bodies are produced after the profile ends. In async
+    views only the event loop thread is profiled, but every query is logged.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_query_recorders()
+
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        if not is_profiling_requested(request) or not can_profile(request):
+            return self.get_response(request)
+
+        with profile_request() as profiler:
+            response = self.get_response(request)
+
+        return self.attach_report(request, response, profiler)
+
+    async def __acall__(self, request):
+        if not is_profiling_requested(request) or not await sync_to_async(can_profile)(request):
+            return await self.get_response(request)
+
+        with profile_request() as profiler:
+            response = await self.get_response(request)
+
+        return self.attach_report(request, response, profiler)
+
+    def attach_report(self, request, response, profiler):
+        if profiler is None:
+            response[PROFILE_REPORT_HEADER] = 'busy'
+        else:
+            response[PROFILE_REPORT_HEADER] = profiler.save_report(request, response)
+
+        return response
+
+
+class TrafficRecordingMiddleware:
+
+    """
+    Appends the requests to TRAFFIC_RECORD_PATH for replay_traffic (see
+    config.traffic). Not loaded at all unless the setting is set.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.TRAFFIC_RECORD_PATH:
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+        self.recorder = TrafficRecorder(settings.TRAFFIC_RECORD_PATH)
+        connect_created_tracking()
+
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        if not is_recorded(request):
+            return self.get_response(request)
+
+        body = read_json_body(request)
+        created = []
+        token = created_objects.set(created)
+        started_at = time.time()
+        started = time.perf_counter()
+
+        try:
+            response = self.get_response(request)
+        finally:
+            created_objects.reset(token)
+
+        self.record(request, response, body, started_at, time.perf_counter() - started, created)
+        return response
+
+    async def __acall__(self, request):
+        if not is_recorded(request):
+            return await self.get_response(request)
+
+        body = read_json_body(request)
+        created = []
+        token = created_objects.set(created)
+        started_at = time.time()
+        started = time.perf_counter()
+
+        try:
+            response = await self.get_response(request)
+        finally:
+            created_objects.reset(token)
+
+        self.record(request, response, body, started_at, time.perf_counter() - started, created)
+        return response
+
+    def record(self, request, response, body, started_at, duration, created):
+        if is_recorded_response(response):
+            self.recorder.write(request, response, body, started_at, duration, created)
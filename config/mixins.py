@@ -0,0 +1,260 @@
+import time
+
+from functools import partial
+
+from hashlib import md5
+
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from rest_framework.response import Response
+
+from .routers import is_primary_pinned, replica_reads
+
+from .streaming import stream_json_array
+
+
+class ConditionalGetMixin:
+
+    """
+    Adds ETag / If-None-Match support to list and retrieve, and Last-Modified
+    / If-Modified-Since to retrieve. Validators come from cheap probe
+    queries, so a matching request gets a 304 before the queryset is
+    fetched or serialized. A keyset page is probed by the (pk, updated_at)
+    of the rows it is built from, which costs one page of the index. Other
+    lists are probed by MAX(updated_at) and COUNT, and details by
+    (pk, updated_at).
+
+    Lists send no Last-Modified: deleting a row does not move MAX(updated_at),
+    so only the ETag, which includes the row count, is a safe validator.
+    Details send it only when no dependencies feed the representation, and
+    only once the second of updated_at is over, since HTTP dates drop the
+    sub-second part a later write in that same second would keep.
+    """
+
+    def get_conditional_dependencies(self):
+        # Querysets whose changes alter the representation without touching
+        # the viewset's own updated_at (e.g. related rows shown in responses)
+        return []
+
+    def get_probe(self, queryset):
+        probe = queryset.order_by().aggregate(
+            last_updated_at=Max('updated_at'),
+            count=Count('pk')
+        )
+        return f"{probe['last_updated_at']}:{probe['count']}"
+
+    def get_dependencies_probe(self):
+        return ':'.join(
+            self.get_probe(queryset) for queryset in self.get_conditional_dependencies()
+        )
+
+    def get_page_probe(self, request, queryset):
+        # The page plus the row that tells whether a next page exists
+        page_queryset = self.paginator.get_page_queryset(queryset, request)
+
+        return ','.join(
+            f'{pk}@{updated_at}'
+            for pk, updated_at in page_queryset.values_list('pk', 'updated_at')
+        )
+
+    def is_keyset_page_request(self, request):
+        # Streamed lists are not paginated
+        is_streaming_request = getattr(self, 'is_streaming_request', None)
+
+        return (
+            hasattr(self.paginator, 'get_page_queryset')
+            and not (is_streaming_request and is_streaming_request(request))
+        )
+
+    def get_list_etag(self, request, queryset):
+        if self.is_keyset_page_request(request):
+            probe = self.get_page_probe(request, queryset)
+        else:
+            probe = self.get_probe(queryset)
+
+        return self.make_etag(request, f'{probe}:{self.get_dependencies_probe()}')
+
+    def get_last_modified(self, updated_at):
+        if self.get_conditional_dependencies():
+            return None
+
+        last_modified = int(updated_at.timestamp())
+
+        if last_modified >= int(time.time()):
+            return None
+
+        return last_modified
+
+    def make_etag(self, request, source):
+        return quote_etag(md5(f'{request.get_full_path()}:{source}'.encode()).hexdigest())
+
+    def get_conditional_list_response(self, request, queryset, build_response):
+        etag = self.get_list_etag(request, queryset)
+
+        not_modified = get_conditional_response(request, etag=etag)
+
+        if not_modified is not None:
+            return not_modified
+
+        response = build_response()
+
+        if response.status_code == 200:
+            response['ETag'] = etag
+
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.get_conditional_list_response(
+            request,
+            self.filter_queryset(self.get_queryset()),
+            partial(super().list, request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = {self.lookup_field: kwargs[self.lookup_url_kwarg or self.lookup_field]}
+
+        try:
+            probe = self.filter_queryset(self.get_queryset()).filter(**lookup).values_list(
+                'pk', 'updated_at'
+            ).first()
+        except (TypeError, ValueError, ValidationError):
+            probe = None
+
+        if probe is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        pk, updated_at = probe
+        etag = self.make_etag(request, f'{pk}:{updated_at}:{self.get_dependencies_probe()}')
+        # Without Last-Modified, If-Modified-Since is ignored too
+        last_modified = self.get_last_modified(updated_at)
+
+        not_modified = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=last_modified
+        )
+
+        if not_modified is not None:
+            return not_modified
+
+        response = super().retrieve(request, *args, **kwargs)
+
+        if response.status_code == 200:
+            response['ETag'] = etag
+
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+
+        return response
+
+
+class ReplicaListMixin:
+
+    """
+    Serves list from the read replica, except for users who wrote within
+    the last REPLICA_PIN_SECONDS (see config.routers). List-like actions
+    wrap themselves in `read_from_replica(request)`.
+    """
+
+    def read_from_replica(self, request):
+        return replica_reads(not is_primary_pinned(request.user))
+
+    def list(self, request, *args, **kwargs):
+        with self.read_from_replica(request):
+            return super().list(request, *args, **kwargs)
+
+
+class ValuesListMixin:
+
+    """
+    Serializes list pages with `values_serializer_class`, a ValuesSerializer
+    reading `.values()` rows, when it is set; otherwise with the viewset's
+    serializer as ListModelMixin does. Retrieve and writes are unaffected.
+    """
+
+    values_serializer_class = None
+
+    def get_values_queryset(self, queryset):
+        if self.values_serializer_class is None:
+            return queryset
+
+        # The paginator reads its cursor position from the ordering fields
+        ordering = getattr(self.paginator, 'ordering', None) or ()
+
+        return self.values_serializer_class.get_values_queryset(
+            queryset,
+            [field.lstrip('-') for field in ordering]
+        )
+
+    def serialize_list(self, rows):
+        if self.values_serializer_class is None:
+            return self.get_serializer(rows, many=True).data
+
+        return self.values_serializer_class(rows).data
+
+    def get_list_response(self, queryset):
+        queryset = self.get_values_queryset(queryset)
+        page = self.paginate_queryset(queryset)
+
+        if page is not None:
+            return self.get_paginated_response(self.serialize_list(page))
+
+        return Response(self.serialize_list(queryset))
+
+    def list(self, request, *args, **kwargs):
+        return self.get_list_response(self.filter_queryset(self.get_queryset()))
+
+
+class StreamingListMixin(ValuesListMixin):
+
+    """
+    Adds a streaming mode to list: with `?stream=1` the whole filtered
+    queryset is returned as one unpaginated JSON array. Rows are read with
+    `iterator(chunk_size=...)` and serialized and encoded one chunk at a
+    time, so memory stays flat however many rows match.
+
+    Under ASGI Django buffers synchronous streaming bodies before sending
+    them, so the memory bound only holds when served over WSGI.
+    """
+
+    stream_query_param = 'stream'
+    stream_chunk_size = 1000
+
+    def is_streaming_request(self, request):
+        return request.query_params.get(self.stream_query_param) in ('1', 'true')
+
+    def get_streaming_queryset(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        ordering = getattr(self.paginator, 'ordering', None)
+
+        # Same order as the paginated list, over the same keyset index
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+
+        # The body is read after the view returns, outside any routing
+        # context, so pin the database chosen now
+        return self.get_values_queryset(queryset).using(queryset.db)
+
+    def get_serialized_chunks(self, queryset):
+        rows = queryset.iterator(chunk_size=self.stream_chunk_size)
+
+        while chunk := list(islice(rows, self.stream_chunk_size)):
+            yield self.serialize_list(chunk)
+
+    def get_streaming_response(self, queryset):
+        return StreamingHttpResponse(
+            stream_json_array(self.get_serialized_chunks(queryset)),
+            content_type='application/json'
+        )
+
+    def list(self, request, *args, **kwargs):
+        if self.is_streaming_request(request):
+            return self.get_streaming_response(self.get_streaming_queryset())
+
+        return super().list(request, *args, **kwargs)
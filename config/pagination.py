@@ -0,0 +1,192 @@
+import json
+
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetCursorPagination(BasePagination):
+
+    """
+    Keyset pagination over a unique ordering, by default `(created_at, id)`
+    descending. Cursors are opaque tokens holding the ordering values of the
+    row the page starts after, so every page is a single indexed range query
+    with no OFFSET and no COUNT(*).
+    """
+
+    ordering = ('-created_at', '-id')
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self):
+        self.page_size = api_settings.PAGE_SIZE
+        self.max_page_size = settings.PAGINATION_MAX_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_queryset = self.get_page_queryset(queryset, request)
+
+        try:
+            results = list(page_queryset)
+        except (ValidationError, ValueError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return self.set_page(results)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        page_queryset = self.get_page_queryset(queryset, request)
+
+        try:
+            results = [instance async for instance in page_queryset]
+        except (ValidationError, ValueError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return self.set_page(results)
+
+    def get_page_queryset(self, queryset, request):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        self.position, self.reverse = self.decode_cursor(request)
+
+        ordering = self.get_ordering(self.reverse)
+        queryset = queryset.order_by(*ordering)
+
+        try:
+            if self.position is not None:
+                queryset = queryset.filter(self.get_position_filter(ordering, self.position))
+        except (ValidationError, ValueError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if self.reverse:
+            self.page.reverse()
+            self.has_next = self.position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.position is not None
+
+        return self.page
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        page_size = self.page_size
+
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            requested = 0
+
+        if requested > 0:
+            page_size = requested
+
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, reverse):
+        if not reverse:
+            return list(self.ordering)
+
+        return [
+            field[1:] if field.startswith('-') else f'-{field}'
+            for field in self.ordering
+        ]
+
+    def get_position_filter(self, ordering, position):
+        position_filter = Q()
+        equal_filter = Q()
+
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+
+            position_filter |= equal_filter & Q(**{f'{name}__{lookup}': value})
+            equal_filter &= Q(**{name: value})
+
+        return position_filter
+
+    def get_position(self, instance):
+        position = []
+
+        for field in self.ordering:
+            name = field.lstrip('-')
+            # Rows are model instances, or dicts for `.values()` querysets
+            value = instance[name] if isinstance(instance, dict) else getattr(instance, name)
+            position.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+
+        return position
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+
+        return self.encode_cursor(self.get_position(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+
+        return self.encode_cursor(self.get_position(self.page[0]), reverse=True)
+
+    def encode_cursor(self, position, reverse):
+        payload = json.dumps({'p': position, 'r': int(reverse)})
+        cursor = urlsafe_b64encode(payload.encode()).decode()
+
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+
+        if cursor is None:
+            return None, False
+
+        try:
+            payload = json.loads(urlsafe_b64decode(cursor.encode()).decode())
+            position = payload['p']
+            reverse = bool(payload['r'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        return position, reverse
+
+
+class DateJoinedCursorPagination(KeysetCursorPagination):
+
+    ordering = ('-date_joined', '-id')
@@ -0,0 +1,204 @@
+"""
+On-demand profiling of single API requests for superusers.
+
+Send `X-Profile: 1` (or `?profile=1`) with any request: ProfilingMiddleware
+runs it under cProfile and tracemalloc, logs its SQL queries and stores a
+report in the cache for PROFILE_REPORT_TIMEOUT seconds. The response is
+returned unchanged, with the report ID in the `X-Profile-Report` header;
+GET /profiles/<id>/ returns the report. Requests without the flag only pay
+for looking it up.
+
+With several worker processes the default cache must be a shared one (see
+CACHES): with the per-process LocMemCache, /profiles/<id>/ is a 404
+whenever another worker serves it.
+"""
+import cProfile
+import io
+import pstats
+import threading
+import time
+import tracemalloc
+import uuid
+
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .metrics import RequestStats, request_stats
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_QUERY_PARAM = 'profile'
+PROFILE_REPORT_HEADER = 'X-Profile-Report'
+
+# cProfile hooks the whole interpreter, so one request is profiled at a time
+profiling_lock = threading.Lock()
+
+
+def is_profiling_requested(request):
+    return bool(request.headers.get(PROFILE_HEADER) or request.GET.get(PROFILE_QUERY_PARAM))
+
+
+def get_profiling_user(request):
+    """
+    Authenticates the request the way the API views will, so JWT users can
+    profile too; the middleware runs before DRF does.
+    """
+    authenticators = [auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+
+    try:
+        return Request(request, authenticators=authenticators).user
+    except APIException:
+        return None
+
+
+def can_profile(request):
+    user = get_profiling_user(request)
+    return bool(user and user.is_authenticated and user.is_superuser)
+
+
+@contextmanager
+def profile_request():
+    """
+    Yields a running RequestProfiler, or None while another request is
+    being profiled.
+    """
+    if not profiling_lock.acquire(blocking=False):
+        yield None
+        return
+
+    profiler = RequestProfiler()
+
+    try:
+        profiler.start()
+
+        try:
+            yield profiler
+        finally:
+            profiler.stop()
+    finally:
+        profiling_lock.release()
+
+
+def get_profile_report_key(report_id):
+    return f'profile:report:{report_id}'
+
+
+def get_profile_report(report_id):
+    return cache.get(get_profile_report_key(report_id))
+
+
+class RequestProfiler:
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+        self.stats = None
+        self.started_tracing = False
+
+    def start(self):
+        stats = request_stats.get()
+
+        # Without RequestMetricsMiddleware the queries are logged here
+        if stats is None:
+            stats = RequestStats()
+            self.stats_token = request_stats.set(stats)
+        else:
+            self.stats_token = None
+
+        self.stats = stats
+        self.stats.log = []
+
+        self.started_tracing = not tracemalloc.is_tracing()
+
+        if self.started_tracing:
+            tracemalloc.start(settings.PROFILE_TRACEMALLOC_FRAMES)
+
+        self.memory_before = tracemalloc.take_snapshot()
+        self.started = time.perf_counter()
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+        self.duration = time.perf_counter() - self.started
+        self.memory_after = tracemalloc.take_snapshot()
+
+        if self.started_tracing:
+            tracemalloc.stop()
+
+        self.queries = self.stats.log
+        self.stats.log = None
+
+        if self.stats_token is not None:
+            request_stats.reset(self.stats_token)
+
+    def save_report(self, request, response):
+        report_id = uuid.uuid4().hex
+        report = {
+            'id': report_id,
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'duration': self.duration,
+            'profile': self.get_profile(),
+            'sql': self.get_sql(),
+            'allocations': self.get_allocations(),
+        }
+
+        cache.set(get_profile_report_key(report_id), report, timeout=settings.PROFILE_REPORT_TIMEOUT)
+        return report_id
+
+    def get_profile(self):
+        stream = io.StringIO()
+        pstats.Stats(self.profiler, stream=stream).sort_stats('cumulative').print_stats(
+            settings.PROFILE_STATS_LIMIT
+        )
+        return stream.getvalue()
+
+    def get_sql(self):
+        statements = defaultdict(lambda: {'count': 0, 'duration': 0.0})
+
+        for _, sql, duration in self.queries:
+            statements[sql]['count'] += 1
+            statements[sql]['duration'] += duration
+
+        # Repeated statements first: they are where N+1 queries show up
+        by_statement = sorted(
+            ({'sql': sql, **totals} for sql, totals in statements.items()),
+            key=lambda statement: (statement['count'], statement['duration']),
+            reverse=True,
+        )
+
+        return {
+            'count': len(self.queries),
+            'duration': sum(duration for _, _, duration in self.queries),
+            'queries': [
+                {'alias': alias, 'sql': sql, 'duration': duration}
+                for alias, sql, duration in self.queries
+            ],
+            'by_statement': by_statement,
+        }
+
+    def get_allocations(self):
+        ignored = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ]
+        differences = self.memory_after.filter_traces(ignored).compare_to(
+            self.memory_before.filter_traces(ignored), 'lineno'
+        )
+
+        return [
+            {
+                'location': str(difference.traceback),
+                'size': difference.size_diff,
+                'count': difference.count_diff,
+            }
+            for difference in differences[:settings.PROFILE_ALLOCATIONS_LIMIT]
+            if difference.size_diff > 0
+        ]
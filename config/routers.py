@@ -0,0 +1,61 @@
+from contextlib import contextmanager
+
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA_DB_ALIAS = 'replica'
+
+replica_reads_enabled = ContextVar('replica_reads_enabled', default=False)
+has_written = ContextVar('has_written', default=False)
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """
+    Routes the reads made inside the block to the replica, unless the
+    current request has already written. Selectors run under it only for
+    list endpoints; every other read stays on the primary.
+    """
+    token = replica_reads_enabled.set(enabled)
+    try:
+        yield
+    finally:
+        replica_reads_enabled.reset(token)
+
+def get_primary_pin_key(user_id):
+    return f'db:primary-pin:{user_id}'
+
+def pin_primary(user):
+    cache.set(get_primary_pin_key(user.pk), True, timeout=settings.REPLICA_PIN_SECONDS)
+
+def is_primary_pinned(user):
+    return bool(user.is_authenticated and cache.get(get_primary_pin_key(user.pk)))
+
+
+class PrimaryReplicaRouter:
+
+    """
+    Writes go to the primary. Reads go to the replica only inside
+    `replica_reads()` and only until the request writes, so a request
+    always reads its own writes.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            settings.REPLICA_READS_ENABLED
+            and replica_reads_enabled.get()
+            and not has_written.get()
+        ):
+            return REPLICA_DB_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        has_written.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
@@ -0,0 +1,158 @@
+from django.core.exceptions import ImproperlyConfigured
+
+from rest_framework import serializers
+
+from rest_framework.fields import SkipField, empty
+
+
+SKIP = object()
+
+
+class ValuesField:
+
+    """
+    Declares how a ValuesSerializer reads a field that has no plain model
+    source, e.g. a SerializerMethodField: the `.values()` lookups it needs
+    and a function building the output from them.
+    """
+
+    def __init__(self, *lookups, to_representation=None):
+        self.lookups = lookups
+        self.to_representation = to_representation
+
+
+class RelatedPkField(serializers.IntegerField):
+
+    """
+    Read-only `source='<relation>.pk'` that reads the foreign key column
+    instead of loading the relation. Like the dotted source, the key is left
+    out when the relation is null.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(read_only=True, **kwargs)
+
+    def get_attribute(self, instance):
+        relation = instance._meta.get_field(self.source_attrs[0])
+        value = getattr(instance, relation.attname)
+
+        if value is None:
+            raise SkipField()
+
+        return value
+
+
+class ValuesSerializer:
+
+    """
+    Read-only list serializer producing the same output as `serializer_class`
+    from `.values()` rows instead of model instances.
+
+    The field plan is compiled once per class from the fields of
+    `serializer_class`: each field's source becomes a `.values()` lookup and
+    its `to_representation` is applied, skipped for ReadOnlyFields and None
+    values the same way DRF does. Like DRF, a read-only field with a dotted
+    source is left out when the relation is null. Fields without a plain
+    source are declared as ValuesField class attributes.
+    """
+
+    serializer_class = None
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    @property
+    def data(self):
+        plan = self.get_plan()
+        return [
+            {name: value for name, read in plan if (value := read(row)) is not SKIP}
+            for row in self.rows
+        ]
+
+    @classmethod
+    def get_values_queryset(cls, queryset, extra_lookups=()):
+        cls.get_plan()
+        return queryset.values(*dict.fromkeys([*cls._lookups, *extra_lookups]))
+
+    @classmethod
+    def get_plan(cls):
+        if '_plan' not in cls.__dict__:
+            fields = cls.get_fields()
+
+            cls._lookups = [
+                lookup
+                for _, lookups, _, relation in fields
+                for lookup in (*lookups, relation) if lookup
+            ]
+            cls._plan = [
+                (name, cls.compile_field(lookups, to_representation, relation))
+                for name, lookups, to_representation, relation in fields
+            ]
+
+        return cls._plan
+
+    @classmethod
+    def get_fields(cls):
+        fields = []
+
+        for name, field in cls.serializer_class().fields.items():
+            declared = getattr(cls, name, None)
+
+            if isinstance(declared, ValuesField):
+                fields.append((name, declared.lookups, declared.to_representation, None))
+                continue
+            if isinstance(field, serializers.SerializerMethodField) or field.source == '*':
+                raise ImproperlyConfigured(
+                    f'{cls.__name__} must declare a ValuesField for {name}'
+                )
+
+            to_representation = (
+                None if isinstance(field, serializers.ReadOnlyField) else field.to_representation
+            )
+            fields.append((
+                name,
+                ('__'.join(field.source_attrs),),
+                to_representation,
+                cls.get_skip_relation(field)
+            ))
+
+        return fields
+
+    @staticmethod
+    def get_skip_relation(field):
+        # DRF raises SkipField for these when a relation in the source is None
+        if (
+            len(field.source_attrs) > 1
+            and field.default is empty
+            and not field.allow_null
+            and not field.required
+        ):
+            return '__'.join(field.source_attrs[:-1])
+        return None
+
+    @staticmethod
+    def compile_field(lookups, to_representation, relation=None):
+        if len(lookups) > 1:
+            return lambda row: to_representation(*(row[lookup] for lookup in lookups))
+
+        lookup, = lookups
+
+        if relation is not None:
+            def read(row):
+                if row[relation] is None:
+                    return SKIP
+                value = row[lookup]
+                if value is None or to_representation is None:
+                    return value
+                return to_representation(value)
+
+            return read
+
+        if to_representation is None:
+            return lambda row: row[lookup]
+
+        def read(row):
+            value = row[lookup]
+            return None if value is None else to_representation(value)
+
+        return read
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
+
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,15 +45,21 @@ INSTALLED_APPS = [
     'orders',
     'products',
     'order_items',
+    'reports',
+    'archive',
     'django_extensions'
 ]
 
 MIDDLEWARE = [
+    'config.middleware.RequestMetricsMiddleware',
+    'config.middleware.TrafficRecordingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'config.middleware.PrimaryPinningMiddleware',
+    'config.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -79,13 +87,60 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+# `replica` is a read-only copy of `default`. List endpoints read from it
+# (see config.routers) once REPLICA_READS_ENABLED is on. Locally, point
+# DATABASE_REPLICA_NAME at a second SQLite file, e.g. a copy of db.sqlite3.
+
+DATABASE_REPLICA_NAME = os.environ.get('DATABASE_REPLICA_NAME')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Writers take the lock when their transaction starts and wait for
+        # each other, instead of failing with "database is locked" under
+        # concurrent requests
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+        },
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / (DATABASE_REPLICA_NAME or 'db.sqlite3'),
+    },
+}
+
+DATABASE_ROUTERS = ['config.routers.PrimaryReplicaRouter']
+
+REPLICA_READS_ENABLED = DATABASE_REPLICA_NAME is not None
+
+# Seconds a user who wrote keeps reading from the primary, covering the
+# replication lag (read-your-writes across requests)
+REPLICA_PIN_SECONDS = 5
+
+
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# Use a shared backend (Redis, Memcached) when running several processes so
+# that every process sees the same menu version and the profile reports
+# another process stored (GET /profiles/<id>/, see config.profiling).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
+# Seconds a cached menu response is kept for a given menu version
+MENU_CACHE_TIMEOUT = 60 * 60
+
+# Seconds JWT authentication trusts a cached token version / active flag,
+# i.e. how long a revocation can take to reach other processes
+AUTH_TOKEN_STATE_CACHE_TIMEOUT = 30
+
+# Seconds ClaimsUser.get_user() keeps the full user, 0 disables the cache
+AUTH_USER_CACHE_TIMEOUT = 30
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -128,6 +183,61 @@ AUTH_USER_MODEL = 'accounts.user'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    ]
+        'accounts.authentication.ClaimsJWTAuthentication',
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'config.pagination.KeysetCursorPagination',
+    'PAGE_SIZE': 50,
 }
+
+# Tokens carry the username and role flags, so requests are authenticated
+# without loading the user row
+SIMPLE_JWT = {
+    'TOKEN_USER_CLASS': 'accounts.authentication.ClaimsUser',
+    'TOKEN_OBTAIN_SERIALIZER': 'accounts.serializers.ClaimsTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.serializers.ClaimsTokenRefreshSerializer',
+}
+
+# Directory shared by the worker processes, where each one writes its
+# request metrics for /metrics to merge (see config.metrics). Unset, /metrics
+# reports the totals of the process serving it.
+METRICS_DIR = os.environ.get('METRICS_DIR')
+
+# Seconds between two writes of a process's metrics to METRICS_DIR
+METRICS_FLUSH_SECONDS = 5
+
+# Seconds a profile report of a request (see config.profiling) is kept
+PROFILE_REPORT_TIMEOUT = 60 * 60
+
+# Functions listed in a profile report, by cumulative time
+PROFILE_STATS_LIMIT = 50
+
+# Allocation hot spots listed in a profile report, and the frames tracemalloc
+# keeps per allocation
+PROFILE_ALLOCATIONS_LIMIT = 25
+PROFILE_TRACEMALLOC_FRAMES = 1
+
+# JSONL file TrafficRecordingMiddleware appends the requests to, for
+# replay_traffic (see config.traffic). Unset, nothing is recorded.
+TRAFFIC_RECORD_PATH = os.environ.get('TRAFFIC_RECORD_PATH')
+
+# Path prefixes left out of recordings
+TRAFFIC_RECORD_EXCLUDED_PATHS = ['/admin/', '/api/token/', '/metrics', '/profiles/']
+
+# Body fields whose values are anonymized in recordings
+TRAFFIC_REDACTED_FIELDS = [
+    'email',
+    'username',
+    'first_name',
+    'last_name',
+    'password',
+    'refresh',
+    'access',
+]
+
+# Closed orders created more than this many days ago are moved to the
+# archive tables by archive_orders, in batches of ORDER_ARCHIVE_BATCH_SIZE
+ORDER_ARCHIVE_AFTER_DAYS = 90
+ORDER_ARCHIVE_BATCH_SIZE = 500
+
+# Upper bound for the `page_size` query parameter of paginated endpoints
+PAGINATION_MAX_PAGE_SIZE = 200
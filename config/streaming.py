@@ -0,0 +1,46 @@
+import json
+
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+encoder = JSONEncoder()
+
+
+def dumps(data):
+    """
+    Encodes `data` to compact UTF-8 JSON. Uses orjson when it is installed;
+    types orjson does not handle (and datetimes, so they keep DRF's format)
+    go through DRF's JSONEncoder, so the output matches JSONRenderer.
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            data,
+            default=encoder.default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME
+        )
+
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def stream_json_array(chunks):
+    """
+    Yields a JSON array built from an iterable of lists of items, encoding
+    one list at a time.
+    """
+    yield b'['
+
+    separator = b''
+
+    for chunk in chunks:
+        body = dumps(chunk)[1:-1]
+
+        if body:
+            yield separator + body
+            separator = b','
+
+    yield b']'
@@ -0,0 +1,480 @@
+import json
+import os
+import tempfile
+
+from concurrent.futures import ThreadPoolExecutor
+
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync
+
+from rest_framework import status
+
+from django.contrib.auth import get_user_model
+
+from django.core.cache import cache
+
+from django.db import connection, connections
+
+from django.test import override_settings
+
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.test import APITestCase
+
+from order_items.models import OrderItem
+
+from orders.models import Order
+
+from orders.selectors import get_active_orders_of_table
+
+from products.models import Product
+
+from tables.models import Table
+
+from .metrics import registry
+
+from .profiling import PROFILE_REPORT_HEADER, get_profile_report
+
+from .routers import PrimaryReplicaRouter, has_written, replica_reads
+
+from .traffic import anonymize
+
+User = get_user_model()
+
+
+@override_settings(REPLICA_READS_ENABLED=True)
+class DatabaseRoutingTest(APITestCase):
+
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+
+        cache.clear()
+
+        self.admin_user = User.objects.create_user(
+            email='testadmin@email.com',
+            username='testadminuser',
+            password='testadminpassword',
+            is_staff=True,
+            is_superuser=True
+        )
+
+        self.table = Table.objects.create(number=1, capacity=4)
+        self.order = Order.objects.create(table=self.table, created_by=self.admin_user)
+
+        self.client.force_authenticate(self.admin_user)
+
+    def get_aliases(self, method, url, data=None):
+
+        with (
+            CaptureQueriesContext(connections['default']) as primary,
+            CaptureQueriesContext(connections['replica']) as replica,
+        ):
+            response = getattr(self.client, method)(url, data)
+
+            if response.streaming:
+                b''.join(response.streaming_content)
+
+        return {alias for alias, queries in [('default', primary), ('replica', replica)] if len(queries)}
+
+    def test_list_endpoints_read_from_the_replica(self):
+
+        for url in [
+            '/tables/',
+            '/tables/available/',
+            '/orders/',
+            '/orders/?stream=1',
+            '/items/',
+            '/items/?stream=1',
+            '/products/?stream=1',
+            '/accounts/users/',
+        ]:
+            with self.subTest(url=url):
+                self.assertEqual(self.get_aliases('get', url), {'replica'})
+
+    def test_cached_menu_is_built_from_the_primary(self):
+
+        Product.objects.create(name='chuleta de cerdo', price=Decimal('10.000'))
+        Product.objects.using('replica').create(name='stale', price=Decimal('1.000'))
+
+        for url in ['/products/', '/products/active/']:
+            with self.subTest(url=url):
+                self.assertEqual(self.get_aliases('get', url), {'default'})
+
+                response = self.client.get(url)
+
+                self.assertEqual([product['name'] for product in response.data['results']], ['chuleta de cerdo'])
+                self.assertEqual(self.get_aliases('get', url), set())
+
+    def test_detail_endpoints_and_writes_use_the_primary(self):
+
+        for method, url in [
+            ('get', f'/tables/{self.table.pk}/'),
+            ('get', f'/orders/{self.order.pk}/'),
+            ('post', f'/orders/{self.order.pk}/prepare/'),
+        ]:
+            with self.subTest(url=url):
+                self.assertEqual(self.get_aliases(method, url), {'default'})
+
+    def test_lists_show_replica_rows(self):
+
+        Table.objects.using('replica').create(number=99, capacity=2)
+
+        response = self.client.get('/tables/')
+
+        self.assertEqual([table['number'] for table in response.data['results']], [99])
+
+    def test_user_reads_own_writes_after_writing(self):
+
+        waiter = User.objects.create_user(
+            email='waiter@email.com',
+            username='waiter',
+            password='waiterpassword',
+        )
+        other_table = Table.objects.create(number=2, capacity=4)
+
+        self.assertEqual(self.get_aliases('post', '/orders/', {'table': other_table.pk}), {'default'})
+        self.assertEqual(self.get_aliases('get', '/orders/'), {'default'})
+
+        self.client.force_authenticate(waiter)
+
+        self.assertEqual(self.get_aliases('get', '/orders/'), {'replica'})
+
+    def test_reads_after_a_write_in_the_same_request_use_the_primary(self):
+
+        router = PrimaryReplicaRouter()
+        token = has_written.set(False)
+
+        try:
+            with replica_reads():
+                self.assertEqual(router.db_for_read(Order), 'replica')
+                self.assertEqual(router.db_for_write(Order), 'default')
+                self.assertEqual(router.db_for_read(Order), 'default')
+        finally:
+            has_written.reset(token)
+
+        self.assertEqual(router.db_for_read(Order), 'default')
+
+    def test_async_order_list_reads_from_the_replica(self):
+
+        async_to_sync(self.async_client.aforce_login)(self.admin_user)
+
+        with (
+            CaptureQueriesContext(connections['default']) as primary,
+            CaptureQueriesContext(connections['replica']) as replica,
+        ):
+            response = async_to_sync(self.async_client.get)('/async/orders/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(len(replica))
+        self.assertFalse([query for query in primary if 'orders_order' in query['sql']])
+
+
+class RequestMetricsTest(APITestCase):
+
+    def setUp(self):
+
+        registry.reset()
+
+        self.admin_user = User.objects.create_user(
+            email='testadmin@email.com',
+            username='testadminuser',
+            password='testadminpassword',
+            is_staff=True,
+            is_superuser=True
+        )
+        self.user = User.objects.create_user(
+            email='testuser@email.com',
+            username='testuser',
+            password='testpassword',
+        )
+
+        self.table = Table.objects.create(number=1, capacity=4)
+        self.order = Order.objects.create(table=self.table, created_by=self.admin_user)
+
+        self.client.force_authenticate(self.admin_user)
+
+    def get_series(self, route, method):
+
+        return next(
+            series for series in registry.snapshot()
+            if series['labels'][:2] == [route, method]
+        )
+
+    def test_records_requests_per_route(self):
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(f'/orders/{self.order.pk}/prepare/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        series = self.get_series('orders-prepare', 'POST')
+
+        self.assertEqual(series['labels'][2], '200')
+        self.assertEqual(series['count'], 1)
+        self.assertEqual(sum(series['buckets']), 1)
+        self.assertEqual(series['queries'], len(queries))
+        self.assertGreater(series['query_seconds'], 0)
+        self.assertEqual(series['response_bytes'], len(response.content))
+
+        self.client.get('/orders/')
+        self.client.get('/orders/')
+
+        self.assertEqual(self.get_series('orders-list', 'GET')['count'], 2)
+
+    def test_counts_queries_of_async_views(self):
+
+        async_to_sync(self.async_client.aforce_login)(self.admin_user)
+        response = async_to_sync(self.async_client.get)('/async/orders/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreater(self.get_series('async/orders/', 'GET')['queries'], 0)
+
+    def test_metrics_endpoint_renders_prometheus_text(self):
+
+        self.client.post(f'/orders/{self.order.pk}/prepare/')
+
+        response = self.client.get('/metrics')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+
+        text = response.content.decode()
+        labels = 'route="orders-prepare",method="POST",status="200"'
+
+        self.assertIn('# TYPE http_requests_total counter', text)
+        self.assertIn(f'http_requests_total{{{labels}}} 1', text)
+        self.assertIn(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 1', text)
+        self.assertIn(f'http_request_duration_seconds_count{{{labels}}} 1', text)
+        self.assertIn(f'http_request_db_queries_total{{{labels}}}', text)
+
+    def test_metrics_endpoint_is_admin_only(self):
+
+        self.client.force_authenticate(self.user)
+
+        self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_metrics_endpoint_merges_processes(self):
+
+        with tempfile.TemporaryDirectory() as directory, self.settings(METRICS_DIR=directory):
+            self.client.post(f'/orders/{self.order.pk}/prepare/')
+
+            own = self.get_series('orders-prepare', 'POST')
+            other = {**own, 'count': 2, 'queries': 10}
+
+            with open(os.path.join(directory, '0.json'), 'w') as file:
+                json.dump([other], file)
+
+            merged = registry.collect()
+
+            self.assertEqual(len(merged), 1)
+            self.assertEqual(merged[0]['count'], 3)
+            self.assertEqual(merged[0]['queries'], own['queries'] + 10)
+            self.assertEqual(merged[0]['buckets'], [a + b for a, b in zip(own['buckets'], other['buckets'])])
+            self.assertTrue(os.path.exists(os.path.join(directory, f'{os.getpid()}.json')))
+
+    def test_concurrent_flushes_do_not_collide(self):
+
+        def record(index):
+            for _ in range(50):
+                registry.record('orders-list', 'GET', 200, 0.01, 1, 0.001, 10)
+
+        with (
+            tempfile.TemporaryDirectory() as directory,
+            self.settings(METRICS_DIR=directory, METRICS_FLUSH_SECONDS=0),
+        ):
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                list(executor.map(record, range(8)))
+
+            registry.flush()
+
+            with open(os.path.join(directory, f'{os.getpid()}.json')) as file:
+                flushed = json.load(file)
+
+            self.assertEqual(flushed[0]['count'], 400)
+            self.assertEqual(os.listdir(directory), [f'{os.getpid()}.json'])
+
+    def test_failed_flush_does_not_fail_the_request(self):
+
+        with (
+            tempfile.NamedTemporaryFile() as not_a_directory,
+            self.settings(METRICS_DIR=not_a_directory.name, METRICS_FLUSH_SECONDS=0),
+            self.assertLogs('config.metrics', 'ERROR'),
+        ):
+            response = self.client.post(f'/orders/{self.order.pk}/prepare/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.get_series('orders-prepare', 'POST')['count'], 1)
+
+
+class RequestProfilingTest(APITestCase):
+
+    def setUp(self):
+
+        cache.clear()
+
+        self.admin_user = User.objects.create_user(
+            email='testadmin@email.com',
+            username='testadminuser',
+            password='testadminpassword',
+            is_staff=True,
+            is_superuser=True
+        )
+        self.user = User.objects.create_user(
+            email='testuser@email.com',
+            username='testuser',
+            password='testpassword',
+        )
+
+        self.table = Table.objects.create(number=1, capacity=4)
+        Order.objects.create(table=self.table, created_by=self.admin_user)
+
+    def test_superuser_gets_a_profile_report(self):
+
+        self.client.force_login(self.admin_user)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/tables/available/', HTTP_X_PROFILE='1')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('results', response.data)
+
+        captured = [query['sql'] for query in queries]
+        report = self.client.get(f'/profiles/{response[PROFILE_REPORT_HEADER]}/').data
+        profiled = [query['sql'] for query in report['sql']['queries']]
+
+        self.assertEqual(report['path'], '/tables/available/')
+        self.assertEqual(report['status'], status.HTTP_200_OK)
+        self.assertIn('cumulative', report['profile'])
+        # Session and user queries of authentication run before the profile
+        self.assertEqual(
+            len(profiled),
+            len([sql for sql in captured if 'tables_table' in sql or 'orders_order' in sql])
+        )
+        self.assertTrue(any('EXISTS' in sql for sql in profiled))
+        self.assertEqual(report['sql']['count'], len(profiled))
+        self.assertEqual(sum(statement['count'] for statement in report['sql']['by_statement']), len(profiled))
+        self.assertIsInstance(report['allocations'], list)
+
+    def test_query_flag_and_jwt_superuser(self):
+
+        access = self.client.post(
+            '/api/token/',
+            {'email': 'testadmin@email.com', 'password': 'testadminpassword'}
+        ).data['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+
+        response = self.client.get('/orders/?profile=1')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNotNone(get_profile_report(response[PROFILE_REPORT_HEADER]))
+
+    def test_other_requests_are_not_profiled(self):
+
+        self.client.force_login(self.user)
+
+        self.assertNotIn(PROFILE_REPORT_HEADER, self.client.get('/tables/', HTTP_X_PROFILE='1'))
+
+        self.client.force_login(self.admin_user)
+
+        self.assertNotIn(PROFILE_REPORT_HEADER, self.client.get('/tables/'))
+
+    def test_reports_are_superuser_only(self):
+
+        self.client.force_login(self.admin_user)
+        report_id = self.client.get('/tables/', HTTP_X_PROFILE='1')[PROFILE_REPORT_HEADER]
+
+        self.client.force_login(self.user)
+
+        self.assertEqual(self.client.get(f'/profiles/{report_id}/').status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_login(self.admin_user)
+
+        self.assertEqual(self.client.get('/profiles/unknown/').status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TrafficRecordingTest(APITestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'traffic.jsonl')
+
+        self.admin_user = User.objects.create_user(
+            email='testadmin@email.com',
+            username='testadminuser',
+            password='testadminpassword',
+            is_staff=True,
+            is_superuser=True
+        )
+        self.user = User.objects.create_user(
+            email='testuser@email.com',
+            username='testuser',
+            password='testpassword',
+        )
+
+        self.table = Table.objects.create(number=1, capacity=4)
+        self.products = [
+            Product.objects.create(name=f'Product {index}', price=Decimal('10.000'), created_by=self.admin_user)
+            for index in range(2)
+        ]
+
+    def tearDown(self):
+
+        self.directory.cleanup()
+
+    def get_entries(self):
+
+        with open(self.path) as file:
+            return [json.loads(line) for line in file]
+
+    def test_records_requests_and_created_objects(self):
+
+        with self.settings(TRAFFIC_RECORD_PATH=self.path):
+            # Middleware is loaded by the first request of a client
+            self.client = self.client_class()
+            self.client.force_authenticate(self.user)
+
+            self.client.post('/orders/', {'table': self.table.pk}, format='json')
+            order = get_active_orders_of_table(self.table).get()
+            self.client.post(
+                '/items/bulk/',
+                [{'order': order.pk, 'product': product.pk, 'quantity': 1} for product in self.products],
+                format='json'
+            )
+
+            self.client.force_authenticate(self.admin_user)
+            self.client.post(f'/orders/{order.pk}/prepare/')
+            self.client.post(
+                '/accounts/users/',
+                {'email': 'new@email.com', 'username': 'newuser', 'password': 'newpassword'},
+                format='json'
+            )
+            self.client.post('/api/token/', {'email': 'testuser@email.com', 'password': 'testpassword'})
+
+        create, bulk, prepare, create_user = self.get_entries()
+        items = OrderItem.objects.filter(order=order).order_by('pk')
+
+        self.assertEqual(create['route'], 'orders-list')
+        self.assertEqual(create['role'], 'waiter')
+        self.assertEqual(create['status'], status.HTTP_201_CREATED)
+        self.assertEqual(create['body'], {'table': self.table.pk})
+        self.assertEqual(create['created'], [['orders.order', order.pk]])
+        self.assertEqual(bulk['created'], [['order_items.orderitem', item.pk] for item in items])
+
+        self.assertEqual(prepare['route'], 'orders-prepare')
+        self.assertEqual(prepare['kwargs'], {'pk': str(order.pk)})
+        self.assertEqual(prepare['role'], 'admin')
+        self.assertNotEqual(prepare['user'], create['user'])
+
+        self.assertNotIn('new@email.com', json.dumps(create_user))
+        self.assertTrue(create_user['body']['email'].endswith('@example.com'))
+        self.assertEqual(create_user['body']['password'], anonymize({'password': 'newpassword'})['password'])
+
+    def test_not_loaded_without_a_path(self):
+
+        self.client.force_authenticate(self.user)
+        self.client.post('/orders/', {'table': self.table.pk}, format='json')
+
+        self.assertFalse(os.path.exists(self.path))
@@ -0,0 +1,175 @@
+"""
+Traffic recording for the replay_traffic command.
+
+Set TRAFFIC_RECORD_PATH to have TrafficRecordingMiddleware append one JSON
+line per API request. Each line holds the method, path, route, user role,
+timing and status, the JSON body with TRAFFIC_REDACTED_FIELDS anonymized,
+and the objects the request created. Users are identified by a salted hash
+only. With several worker processes, put `{pid}` in the path and
+concatenate the files: replay orders the requests by their start time.
+"""
+import hashlib
+import json
+import os
+import threading
+
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.models.signals import post_save
+
+from .metrics import get_route_name
+
+# Resource of a route (its url_name prefix or a segment of its pattern) to
+# the model its `pk` kwarg refers to
+ROUTE_MODELS = {
+    'orders': 'orders.order',
+    'items': 'order_items.orderitem',
+    'tables': 'tables.table',
+    'products': 'products.product',
+    'users': 'accounts.user',
+}
+
+# Body fields holding ids, e.g. `order` of an item or `ids` of a bulk
+# transition
+REFERENCE_FIELDS = {
+    'order': 'orders.order',
+    'ids': 'orders.order',
+    'table': 'tables.table',
+    'product': 'products.product',
+}
+
+created_objects = ContextVar('created_objects', default=None)
+
+
+def track_created(*instances):
+    """
+    Notes objects a recorded request created, so a replay can map their ids.
+    Saves are tracked through post_save; bulk_create calls this directly.
+    """
+    created = created_objects.get()
+
+    if created is not None:
+        created.extend([instance._meta.label_lower, instance.pk] for instance in instances)
+
+
+def track_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        track_created(instance)
+
+
+def connect_created_tracking():
+    post_save.connect(track_saved, dispatch_uid='config.traffic.track_saved')
+
+
+def get_route_model(route):
+    resource = route.split('-')[0]
+
+    if resource in ROUTE_MODELS:
+        return ROUTE_MODELS[resource]
+
+    # Unnamed routes, e.g. async/orders/<int:pk>/
+    for segment in route.split('/'):
+        if segment in ROUTE_MODELS:
+            return ROUTE_MODELS[segment]
+
+    return None
+
+
+def get_user_role(user):
+    if user is None or not user.is_authenticated:
+        return 'anonymous'
+    if user.is_superuser:
+        return 'admin'
+    if user.is_staff:
+        return 'staff'
+    return 'waiter'
+
+
+def hash_value(value):
+    return hashlib.sha256(f'{settings.SECRET_KEY}:{value}'.encode()).hexdigest()[:12]
+
+
+def get_user_key(user):
+    if user is None or not user.is_authenticated:
+        return None
+    return hash_value(f'user:{user.pk}')
+
+
+def anonymize(data):
+    """
+    Replaces the values of redacted fields with stable hashes, keeping
+    equal values equal and emails valid.
+    """
+    if isinstance(data, list):
+        return [anonymize(value) for value in data]
+
+    if not isinstance(data, dict):
+        return data
+
+    anonymized = {}
+
+    for key, value in data.items():
+        if key in settings.TRAFFIC_REDACTED_FIELDS and isinstance(value, str):
+            value = f'redacted-{hash_value(value)}' + ('@example.com' if '@' in value else '')
+        else:
+            value = anonymize(value)
+
+        anonymized[key] = value
+
+    return anonymized
+
+
+def read_json_body(request):
+    """
+    Reads the body before the view does, DRF then parses the cached copy.
+    """
+    if request.content_type != 'application/json' or not request.body:
+        return None
+
+    try:
+        return anonymize(json.loads(request.body))
+    except ValueError:
+        return None
+
+
+def is_recorded(request):
+    return not request.path.startswith(tuple(settings.TRAFFIC_RECORD_EXCLUDED_PATHS))
+
+
+def is_recorded_response(response):
+    # Event streams last as long as the client stays connected
+    return not response.get('Content-Type', '').startswith('text/event-stream')
+
+
+class TrafficRecorder:
+
+    def __init__(self, path):
+        self.path = path.format(pid=os.getpid())
+        self._lock = threading.Lock()
+        self._file = None
+
+    def write(self, request, response, body, started_at, duration, created):
+        user = getattr(request, 'user', None)
+        match = request.resolver_match
+
+        entry = {
+            'started_at': started_at,
+            'duration': duration,
+            'method': request.method,
+            'path': request.get_full_path(),
+            'route': get_route_name(request),
+            'kwargs': match.kwargs if match is not None else {},
+            'role': get_user_role(user),
+            'user': get_user_key(user),
+            'body': body,
+            'status': response.status_code,
+            'created': created,
+        }
+        line = json.dumps(entry, default=str) + '\n'
+
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, 'a', buffering=1)
+
+            self._file.write(line)
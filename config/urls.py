@@ -19,13 +19,25 @@ from django.urls import path, include
 
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
+from orders.async_views import order_detail, order_events, order_list, order_transition
+
+from .views import metrics, profile_report
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/token/', TokenObtainPairView.as_view()),
     path('api/token/refresh/', TokenRefreshView.as_view()),
+    path('metrics', metrics),
+    path('profiles/<str:report_id>/', profile_report),
     path('accounts/', include('accounts.urls')),
     path('tables/', include('tables.urls')),
+    path('orders/events/', order_events),
+    path('async/orders/', order_list),
+    path('async/orders/<int:pk>/', order_detail),
+    path('async/orders/<int:pk>/<str:transition>/', order_transition),
     path('orders/', include('orders.urls')),
     path('products/', include('products.urls')),
     path('items/', include('order_items.urls')),
+    path('reports/', include('reports.urls')),
+    path('archive/', include('archive.urls')),
 ]
@@ -0,0 +1,30 @@
+from django.http import Http404, HttpResponse
+
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.response import Response
+
+from orders.permissions import IsRestaurantAdmin
+
+from .metrics import registry, render_metrics
+from .profiling import get_profile_report
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def metrics(request):
+    return HttpResponse(
+        render_metrics(registry.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsRestaurantAdmin])
+def profile_report(request, report_id):
+    report = get_profile_report(report_id)
+
+    if report is None:
+        raise Http404
+
+    return Response(report)
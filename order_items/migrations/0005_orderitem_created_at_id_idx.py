@@ -0,0 +1,19 @@
+# Generated by Django 6.1.2 on 2026-10-18 18:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order_items', '0004_alter_orderitem_product_and_more'),
+        ('orders', '0003_order_indexes'),
+        ('products', '0004_alter_product_price'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['created_at', 'id'], name='orderitem_created_at_id_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.1.2 on 2026-10-18 19:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order_items', '0005_orderitem_created_at_id_idx'),
+        ('orders', '0004_unique_active_order_per_table'),
+        ('products', '0004_alter_product_price'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['updated_at'], name='orderitem_updated_at_idx'),
+        ),
+    ]
@@ -23,6 +23,19 @@ class OrderItem(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='orderitem_created_at_id_idx'),
+            # MAX(updated_at) of the conditional GET probes
+            models.Index(fields=['updated_at'], name='orderitem_updated_at_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['order', 'product'],
+                name='unique_product_per_order'
+            ),
+        ]
+
     @property
     def subtotal(self):
         return self.quantity * self.unit_price
\ No newline at end of file
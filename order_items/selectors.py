@@ -13,7 +13,7 @@ def get_order_items():
     return OrderItem.objects.all()
 
 def get_order_items_by_user(user: User):
-    return OrderItem.objects.filter(order__created_by=user)
+    return OrderItem.objects.filter(order__created_by_id=user.pk)
 
 def get_items_of_order(order: Order):
     return OrderItem.objects.filter(order=order)
@@ -23,3 +23,9 @@ def get_order_item(order: Order, product: Product):
         order=order,
         product=product
     ).first()
+
+def get_order_items_of_orders_and_products(order_ids, product_ids):
+    return OrderItem.objects.filter(
+        order_id__in=order_ids,
+        product_id__in=product_ids
+    )
@@ -2,6 +2,8 @@ from rest_framework import serializers
 
 from rest_framework.exceptions import ValidationError
 
+from config.serializers import RelatedPkField, ValuesSerializer
+
 from .models import OrderItem
 
 from .services import create_order_item, update_order_item_quantity
@@ -15,6 +17,8 @@ class OrderItemCreateSerializer(serializers.ModelSerializer):
             'product',
             'quantity',
         ]
+        # Repeated products are merged into the existing line by create_order_item
+        validators = []
 
     def validate_quantity(self, quantity):
         if quantity < 0:
@@ -36,10 +40,23 @@ class OrderItemCreateSerializer(serializers.ModelSerializer):
             return quantity
             
 
+class OrderItemBulkLineSerializer(serializers.Serializer):
+
+    order = serializers.IntegerField()
+    product = serializers.IntegerField()
+    quantity = serializers.IntegerField()
+
+    def validate_quantity(self, quantity):
+        if quantity <= 0:
+            raise ValidationError("Quantity must be at least 1")
+
+        return quantity
+
+
 class OrderItemDetailSerializer(serializers.ModelSerializer):
     
-    order = serializers.IntegerField(source='order.pk', read_only=True)
-    product = serializers.IntegerField(source='product.pk', read_only=True)
+    order = RelatedPkField(source='order.pk')
+    product = RelatedPkField(source='product.pk')
     product_name = serializers.ReadOnlyField()
     quantity = serializers.ReadOnlyField()
     unit_price = serializers.ReadOnlyField()
@@ -78,4 +95,6 @@ class OrderItemUpdateSerializer(serializers.ModelSerializer):
         return update_order_item_quantity(order_item, quantity)
 
 
+class OrderItemDetailValuesSerializer(ValuesSerializer):
 
+    serializer_class = OrderItemDetailSerializer
@@ -1,14 +1,29 @@
+from django.db import IntegrityError, transaction
+
+from django.db.models import F
+
+from django.utils import timezone
+
 from rest_framework.exceptions import ValidationError
 
+from config.traffic import track_created
+
+from orders.events import ORDER_ITEMS_CHANGED, publish_order_event
+
 from orders.models import Order
 
+from orders.services import update_order_totals
+
 from products.models import Product
 
 from .models import OrderItem
 
-from .selectors import get_items_of_order, get_order_item
+from .selectors import get_items_of_order, get_order_item, get_order_items_of_orders_and_products
+
+ORDER_ITEM_WRITE_ATTEMPTS = 3
 
 
+@transaction.atomic
 def create_order_item(order: Order, product: Product, quantity: int):
 
     if not order.is_active:
@@ -17,38 +32,189 @@ def create_order_item(order: Order, product: Product, quantity: int):
     if not product.is_active:
         raise ValidationError("Cannot add an inactive product to an order")
 
-    found_item = get_order_item(order, product)
+    for _ in range(ORDER_ITEM_WRITE_ATTEMPTS):
+        order_item = increment_order_item_quantity(order, product, quantity)
+
+        if order_item is not None:
+            break
+
+        try:
+            with transaction.atomic():
+                order_item = OrderItem.objects.create(
+                    order=order,
+                    product=product,
+                    product_name=product.name,
+                    unit_price=product.price,
+                    quantity=quantity
+                )
+            break
+        except IntegrityError:
+            # Another request inserted the same line first, add to it instead;
+            # if it is gone again by then, insert once more
+            continue
+    else:
+        raise ValidationError("The order item was changed by another request, try again")
+
+    update_order_totals(order, quantity, quantity * order_item.unit_price)
+
+    publish_order_event(ORDER_ITEMS_CHANGED, order.pk, order.table_id, order.status)
+
+    return order_item
+
 
-    if found_item:
-        quantity += found_item.quantity
-        found_item.quantity = quantity
-        found_item.save()
+def increment_order_item_quantity(order: Order, product: Product, quantity: int):
 
-        return found_item
+    updated = OrderItem.objects.filter(
+        order=order,
+        product=product
+    ).update(
+        quantity=F('quantity') + quantity,
+        updated_at=timezone.now()
+    )
 
-    else: 
-        return OrderItem.objects.create(
-            order=order,
-            product=product,
-            product_name=product.name,
-            unit_price=product.price,
-            quantity=quantity
-        )
+    if not updated:
+        return None
 
+    return get_order_item(order, product)
 
+
+def get_locked_quantity(order_item: OrderItem):
+    return OrderItem.objects.select_for_update().values_list(
+        'quantity', flat=True
+    ).get(pk=order_item.pk)
+
+
+@transaction.atomic
 def update_order_item_quantity(order_item: OrderItem, quantity: int):
 
     if not order_item.order.is_active:
         raise ValidationError("Cannot update an item of an inactive order")
 
+    difference = quantity - get_locked_quantity(order_item)
+
+    update_order_totals(order_item.order, difference, difference * order_item.unit_price)
+
     order_item.quantity = quantity
     order_item.save()
 
+    publish_order_event(
+        ORDER_ITEMS_CHANGED,
+        order_item.order_id,
+        order_item.order.table_id,
+        order_item.order.status
+    )
+
     return order_item
 
+@transaction.atomic
 def delete_order_item(order_item: OrderItem):
 
     if not order_item.order.is_active:
         raise ValidationError("Cannot delete an item of an inactive order")
 
-    order_item.delete()
\ No newline at end of file
+    quantity = get_locked_quantity(order_item)
+
+    update_order_totals(order_item.order, -quantity, -quantity * order_item.unit_price)
+
+    order_item.delete()
+
+    publish_order_event(
+        ORDER_ITEMS_CHANGED,
+        order_item.order_id,
+        order_item.order.table_id,
+        order_item.order.status
+    )
+
+
+def create_order_items(lines):
+
+    orders = Order.objects.in_bulk({line['order'] for line in lines})
+    products = Product.objects.in_bulk({line['product'] for line in lines})
+
+    errors = []
+    quantities = {}
+
+    for line in lines:
+        order = orders.get(line['order'])
+        product = products.get(line['product'])
+        line_errors = {}
+
+        if order is None:
+            line_errors['order'] = ['Order not found']
+        elif not order.is_active:
+            line_errors['order'] = ['Cannot assign items to an inactive order']
+
+        if product is None:
+            line_errors['product'] = ['Product not found']
+        elif not product.is_active:
+            line_errors['product'] = ['Cannot add an inactive product to an order']
+
+        errors.append(line_errors)
+
+        if not line_errors:
+            key = (order.pk, product.pk)
+            quantities[key] = quantities.get(key, 0) + line['quantity']
+
+    if any(errors):
+        raise ValidationError(errors)
+
+    for _ in range(ORDER_ITEM_WRITE_ATTEMPTS):
+        try:
+            return write_order_items(orders, products, quantities)
+        except IntegrityError:
+            # A concurrent request created one of the new lines, merge into it instead
+            continue
+
+    raise ValidationError("The order items were changed by another request, try again")
+
+
+@transaction.atomic
+def write_order_items(orders, products, quantities):
+
+    existing_items = {
+        (item.order_id, item.product_id): item
+        for item in get_order_items_of_orders_and_products(
+            {order_id for order_id, _ in quantities},
+            {product_id for _, product_id in quantities}
+        ).select_for_update()
+        if (item.order_id, item.product_id) in quantities
+    }
+
+    now = timezone.now()
+    new_items = []
+    totals = {}
+
+    for (order_id, product_id), quantity in quantities.items():
+        item = existing_items.get((order_id, product_id))
+
+        if item is None:
+            product = products[product_id]
+            item = OrderItem(
+                order=orders[order_id],
+                product=product,
+                product_name=product.name,
+                unit_price=product.price,
+                quantity=quantity
+            )
+            new_items.append(item)
+        else:
+            item.quantity = F('quantity') + quantity
+            item.updated_at = now
+
+        item_count, amount = totals.get(order_id, (0, 0))
+        totals[order_id] = (item_count + quantity, amount + quantity * item.unit_price)
+
+    OrderItem.objects.bulk_update(existing_items.values(), ['quantity', 'updated_at'])
+    OrderItem.objects.bulk_create(new_items)
+    track_created(*new_items)
+
+    for order_id, (item_count, amount) in totals.items():
+        order = orders[order_id]
+        update_order_totals(order, item_count, amount)
+        publish_order_event(ORDER_ITEMS_CHANGED, order.pk, order.table_id, order.status)
+
+    return list(
+        OrderItem.objects.filter(
+            pk__in=[item.pk for item in [*existing_items.values(), *new_items]]
+        ).order_by('pk')
+    )
@@ -1,5 +1,20 @@
+import json
+import threading
+
 from decimal import Decimal
 
+from io import StringIO
+
+from unittest.mock import patch
+
+from django.core.management import call_command
+
+from django.db import IntegrityError, OperationalError, connection
+
+from django.test import TransactionTestCase
+
+from django.test.utils import CaptureQueriesContext
+
 from rest_framework import status
 
 from django.urls import reverse
@@ -16,10 +31,12 @@ from tables.models import Table
 
 from .models import OrderItem
 
-from .services import create_order_item
+from .services import create_order_item, delete_order_item, update_order_item_quantity
 
 from .selectors import get_items_of_order
 
+from .views import OrderItemViewSet
+
 User = get_user_model()
 
 
@@ -132,6 +149,49 @@ class OrderItemTest(APITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_create_item_inserts_again_when_the_conflicting_line_is_gone(self):
+
+        self.client.force_authenticate(self.user)
+
+        create = OrderItem.objects.create
+        # The line that won the insert is deleted before this request adds to it
+        conflicts = iter([IntegrityError('UNIQUE constraint failed')])
+
+        def create_after_conflict(**kwargs):
+            for error in conflicts:
+                raise error
+            return create(**kwargs)
+
+        with patch.object(OrderItem.objects, 'create', side_effect=create_after_conflict):
+            response = self.client.post(reverse('items-list'), {
+                'order': self.orders[0].pk,
+                'product': self.products[0].pk,
+                'quantity': 4
+            })
+
+        self.orders[0].refresh_from_db()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(OrderItem.objects.get(order=self.orders[0]).quantity, 4)
+        self.assertEqual(self.orders[0].item_count, 4)
+
+    def test_create_item_gives_up_with_400_on_repeated_conflicts(self):
+
+        self.client.force_authenticate(self.user)
+
+        with patch.object(OrderItem.objects, 'create', side_effect=IntegrityError('UNIQUE constraint failed')):
+            response = self.client.post(reverse('items-list'), {
+                'order': self.orders[0].pk,
+                'product': self.products[0].pk,
+                'quantity': 4
+            })
+
+        self.orders[0].refresh_from_db()
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(OrderItem.objects.exists())
+        self.assertEqual(self.orders[0].item_count, 0)
+
     def test_modify_quantity_in_active_order(self):
 
         self.client.force_authenticate(self.admin_user)
@@ -335,7 +395,57 @@ class OrderItemTest(APITestCase):
 
         response = self.client.get(reverse('items-list'))
 
-        self.assertEqual(len(response.data), 0)
+        self.assertEqual(len(response.data['results']), 0)
+
+    def test_streamed_list_only_contains_items_of_the_user(self):
+
+        create_order_item(self.orders[0], self.products[0], 2)
+        create_order_item(self.orders[2], self.products[2], 1)
+
+        self.client.force_authenticate(self.user)
+
+        paginated = self.client.get(reverse('items-list'))
+        response = self.client.get(reverse('items-list'), {'stream': 1})
+        items = json.loads(b''.join(response.streaming_content))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['order'] for item in items], [self.orders[2].pk])
+        self.assertEqual(items, json.loads(paginated.content)['results'])
+
+    def test_values_serializer_output_is_identical_to_model_serializer(self):
+
+        create_order_item(self.orders[0], self.products[0], 2)
+        create_order_item(self.orders[2], self.products[2], 1)
+        self.products[2].delete()
+
+        self.client.force_authenticate(self.admin_user)
+
+        response = self.client.get(reverse('items-list'))
+
+        with patch.object(OrderItemViewSet, 'values_serializer_class', None):
+            baseline = self.client.get(reverse('items-list'))
+
+        self.assertEqual(response.content, baseline.content)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_item_of_deleted_product_has_no_product_key(self):
+
+        order_item = create_order_item(self.orders[0], self.products[0], 2)
+        self.products[0].delete()
+
+        self.client.force_authenticate(self.admin_user)
+
+        detail = self.client.get(reverse('items-detail', kwargs={'pk': order_item.pk}))
+        listed = self.client.get(reverse('items-list'))
+        streamed = self.client.get(reverse('items-list') + '?stream=1')
+
+        for item in [
+            detail.json(),
+            listed.json()['results'][0],
+            json.loads(b''.join(streamed.streaming_content))[0],
+        ]:
+            self.assertNotIn('product', item)
+            self.assertEqual(item['order'], self.orders[0].pk)
 
     def test_list_order_items_by_unauthenticated_user(self):
 
@@ -389,3 +499,252 @@ class OrderItemTest(APITestCase):
 
         
 
+
+    def test_order_totals_follow_item_changes(self):
+
+        order = self.orders[0]
+
+        first_item = create_order_item(order=order, product=self.products[0], quantity=2)
+        create_order_item(order=order, product=self.products[2], quantity=1)
+        create_order_item(order=order, product=self.products[0], quantity=1)
+
+        order.refresh_from_db()
+
+        self.assertEqual(order.item_count, 4)
+        self.assertEqual(order.total, Decimal('38.000'))
+
+        first_item.refresh_from_db()
+        update_order_item_quantity(first_item, 1)
+
+        order.refresh_from_db()
+
+        self.assertEqual(order.item_count, 2)
+        self.assertEqual(order.total, Decimal('18.000'))
+
+        delete_order_item(first_item)
+
+        order.refresh_from_db()
+
+        self.assertEqual(order.item_count, 1)
+        self.assertEqual(order.total, Decimal('8.000'))
+
+    def test_order_totals_are_returned_by_order_detail(self):
+
+        self.client.force_authenticate(self.admin_user)
+
+        create_order_item(order=self.orders[0], product=self.products[0], quantity=3)
+
+        response = self.client.get(reverse('orders-detail', kwargs={'pk': self.orders[0].pk}))
+
+        self.assertEqual(response.data['item_count'], 3)
+        self.assertEqual(response.data['total'], '30.000')
+
+    def test_recompute_order_totals_command(self):
+
+        order = self.orders[0]
+
+        create_order_item(order=order, product=self.products[0], quantity=2)
+        create_order_item(order=order, product=self.products[2], quantity=3)
+
+        Order.objects.update(item_count=0, total=0)
+
+        call_command('recompute_order_totals', batch_size=1, stdout=StringIO())
+
+        order.refresh_from_db()
+        self.orders[2].refresh_from_db()
+
+        self.assertEqual(order.item_count, 5)
+        self.assertEqual(order.total, Decimal('44.000'))
+        self.assertEqual(self.orders[2].item_count, 0)
+
+
+class OrderItemConcurrencyTest(TransactionTestCase):
+
+    THREADS = 8
+    ADDS_PER_THREAD = 5
+
+    def setUp(self):
+
+        user = User.objects.create_user(
+            email='testuser@email.com',
+            username='testuser',
+            password='testuserpassword',
+        )
+
+        table = Table.objects.create(number=1, capacity=4)
+
+        self.order = Order.objects.create(table=table, created_by=user)
+
+        self.product = Product.objects.create(
+            name='chuleta de cerdo',
+            price=Decimal('10.000'),
+        )
+
+    def add_item(self, barrier):
+
+        order = Order.objects.get(pk=self.order.pk)
+        product = Product.objects.get(pk=self.product.pk)
+
+        barrier.wait()
+
+        try:
+            for _ in range(self.ADDS_PER_THREAD):
+                while True:
+                    try:
+                        create_order_item(order, product, 1)
+                        break
+                    except OperationalError as error:
+                        # SQLite serializes writers by failing with "locked"
+                        if 'locked' not in str(error):
+                            raise
+        finally:
+            connection.close()
+
+    def test_concurrent_adds_of_the_same_product_lose_no_increments(self):
+
+        barrier = threading.Barrier(self.THREADS)
+        threads = [
+            threading.Thread(target=self.add_item, args=(barrier,))
+            for _ in range(self.THREADS)
+        ]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        expected_quantity = self.THREADS * self.ADDS_PER_THREAD
+
+        items = get_items_of_order(self.order)
+        self.order.refresh_from_db()
+
+        self.assertEqual(len(items), 1)
+        self.assertEqual(items[0].quantity, expected_quantity)
+        self.assertEqual(self.order.item_count, expected_quantity)
+        self.assertEqual(self.order.total, expected_quantity * Decimal('10.000'))
+
+
+class OrderItemBulkTest(APITestCase):
+
+    def setUp(self):
+
+        self.user = User.objects.create_user(
+            email='testuser@email.com',
+            username='testuser',
+            password='testuserpassword',
+        )
+
+        self.client.force_authenticate(self.user)
+
+        self.order = Order.objects.create(
+            table=Table.objects.create(number=1, capacity=8),
+            created_by=self.user
+        )
+
+        self.paid_order = Order.objects.create(
+            table=Table.objects.create(number=2, capacity=8),
+            created_by=self.user,
+            status=OrderStatus.PAID
+        )
+
+        self.products = [
+            Product.objects.create(name=f'plato {number}', price=Decimal('5.000'))
+            for number in range(8)
+        ]
+
+        self.inactive_product = Product.objects.create(
+            name='coca cola 500 Ml',
+            price=Decimal('7.000'),
+            is_active=False
+        )
+
+    def test_bulk_create_merges_duplicates_and_existing_lines(self):
+
+        create_order_item(order=self.order, product=self.products[0], quantity=2)
+
+        lines = [
+            {'order': self.order.pk, 'product': self.products[0].pk, 'quantity': 1},
+            {'order': self.order.pk, 'product': self.products[1].pk, 'quantity': 2},
+            {'order': self.order.pk, 'product': self.products[1].pk, 'quantity': 3},
+        ]
+
+        response = self.client.post(reverse('items-bulk'), lines, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            {item['product']: item['quantity'] for item in response.data},
+            {self.products[0].pk: 3, self.products[1].pk: 5}
+        )
+
+        self.order.refresh_from_db()
+
+        self.assertEqual(get_items_of_order(self.order).count(), 2)
+        self.assertEqual(self.order.item_count, 8)
+        self.assertEqual(self.order.total, Decimal('40.000'))
+
+    def test_bulk_create_query_count_does_not_grow_with_lines(self):
+
+        lines = [
+            {'order': self.order.pk, 'product': product.pk, 'quantity': 1}
+            for product in self.products
+        ]
+
+        create_order_item(order=self.order, product=self.products[0], quantity=1)
+
+        with CaptureQueriesContext(connection) as few_lines:
+            self.client.post(reverse('items-bulk'), lines[:2], format='json')
+
+        with CaptureQueriesContext(connection) as many_lines:
+            response = self.client.post(reverse('items-bulk'), lines, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(many_lines), len(few_lines))
+
+    def test_bulk_create_reports_errors_per_line_and_writes_nothing(self):
+
+        lines = [
+            {'order': self.order.pk, 'product': self.products[0].pk, 'quantity': 1},
+            {'order': self.paid_order.pk, 'product': self.products[1].pk, 'quantity': 1},
+            {'order': self.order.pk, 'product': self.inactive_product.pk, 'quantity': 1},
+            {'order': self.order.pk, 'product': 9999, 'quantity': 1},
+        ]
+
+        response = self.client.post(reverse('items-bulk'), lines, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertEqual(response.data[1]['order'][0], 'Cannot assign items to an inactive order')
+        self.assertEqual(response.data[2]['product'][0], 'Cannot add an inactive product to an order')
+        self.assertEqual(response.data[3]['product'][0], 'Product not found')
+        self.assertEqual(get_items_of_order(self.order).count(), 0)
+
+    def test_bulk_create_rejects_more_than_500_lines(self):
+
+        lines = [{'order': self.order.pk, 'product': self.products[0].pk, 'quantity': 1}] * 501
+
+        response = self.client.post(reverse('items-bulk'), lines, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(get_items_of_order(self.order).count(), 0)
+
+    def test_bulk_create_gives_up_with_400_on_repeated_conflicts(self):
+
+        lines = [{'order': self.order.pk, 'product': self.products[0].pk, 'quantity': 1}]
+
+        with patch('order_items.services.write_order_items', side_effect=IntegrityError('UNIQUE constraint failed')):
+            response = self.client.post(reverse('items-bulk'), lines, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_create_validates_quantity_per_line(self):
+
+        lines = [
+            {'order': self.order.pk, 'product': self.products[0].pk, 'quantity': 1},
+            {'order': self.order.pk, 'product': self.products[1].pk, 'quantity': 0},
+        ]
+
+        response = self.client.post(reverse('items-bulk'), lines, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[1]['quantity'][0], 'Quantity must be at least 1')
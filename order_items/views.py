@@ -1,19 +1,34 @@
+from rest_framework import status
+
+from rest_framework.decorators import action
+
 from rest_framework.permissions import IsAuthenticated
 
+from rest_framework.response import Response
+
 from rest_framework.viewsets import ModelViewSet
 
+from config.mixins import ConditionalGetMixin, ReplicaListMixin, StreamingListMixin
+
 from .models import OrderItem
 
-from .services import delete_order_item
+from .services import create_order_items, delete_order_item
 
 from .selectors import get_order_items, get_order_items_by_user
 
-from .serializers import OrderItemCreateSerializer, OrderItemDetailSerializer, OrderItemUpdateSerializer
+from .serializers import (
+    OrderItemBulkLineSerializer,
+    OrderItemCreateSerializer,
+    OrderItemDetailSerializer,
+    OrderItemDetailValuesSerializer,
+    OrderItemUpdateSerializer,
+)
 
 
-class OrderItemViewSet(ModelViewSet):
+class OrderItemViewSet(ReplicaListMixin, ConditionalGetMixin, StreamingListMixin, ModelViewSet):
 
     permission_classes = [IsAuthenticated]
+    values_serializer_class = OrderItemDetailValuesSerializer
 
     def get_queryset(self):
         user = self.request.user
@@ -27,11 +42,23 @@ class OrderItemViewSet(ModelViewSet):
             return OrderItemCreateSerializer
         if self.action in ['update', 'partial_update']:
             return OrderItemUpdateSerializer
+        if self.action == 'bulk':
+            return OrderItemBulkLineSerializer
         return OrderItemDetailSerializer
 
     def perform_destroy(self, instance: OrderItem):
         delete_order_item(instance)
 
+    @action(methods=['POST'], detail=False)
+    def bulk(self, request):
+        serializer = self.get_serializer(data=request.data, many=True, allow_empty=False, max_length=500)
+        serializer.is_valid(raise_exception=True)
+
+        order_items = create_order_items(serializer.validated_data)
+
+        serializer = OrderItemDetailSerializer(order_items, many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
 
         
     
@@ -0,0 +1,233 @@
+import asyncio
+import json
+
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+
+from django.contrib.auth.models import AnonymousUser
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+
+from rest_framework import status
+
+from rest_framework.exceptions import APIException, NotFound, ValidationError
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from config.routers import is_primary_pinned, replica_reads
+
+from tables.models import Table
+
+from .events import broker
+
+from .models import Order
+
+from .selectors import get_orders
+
+from .serializers import OrderDetailSerializer
+
+from .services import (
+    acancel_order,
+    acreate_order,
+    adeliver,
+    amark_ready,
+    apay_order,
+    astart_preparation,
+)
+
+
+EVENT_STREAM_KEEPALIVE_SECONDS = 15
+
+RESET_EVENT = 'event: reset\ndata: {}\n\n'
+
+ORDER_TRANSITIONS = {
+    'prepare': astart_preparation,
+    'ready': amark_ready,
+    'deliver': adeliver,
+    'pay': apay_order,
+    'cancel': acancel_order,
+}
+
+
+def get_api_user(request):
+    api_request = Request(
+        request,
+        authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    )
+
+    try:
+        return api_request.user
+    except APIException:
+        return AnonymousUser()
+
+
+def api_response(data, status_code=status.HTTP_200_OK):
+    return JsonResponse(data, status=status_code, encoder=JSONEncoder, safe=False)
+
+
+def api_exception_response(exception: APIException):
+    data = exception.detail
+
+    if not isinstance(data, (list, dict)):
+        data = {'detail': data}
+
+    return api_response(data, exception.status_code)
+
+
+def async_api_view(methods):
+    """
+    Async counterpart of DRF's @api_view for the ASGI code path: authenticates
+    with DEFAULT_AUTHENTICATION_CLASSES (CSRF included for session users),
+    requires an authenticated user and renders APIExceptions like DRF does.
+    """
+    def decorator(view):
+
+        @csrf_exempt
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return api_response(
+                    {'detail': f'Method "{request.method}" not allowed.'},
+                    status.HTTP_405_METHOD_NOT_ALLOWED
+                )
+
+            request.user = await sync_to_async(get_api_user)(request)
+
+            if not request.user.is_authenticated:
+                return api_response(
+                    {'detail': 'Authentication credentials were not provided.'},
+                    status.HTTP_403_FORBIDDEN
+                )
+
+            try:
+                return await view(request, *args, **kwargs)
+            except APIException as exception:
+                return api_exception_response(exception)
+
+        return wrapper
+
+    return decorator
+
+
+async def get_order_or_404(pk):
+    try:
+        return await get_orders().aget(pk=pk)
+    except Order.DoesNotExist:
+        raise NotFound('No Order matches the given query.')
+
+
+@async_api_view(['GET', 'POST'])
+async def order_list(request):
+    if request.method == 'POST':
+        return await create_order(request)
+
+    paginator = api_settings.DEFAULT_PAGINATION_CLASS()
+
+    with replica_reads(not is_primary_pinned(request.user)):
+        page = await paginator.apaginate_queryset(get_orders(), Request(request))
+
+    serializer = OrderDetailSerializer(page, many=True)
+
+    return api_response(paginator.get_paginated_data(serializer.data))
+
+
+async def create_order(request):
+    try:
+        table_id = int(json.loads(request.body or b'{}').get('table'))
+    except (TypeError, ValueError, AttributeError):
+        raise ValidationError({'table': ['A valid integer is required.']})
+
+    try:
+        table = await Table.objects.aget(pk=table_id)
+    except Table.DoesNotExist:
+        raise ValidationError({'table': [f'Invalid pk "{table_id}" - object does not exist.']})
+
+    order = await acreate_order(table, request.user)
+
+    return api_response({'table': order.table_id}, status.HTTP_201_CREATED)
+
+
+@async_api_view(['GET'])
+async def order_detail(request, pk):
+    order = await get_order_or_404(pk)
+
+    return api_response(OrderDetailSerializer(order).data)
+
+
+@async_api_view(['POST'])
+async def order_transition(request, pk, transition):
+    change_status = ORDER_TRANSITIONS.get(transition)
+
+    if change_status is None:
+        raise NotFound(f'Unknown transition "{transition}".')
+
+    order = await get_order_or_404(pk)
+
+    await change_status(order)
+
+    return api_response(OrderDetailSerializer(order).data)
+
+
+async def order_event_stream(statuses, table, last_event_id):
+    subscription, replay = broker.subscribe(last_event_id)
+
+    try:
+        yield 'retry: 3000\n\n'
+
+        if replay is None:
+            # The requested position is gone, the client must reload its state
+            yield RESET_EVENT
+            replay = []
+
+        for event in replay:
+            if event.matches(statuses, table):
+                yield event.encode()
+
+        while True:
+            try:
+                event = await asyncio.wait_for(
+                    subscription.get(),
+                    timeout=EVENT_STREAM_KEEPALIVE_SECONDS
+                )
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+
+            if subscription.overflowed:
+                yield RESET_EVENT
+                break
+
+            if event.matches(statuses, table):
+                yield event.encode()
+    finally:
+        subscription.close()
+
+
+@async_api_view(['GET'])
+async def order_events(request):
+    """
+    Server-Sent Events stream of order created, status changed and items
+    changed events. Filter with `?status=READY&status=DELIVERED` and
+    `?table=<id>`; resume with the `Last-Event-ID` header (or the
+    `last_event_id` query parameter for clients that cannot set headers).
+    """
+    statuses = set(request.GET.getlist('status'))
+    table = request.GET.get('table')
+
+    if table is not None:
+        if not table.isdigit():
+            raise ValidationError({'table': ['A valid integer is required.']})
+        table = int(table)
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+
+    response = StreamingHttpResponse(
+        order_event_stream(statuses, table, last_event_id),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+
+    return response
@@ -0,0 +1,161 @@
+import asyncio
+import json
+import threading
+import uuid
+
+from collections import deque
+from dataclasses import dataclass, field
+from functools import partial
+
+from django.db import transaction
+
+
+ORDER_CREATED = 'order.created'
+ORDER_STATUS_CHANGED = 'order.status_changed'
+ORDER_ITEMS_CHANGED = 'order.items_changed'
+
+
+@dataclass(frozen=True)
+class OrderEvent:
+
+    id: str
+    type: str
+    data: dict = field(default_factory=dict)
+
+    def matches(self, statuses=None, table=None):
+        if statuses and self.data.get('status') not in statuses:
+            return False
+        if table is not None and self.data.get('table') != table:
+            return False
+        return True
+
+    def encode(self):
+        return (
+            f'id: {self.id}\n'
+            f'event: {self.type}\n'
+            f'data: {json.dumps(self.data)}\n\n'
+        )
+
+
+class OrderEventSubscription:
+
+    """
+    Receives events published from any thread into the subscriber's event loop.
+    """
+
+    def __init__(self, broker, loop, max_pending):
+        self.broker = broker
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_pending)
+        self.overflowed = False
+
+    def put(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self._put_nowait, event)
+        except RuntimeError:
+            # The subscriber's loop already closed
+            self.close()
+
+    def _put_nowait(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A stalled client; the stream tells it to resync instead of growing forever
+            self.overflowed = True
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class OrderEventBroker:
+
+    """
+    In-process fan-out of order events to SSE subscribers.
+
+    Keeps the last `history_size` events so a reconnecting client can resume
+    from `Last-Event-ID`. Event ids carry a per-process epoch, so an id issued
+    before a restart (or by another process) is detected and the client is
+    told to reload instead of silently missing events. Every process has its
+    own broker: run the event stream on a single ASGI worker, or put a shared
+    broker behind `publish` when scaling out.
+    """
+
+    def __init__(self, history_size=1000, max_pending=1000):
+        self.epoch = uuid.uuid4().hex[:8]
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._history = deque(maxlen=history_size)
+        self._sequence = 0
+        self._subscribers = set()
+
+    @property
+    def last_event_id(self):
+        return f'{self.epoch}-{self._sequence}'
+
+    def publish(self, event_type, data):
+        with self._lock:
+            self._sequence += 1
+            event = OrderEvent(f'{self.epoch}-{self._sequence}', event_type, data)
+            self._history.append((self._sequence, event))
+            subscribers = list(self._subscribers)
+
+        for subscriber in subscribers:
+            subscriber.put(event)
+
+        return event
+
+    def subscribe(self, last_event_id=None):
+        """
+        Returns the subscription and the events to replay first. The replay is
+        None when `last_event_id` can no longer be resumed from.
+        """
+        subscription = OrderEventSubscription(
+            self,
+            asyncio.get_running_loop(),
+            self.max_pending
+        )
+
+        with self._lock:
+            self._subscribers.add(subscription)
+            replay = self._get_events_after(last_event_id)
+
+        return subscription, replay
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def _get_events_after(self, last_event_id):
+        if not last_event_id:
+            return []
+
+        epoch, _, sequence = last_event_id.partition('-')
+
+        if epoch != self.epoch or not sequence.isdigit():
+            return None
+
+        sequence = int(sequence)
+        oldest = self._history[0][0] if self._history else self._sequence + 1
+
+        if sequence > self._sequence or sequence < oldest - 1:
+            return None
+
+        return [event for event_sequence, event in self._history if event_sequence > sequence]
+
+
+broker = OrderEventBroker()
+
+
+def get_order_event_data(order_id, table_id, status, **extra):
+    return {'order': order_id, 'table': table_id, 'status': status, **extra}
+
+def publish_order_event(event_type, order_id, table_id, status, **extra):
+    data = get_order_event_data(order_id, table_id, status, **extra)
+    transaction.on_commit(partial(broker.publish, event_type, data))
+
+def publish_committed_order_event(event_type, order_id, table_id, status, **extra):
+    # For writes that already autocommitted, e.g. from the async ORM
+    broker.publish(event_type, get_order_event_data(order_id, table_id, status, **extra))
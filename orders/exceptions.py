@@ -0,0 +1,14 @@
+from rest_framework import status
+
+from rest_framework.exceptions import APIException
+
+
+class OrderStatusConflict(APIException):
+
+    """
+    The order is not in a status the requested transition can start from.
+    """
+
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'The order status changed, reload it and try again.'
+    default_code = 'order_status_conflict'
@@ -0,0 +1,22 @@
+import math
+
+from django.test.utils import setup_test_environment
+
+PERCENTILES = [('p50', 0.50), ('p95', 0.95), ('p99', 0.99)]
+
+
+def percentile(values, fraction):
+    # Nearest rank
+    values = sorted(values)
+    return values[max(0, math.ceil(len(values) * fraction) - 1)]
+
+def split(requests, clients):
+    # As even as possible, the first clients take the remainder
+    return [
+        requests // clients + (1 if index < requests % clients else 0)
+        for index in range(clients)
+    ]
+
+def allow_test_clients():
+    # Lets the test clients' `testserver` host through ALLOWED_HOSTS
+    setup_test_environment()
@@ -0,0 +1,356 @@
+import json
+import statistics
+import time
+
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import datetime, timezone
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from rest_framework.test import APIClient
+
+from accounts.tokens import ClaimsRefreshToken
+
+from order_items.models import OrderItem
+
+from orders.management.benchmarking import PERCENTILES, allow_test_clients, percentile, split
+
+from orders.models import Order, OrderStatus
+from orders.selectors import get_active_orders_of_table
+
+from products.models import Product
+
+from tables.models import Table
+from tables.selectors import get_available_tables
+
+from .seed_restaurant import SEED_ADMIN_USERNAME
+
+
+User = get_user_model()
+
+READ_ENDPOINTS = [
+    ('tables-list', '/tables/'),
+    ('tables-available', '/tables/available/'),
+    ('tables-floor', '/tables/floor/'),
+    ('tables-detail', '/tables/{table}/'),
+    ('products-list', '/products/'),
+    ('products-active', '/products/active/'),
+    ('products-detail', '/products/{product}/'),
+    ('orders-list', '/orders/'),
+    ('orders-detail', '/orders/{order}/'),
+    ('async-orders-list', '/async/orders/'),
+    ('items-list', '/items/'),
+    ('items-detail', '/items/{item}/'),
+    ('users-list', '/accounts/users/'),
+]
+
+
+class QueryCounter:
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+
+    help = (
+        'Drives every viewset endpoint and order transition with concurrent '
+        'clients against the current database (see seed_restaurant) and '
+        'reports throughput, latency percentiles and queries per request. '
+        'Read endpoints run one at a time; the order lifecycle and the '
+        'activate / deactivate actions run as scenarios whose steps share '
+        'the scenario wall time. The lifecycle adds paid and cancelled '
+        'orders. --save writes the results as a JSON baseline, --compare '
+        'fails on regressions against one.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', default=SEED_ADMIN_USERNAME, help='Username of a superuser to run as')
+        parser.add_argument('--clients', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=200, help='Requests per read endpoint')
+        parser.add_argument('--cycles', type=int, default=60, help='Order lifecycles to run')
+        parser.add_argument('--endpoints', nargs='+', help='Only run these endpoints / scenarios')
+        parser.add_argument('--save', metavar='PATH', help='Write the results as a JSON baseline')
+        parser.add_argument('--compare', metavar='PATH', help='Compare the results with a JSON baseline')
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.15,
+            help='Relative throughput drop or p95 rise counted as a regression'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            self.user = User.objects.get(username=options['user'], is_superuser=True)
+        except User.DoesNotExist:
+            raise CommandError(f"Superuser {options['user']} does not exist, run seed_restaurant first")
+
+        allow_test_clients()
+
+        self.access = str(ClaimsRefreshToken.for_user(self.user).access_token)
+        self.clients = options['clients']
+        self.selected = set(options['endpoints'] or [])
+        self.results = {}
+
+        # Taken first, the lifecycle adds orders
+        meta = self.get_meta(options)
+
+        self.run_reads(options['requests'])
+        self.run_scenario('lifecycle', options['cycles'], self.run_lifecycle)
+        self.run_scenario('toggles', options['requests'], self.run_toggles)
+
+        report = {
+            'meta': meta,
+            'endpoints': {name: self.summarize(result) for name, result in self.results.items()},
+        }
+
+        self.print_report(report)
+
+        if options['save']:
+            with open(options['save'], 'w') as file:
+                json.dump(report, file, indent=2)
+
+            self.stdout.write(f"Baseline saved to {options['save']}")
+
+        if options['compare']:
+            with open(options['compare']) as file:
+                self.compare(report, json.load(file), options['threshold'])
+
+    def is_selected(self, name):
+        return not self.selected or name in self.selected
+
+    def get_client(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+        return client
+
+    def get_meta(self, options):
+        return {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'clients': self.clients,
+            'requests': options['requests'],
+            'cycles': options['cycles'],
+            'dataset': {
+                'tables': Table.objects.count(),
+                'products': Product.objects.count(),
+                'orders': Order.objects.count(),
+                'items': OrderItem.objects.count(),
+            },
+        }
+
+    def run_concurrently(self, counts, work):
+        """
+        Runs work(request, index, count) in one thread per client, where
+        request() sends one request and records its latency and queries
+        under a name, then merges the records of all clients.
+        """
+        def worker(index, count):
+            client = self.get_client()
+            counter = QueryCounter()
+            recorded = defaultdict(lambda: {'latencies': [], 'queries': []})
+
+            def request(name, method, path, data=None, expected=200):
+                before = counter.count
+                started = time.perf_counter()
+                response = getattr(client, method)(path, data, format='json')
+                elapsed = time.perf_counter() - started
+
+                if response.status_code != expected:
+                    raise CommandError(f'{method.upper()} {path} returned {response.status_code}')
+
+                recorded[name]['latencies'].append(elapsed)
+                recorded[name]['queries'].append(counter.count - before)
+                return response
+
+            try:
+                with ExitStack() as stack:
+                    for alias in connections:
+                        stack.enter_context(connections[alias].execute_wrapper(counter))
+
+                    work(request, index, count)
+            finally:
+                connections.close_all()
+
+            return recorded
+
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=len(counts)) as executor:
+            batches = list(executor.map(worker, range(len(counts)), counts))
+
+        elapsed = time.perf_counter() - started
+
+        for batch in batches:
+            for name, recorded in batch.items():
+                result = self.results.setdefault(name, {'elapsed': elapsed, 'latencies': [], 'queries': []})
+                result['latencies'].extend(recorded['latencies'])
+                result['queries'].extend(recorded['queries'])
+
+    def run_reads(self, requests):
+        ids = {
+            'table': Table.objects.values_list('pk', flat=True).first(),
+            'product': Product.objects.values_list('pk', flat=True).first(),
+            'order': Order.objects.values_list('pk', flat=True).first(),
+            'item': OrderItem.objects.values_list('pk', flat=True).first(),
+        }
+
+        if None in ids.values():
+            raise CommandError('The database has no orders, run seed_restaurant first')
+
+        warmup = self.get_client()
+
+        for name, path in READ_ENDPOINTS:
+            if not self.is_selected(name):
+                continue
+
+            path = path.format(**ids)
+            warmup.get(path)
+
+            def work(request, index, count, name=name, path=path):
+                for _ in range(count):
+                    request(name, 'get', path)
+
+            self.run_concurrently(split(requests, self.clients), work)
+
+    def run_scenario(self, name, repeat, run):
+        """
+        Runs a scenario `repeat` times across the clients, each client on its
+        own free table and three active products.
+        """
+        if not self.is_selected(name) or not repeat:
+            return
+
+        tables = list(get_available_tables().values_list('pk', flat=True)[:self.clients])
+        products = list(Product.objects.filter(is_active=True).values_list('pk', flat=True)[:self.clients * 3])
+
+        if len(tables) < self.clients or len(products) < self.clients * 3:
+            raise CommandError(f'Not enough free tables or active products for {self.clients} clients')
+
+        def work(request, index, count):
+            run(request, count, tables[index], products[index * 3:(index + 1) * 3])
+
+        self.run_concurrently(split(repeat, self.clients), work)
+
+    def run_lifecycle(self, request, cycles, table, products):
+        first, second, third = products
+
+        for cycle in range(cycles):
+            request('orders-create', 'post', '/orders/', {'table': table}, expected=201)
+            # Create responses only echo the posted fields
+            order = get_active_orders_of_table(table).values_list('pk', flat=True).get()
+
+            # Every third order is cancelled, half of them through the bulk action
+            if cycle % 3 == 1:
+                request('orders-cancel', 'post', f'/orders/{order}/cancel/')
+                continue
+
+            if cycle % 3 == 2:
+                request(
+                    'orders-transition',
+                    'post',
+                    '/orders/transition/',
+                    {'ids': [order], 'status': OrderStatus.CANCELLED}
+                )
+                continue
+
+            request(
+                'items-create',
+                'post',
+                '/items/',
+                {'order': order, 'product': first, 'quantity': 1},
+                expected=201
+            )
+            item = OrderItem.objects.values_list('pk', flat=True).get(order_id=order, product_id=first)
+            request(
+                'items-bulk',
+                'post',
+                '/items/bulk/',
+                [
+                    {'order': order, 'product': second, 'quantity': 2},
+                    {'order': order, 'product': third, 'quantity': 1},
+                ],
+                expected=201
+            )
+            request('items-update', 'patch', f'/items/{item}/', {'quantity': 3})
+
+            for transition in ['prepare', 'ready', 'deliver', 'pay']:
+                request(f'orders-{transition}', 'post', f'/orders/{order}/{transition}/')
+
+    def run_toggles(self, request, count, table, products):
+        product = products[0]
+
+        for _ in range(count):
+            request('tables-deactivate', 'post', f'/tables/{table}/deactivate/')
+            request('tables-activate', 'post', f'/tables/{table}/activate/')
+            request('products-deactivate', 'post', f'/products/{product}/deactivate/')
+            request('products-activate', 'post', f'/products/{product}/activate/')
+
+    def summarize(self, result):
+        latencies = result['latencies']
+        summary = {
+            'requests': len(latencies),
+            'throughput': len(latencies) / result['elapsed'],
+            'queries': statistics.mean(result['queries']),
+        }
+
+        for name, fraction in PERCENTILES:
+            summary[name] = percentile(latencies, fraction) * 1000
+
+        return summary
+
+    def print_report(self, report):
+        meta = report['meta']
+        dataset = ', '.join(f'{count} {name}' for name, count in meta['dataset'].items())
+
+        self.stdout.write(f"{meta['clients']} concurrent clients on {dataset}")
+        self.stdout.write(
+            f"{'endpoint':<20} {'requests':>8} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8}"
+        )
+
+        for name, summary in report['endpoints'].items():
+            self.stdout.write(
+                f"{name:<20} {summary['requests']:>8} {summary['throughput']:>9.1f} "
+                f"{summary['p50']:>8.2f} {summary['p95']:>8.2f} {summary['p99']:>8.2f} {summary['queries']:>8.1f}"
+            )
+
+    def compare(self, report, baseline, threshold):
+        dataset, baseline_dataset = report['meta']['dataset'], baseline['meta']['dataset']
+
+        if any(abs(dataset[name] - baseline_dataset.get(name, 0)) > 0.01 * dataset[name] for name in dataset):
+            self.stdout.write(self.style.WARNING(
+                f'The baseline ran on another dataset: {baseline_dataset}'
+            ))
+
+        self.stdout.write(f"{'endpoint':<20} {'req/s':>9} {'p95':>9} {'queries':>9}")
+        regressions = []
+
+        for name, summary in report['endpoints'].items():
+            before = baseline['endpoints'].get(name)
+
+            if before is None:
+                self.stdout.write(f'{name:<20} not in the baseline')
+                continue
+
+            throughput = summary['throughput'] / before['throughput'] - 1
+            p95 = summary['p95'] / before['p95'] - 1
+            queries = summary['queries'] - before['queries']
+
+            regressed = throughput < -threshold or p95 > threshold or queries > 0
+            line = f'{name:<20} {throughput:>+9.1%} {p95:>+9.1%} {queries:>+9.1f}'
+
+            if regressed:
+                regressions.append(name)
+                line = self.style.ERROR(f'{line}  regression')
+
+            self.stdout.write(line)
+
+        if regressions:
+            raise CommandError(f"Regressions against the baseline: {', '.join(regressions)}")
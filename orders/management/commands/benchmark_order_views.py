@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client
+
+from orders.management.benchmarking import allow_test_clients, percentile, split
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+
+    help = (
+        'Compares requests per second and latency of the sync order viewset '
+        '(WSGI handler, one thread per client) with the async order views '
+        '(ASGI handler, one event loop) under concurrent clients'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', required=True, help='Username the clients log in as')
+        parser.add_argument('--clients', type=int, default=20)
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--sync-path', default='/orders/')
+        parser.add_argument('--async-path', default='/async/orders/')
+
+    def handle(self, *args, **options):
+        try:
+            self.user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']} does not exist")
+
+        allow_test_clients()
+
+        clients = options['clients']
+        requests = options['requests']
+
+        results = [
+            ('sync (WSGI)', self.run_sync(options['sync_path'], clients, requests)),
+            ('async (ASGI)', asyncio.run(self.run_async(options['async_path'], clients, requests))),
+        ]
+
+        self.stdout.write(f'{clients} concurrent clients, {requests} requests each path')
+
+        for name, (elapsed, latencies) in results:
+            self.stdout.write(self.format_result(name, elapsed, latencies))
+
+    def run_sync(self, path, clients, requests):
+        def worker(count):
+            client = Client()
+            client.force_login(self.user)
+            latencies = []
+
+            for _ in range(count):
+                started = time.perf_counter()
+                response = client.get(path)
+                latencies.append(time.perf_counter() - started)
+                self.check_response(path, response)
+
+            return latencies
+
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=clients) as executor:
+            batches = list(executor.map(worker, split(requests, clients)))
+
+        return time.perf_counter() - started, [latency for batch in batches for latency in batch]
+
+    async def run_async(self, path, clients, requests):
+        async def worker(count):
+            client = AsyncClient()
+            await client.aforce_login(self.user)
+            latencies = []
+
+            for _ in range(count):
+                started = time.perf_counter()
+                response = await client.get(path)
+                latencies.append(time.perf_counter() - started)
+                self.check_response(path, response)
+
+            return latencies
+
+        started = time.perf_counter()
+        batches = await asyncio.gather(*(worker(count) for count in split(requests, clients)))
+
+        return time.perf_counter() - started, [latency for batch in batches for latency in batch]
+
+    def check_response(self, path, response):
+        if response.status_code != 200:
+            raise CommandError(f'GET {path} returned {response.status_code}')
+
+    def format_result(self, name, elapsed, latencies):
+        p50 = percentile(latencies, 0.50)
+        p99 = percentile(latencies, 0.99)
+
+        return (
+            f'{name:<14} {len(latencies) / elapsed:8.1f} req/s  '
+            f'p50 {p50 * 1000:7.2f} ms  p99 {p99 * 1000:7.2f} ms'
+        )
@@ -0,0 +1,128 @@
+import time
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+
+from order_items.models import OrderItem
+from order_items.selectors import get_order_items
+from order_items.serializers import OrderItemDetailSerializer, OrderItemDetailValuesSerializer
+
+from orders.models import Order, OrderStatus
+from orders.selectors import get_orders
+from orders.serializers import OrderDetailSerializer, OrderDetailValuesSerializer
+
+from products.models import Product
+from products.selectors import get_products
+from products.serializers import ProductDetailSerializer, ProductDetailValuesSerializer
+
+from tables.models import Table
+from tables.selectors import get_tables
+from tables.serializers import TableDetailSerializer, TableDetailValuesSerializer
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+
+    help = (
+        'Reports rows per second of each list serializer: the DRF ModelSerializer '
+        'on model instances against its ValuesSerializer on .values() rows. '
+        'Seeds the rows in a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+
+        with transaction.atomic():
+            self.seed(rows)
+
+            self.stdout.write(
+                f"{'serializer':<36} {'fetch+serialize':>17} {'serialize only':>16}"
+            )
+
+            for name, queryset, serializer_class, values_serializer_class in self.get_cases():
+                self.report(
+                    name,
+                    options['repeat'],
+                    queryset,
+                    lambda rows: serializer_class(rows, many=True).data,
+                    values_serializer_class.get_values_queryset(queryset),
+                    lambda rows: values_serializer_class(rows).data,
+                )
+
+            transaction.set_rollback(True)
+
+    def get_cases(self):
+        # Relations are joined up front so DRF is measured without N+1 queries
+        return [
+            ('OrderItemDetailSerializer', get_order_items(), OrderItemDetailSerializer, OrderItemDetailValuesSerializer),
+            ('OrderDetailSerializer', get_orders(), OrderDetailSerializer, OrderDetailValuesSerializer),
+            ('ProductDetailSerializer', get_products().select_related('created_by'), ProductDetailSerializer, ProductDetailValuesSerializer),
+            ('TableDetailSerializer', get_tables(), TableDetailSerializer, TableDetailValuesSerializer),
+        ]
+
+    def seed(self, rows):
+        user = User.objects.create_user(
+            email='benchmark-serializers@example.com',
+            username='benchmark-serializers',
+        )
+        offset = (Table.objects.aggregate(number=Max('number'))['number'] or 0) + 1
+
+        tables = Table.objects.bulk_create(
+            Table(number=offset + index, capacity=4) for index in range(rows)
+        )
+        orders = Order.objects.bulk_create(
+            Order(table=table, created_by=user, status=OrderStatus.PAID, item_count=2, total=Decimal('21.000'))
+            for table in tables
+        )
+        products = Product.objects.bulk_create(
+            Product(name=f'benchmark product {offset + index}', price=Decimal('10.500'), created_by=user)
+            for index in range(rows)
+        )
+        OrderItem.objects.bulk_create(
+            OrderItem(
+                order=order,
+                product=product,
+                product_name=product.name,
+                unit_price=product.price,
+                quantity=2
+            )
+            for order, product in zip(orders, products)
+        )
+
+    def report(self, name, repeat, queryset, serialize, values_queryset, values_serialize):
+        baseline = self.measure(repeat, queryset, serialize)
+        fast = self.measure(repeat, values_queryset, values_serialize)
+
+        for label, (total, serialize_only) in [('DRF', baseline), ('values', fast)]:
+            self.stdout.write(
+                f'{name + " " + label:<36} {total:>11,.0f} rows/s {serialize_only:>10,.0f} rows/s'
+            )
+
+        self.stdout.write(
+            f'{"speedup":<36} {fast[0] / baseline[0]:>16.1f}x {fast[1] / baseline[1]:>15.1f}x'
+        )
+
+    def measure(self, repeat, queryset, serialize):
+        best_total = best_serialize = float('inf')
+
+        for _ in range(repeat):
+            started = time.perf_counter()
+            rows = list(queryset.all())
+            fetched = time.perf_counter()
+            data = serialize(rows)
+            finished = time.perf_counter()
+
+            best_total = min(best_total, finished - started)
+            best_serialize = min(best_serialize, finished - fetched)
+
+        return len(data) / best_total, len(data) / best_serialize
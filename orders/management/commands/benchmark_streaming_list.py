@@ -0,0 +1,111 @@
+import resource
+import subprocess
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from orders.models import Order, OrderStatus
+from orders.views import OrderViewSet
+
+from tables.models import Table
+
+
+User = get_user_model()
+
+BENCHMARK_USERNAME = 'benchmark-streaming'
+
+MODES = ['buffered', 'stream']
+
+
+class Command(BaseCommand):
+
+    help = (
+        'Seeds closed orders and compares the peak RSS of the unpaginated '
+        'order list rendered in one piece with the streamed list. Each mode '
+        'runs in its own process, since peak RSS only ever grows.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--measure', choices=MODES, help='Run one mode in this process')
+
+    def handle(self, *args, **options):
+        if options['measure']:
+            return self.measure(options['measure'])
+
+        user, table = self.seed(options['rows'], options['batch_size'])
+
+        try:
+            for mode in MODES:
+                result = subprocess.run(
+                    [sys.executable, sys.argv[0], 'benchmark_streaming_list', '--measure', mode],
+                    capture_output=True,
+                    text=True
+                )
+
+                if result.returncode != 0:
+                    raise CommandError(result.stderr)
+
+                self.stdout.write(result.stdout.strip())
+        finally:
+            table.delete()
+            user.delete()
+
+    def seed(self, rows, batch_size):
+        if User.objects.filter(username=BENCHMARK_USERNAME).exists():
+            raise CommandError(f'User {BENCHMARK_USERNAME} exists, remove the rows of a previous run')
+
+        user = User.objects.create_user(
+            email=f'{BENCHMARK_USERNAME}@example.com',
+            username=BENCHMARK_USERNAME,
+            is_superuser=True,
+        )
+        number = (Table.objects.aggregate(number=Max('number'))['number'] or 0) + 1
+        table = Table.objects.create(number=number, capacity=4, is_active=False)
+
+        for start in range(0, rows, batch_size):
+            Order.objects.bulk_create(
+                Order(table=table, created_by=user, status=OrderStatus.PAID)
+                for _ in range(min(batch_size, rows - start))
+            )
+
+        return user, table
+
+    def measure(self, mode):
+        user = User.objects.get(username=BENCHMARK_USERNAME)
+        query = {'stream': 1} if mode == 'stream' else {}
+
+        request = APIRequestFactory().get('/orders/', query)
+        force_authenticate(request, user)
+
+        view = OrderViewSet.as_view({'get': 'list'}, pagination_class=None)
+
+        baseline = self.get_peak_rss()
+        started = time.perf_counter()
+
+        response = view(request)
+
+        if response.streaming:
+            size = sum(len(part) for part in response.streaming_content)
+        else:
+            size = len(response.render().content)
+
+        elapsed = time.perf_counter() - started
+        peak = self.get_peak_rss()
+
+        self.stdout.write(
+            f'{mode:<9} {Order.objects.count():>8} rows {size / 2**20:8.1f} MiB '
+            f'{elapsed:6.2f} s  peak RSS {peak / 2**20:7.1f} MiB '
+            f'(+{(peak - baseline) / 2**20:.1f} MiB while listing)'
+        )
+
+    def get_peak_rss(self):
+        # ru_maxrss is in KiB on Linux and in bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand
+
+from django.db import transaction
+
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+
+from order_items.models import OrderItem
+
+from orders.models import Order
+
+
+class Command(BaseCommand):
+
+    help = 'Recomputes Order.item_count and Order.total from the order items in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        updated = 0
+
+        while True:
+            order_ids = list(
+                Order.objects.filter(pk__gt=last_id)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+
+            if not order_ids:
+                break
+
+            with transaction.atomic():
+                updated += self.recompute_batch(order_ids)
+
+            last_id = order_ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f'Recomputed totals for {updated} orders'))
+
+    def recompute_batch(self, order_ids):
+        totals = {
+            row['order_id']: row
+            for row in OrderItem.objects.filter(order_id__in=order_ids)
+            .values('order_id')
+            .annotate(
+                item_count=Sum('quantity'),
+                total=Sum(
+                    ExpressionWrapper(
+                        F('quantity') * F('unit_price'),
+                        output_field=DecimalField(max_digits=12, decimal_places=3)
+                    )
+                ),
+            )
+        }
+
+        orders = list(Order.objects.filter(pk__in=order_ids).only('item_count', 'total'))
+
+        for order in orders:
+            row = totals.get(order.pk)
+            order.item_count = row['item_count'] if row else 0
+            order.total = row['total'] if row else 0
+
+        return Order.objects.bulk_update(orders, ['item_count', 'total'])
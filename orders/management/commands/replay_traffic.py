@@ -0,0 +1,281 @@
+import json
+import tempfile
+import threading
+import time
+
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import override_settings, setup_databases, teardown_databases
+
+from rest_framework.test import APIClient
+
+from accounts.tokens import ClaimsRefreshToken
+
+from config.traffic import REFERENCE_FIELDS, connect_created_tracking, created_objects, get_route_model
+
+from orders.management.benchmarking import PERCENTILES, allow_test_clients, percentile
+
+
+User = get_user_model()
+
+
+class IdMap:
+
+    """
+    Ids of the objects created while recording, mapped to the ids of their
+    replayed copies. Resolving an id whose creation has not been replayed
+    yet waits for it, since another user's lane may be creating it.
+    """
+
+    def __init__(self, entries, timeout):
+        self.pending = {
+            (label, pk) for entry in entries for label, pk in entry['created']
+        }
+        self.ids = {}
+        self.timeout = timeout
+        self.condition = threading.Condition()
+
+    def add(self, recorded, replayed):
+        replayed_by_label = defaultdict(list)
+
+        for label, pk in replayed:
+            replayed_by_label[label].append(pk)
+
+        with self.condition:
+            for label, pk in recorded:
+                new_ids = replayed_by_label[label]
+                # A failed create keeps the recorded id, so nobody waits on it
+                self.ids[(label, pk)] = new_ids.pop(0) if new_ids else pk
+
+            self.condition.notify_all()
+
+    def resolve(self, label, pk):
+        try:
+            key = (label, int(pk))
+        except (TypeError, ValueError):
+            return pk
+
+        if key not in self.pending:
+            return pk
+
+        with self.condition:
+            self.condition.wait_for(lambda: key in self.ids, self.timeout)
+            return self.ids.get(key, pk)
+
+
+class Command(BaseCommand):
+
+    help = (
+        'Replays a recording of TrafficRecordingMiddleware against a test '
+        'database, one client per recorded user, at the recorded pace divided '
+        'by --speed (0 replays without pauses). Ids of objects created while '
+        'recording are remapped to the objects the replay creates. Reports '
+        'the latency distribution of each route next to the recorded one. '
+        'Load the rows the recording refers to with --fixture, e.g. a '
+        'dumpdata of the recorded database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('recording', nargs='+', help='JSONL files written by TrafficRecordingMiddleware')
+        parser.add_argument('--speed', type=float, default=1.0)
+        parser.add_argument('--fixture', action='append', default=[], help='Fixture loaded before replaying')
+        parser.add_argument(
+            '--wait',
+            type=float,
+            default=10.0,
+            help='Seconds to wait for the replay of an object another request refers to'
+        )
+
+    def handle(self, *args, **options):
+        if options['speed'] < 0:
+            raise CommandError('--speed cannot be negative')
+
+        entries = self.load(options['recording'])
+
+        if not entries:
+            raise CommandError('The recording is empty')
+
+        allow_test_clients()
+        connect_created_tracking()
+
+        with (
+            tempfile.TemporaryDirectory() as directory,
+            # Recording the replay would hide the objects it creates from it
+            override_settings(REPLICA_READS_ENABLED=False, TRAFFIC_RECORD_PATH=None),
+        ):
+            self.use_file_test_database(directory)
+            old_config = setup_databases(verbosity=0, interactive=False, aliases={DEFAULT_DB_ALIAS})
+
+            try:
+                for fixture in options['fixture']:
+                    call_command('loaddata', fixture, verbosity=0)
+
+                results = self.replay(entries, options['speed'], IdMap(entries, options['wait']))
+            finally:
+                teardown_databases(old_config, verbosity=0)
+
+        self.report(results)
+
+    def load(self, paths):
+        entries = []
+
+        for path in paths:
+            with open(path) as file:
+                entries.extend(json.loads(line) for line in file if line.strip())
+
+        return sorted(entries, key=lambda entry: entry['started_at'])
+
+    def use_file_test_database(self, directory):
+        settings_dict = connections[DEFAULT_DB_ALIAS].settings_dict
+
+        # In-memory SQLite locks whole tables between threads
+        if settings_dict['ENGINE'].endswith('sqlite3') and not settings_dict['TEST'].get('NAME'):
+            settings_dict['TEST']['NAME'] = str(Path(directory) / 'replay.sqlite3')
+
+    def get_lanes(self, entries):
+        lanes = defaultdict(list)
+
+        for entry in entries:
+            lanes[entry['user'] or 'anonymous'].append(entry)
+
+        return lanes
+
+    def get_client(self, key, entries):
+        client = APIClient()
+        role = entries[0]['role']
+
+        if role == 'anonymous':
+            return client
+
+        user = User.objects.create_user(
+            email=f'replay-{key}@example.com',
+            username=f'replay-{key}',
+            is_staff=role in ['admin', 'staff'],
+            is_superuser=role == 'admin',
+        )
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {ClaimsRefreshToken.for_user(user).access_token}')
+
+        return client
+
+    def replay(self, entries, speed, id_map):
+        lanes = self.get_lanes(entries)
+        clients = {key: self.get_client(key, lane) for key, lane in lanes.items()}
+        first_started_at = entries[0]['started_at']
+        started = time.perf_counter()
+
+        def run_lane(key):
+            results = []
+
+            try:
+                for entry in lanes[key]:
+                    if speed:
+                        delay = (entry['started_at'] - first_started_at) / speed - (time.perf_counter() - started)
+
+                        if delay > 0:
+                            time.sleep(delay)
+
+                    results.append(self.send(clients[key], entry, id_map))
+            finally:
+                connections.close_all()
+
+            return results
+
+        with ThreadPoolExecutor(max_workers=len(lanes)) as executor:
+            batches = list(executor.map(run_lane, lanes))
+
+        return [result for batch in batches for result in batch]
+
+    def send(self, client, entry, id_map):
+        path = self.remap_path(entry, id_map)
+        body = self.remap_body(entry['body'], id_map)
+
+        created = []
+        token = created_objects.set(created)
+        started = time.perf_counter()
+
+        try:
+            response = getattr(client, entry['method'].lower())(path, body, format='json')
+
+            if response.streaming:
+                b''.join(response.streaming_content)
+        finally:
+            created_objects.reset(token)
+
+        duration = time.perf_counter() - started
+        id_map.add(entry['created'], created)
+
+        return {
+            'route': entry['route'],
+            'recorded': entry['duration'],
+            'replayed': duration,
+            'matched': response.status_code == entry['status'],
+        }
+
+    def remap_path(self, entry, id_map):
+        model = get_route_model(entry['route'])
+        pk = entry['kwargs'].get('pk')
+        path = entry['path']
+
+        if model is None or pk is None:
+            return path
+
+        return path.replace(f'/{pk}/', f'/{id_map.resolve(model, pk)}/', 1)
+
+    def remap_body(self, body, id_map):
+        if isinstance(body, list):
+            return [self.remap_body(value, id_map) for value in body]
+
+        if not isinstance(body, dict):
+            return body
+
+        remapped = {}
+
+        for key, value in body.items():
+            model = REFERENCE_FIELDS.get(key)
+
+            if model is None:
+                value = self.remap_body(value, id_map)
+            elif isinstance(value, list):
+                value = [id_map.resolve(model, pk) for pk in value]
+            else:
+                value = id_map.resolve(model, value)
+
+            remapped[key] = value
+
+        return remapped
+
+    def report(self, results):
+        routes = defaultdict(list)
+
+        for result in results:
+            routes[result['route']].append(result)
+
+        width = max(len(route) for route in routes)
+
+        self.stdout.write(
+            f"{'route':<{width}} {'requests':>8} {'recorded p50/p95/p99 ms':>25} "
+            f"{'replayed p50/p95/p99 ms':>25} {'p95':>7} {'status':>8}"
+        )
+
+        for route, route_results in [*sorted(routes.items()), ('all', results)]:
+            recorded = [result['recorded'] for result in route_results]
+            replayed = [result['replayed'] for result in route_results]
+            mismatches = sum(not result['matched'] for result in route_results)
+
+            ratio = percentile(replayed, 0.95) / max(percentile(recorded, 0.95), 1e-9)
+
+            self.stdout.write(
+                f'{route:<{width}} {len(route_results):>8} {self.format_percentiles(recorded):>25} '
+                f'{self.format_percentiles(replayed):>25} {ratio:>6.2f}x {mismatches:>8}'
+            )
+
+        self.stdout.write('status: replayed responses whose status differs from the recorded one')
+
+    def format_percentiles(self, values):
+        return '/'.join(f'{percentile(values, fraction) * 1000:.1f}' for _, fraction in PERCENTILES)
@@ -0,0 +1,256 @@
+import random
+
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from order_items.models import OrderItem
+
+from orders.models import Order, OrderStatus
+
+from products.models import Product
+
+from tables.models import Table
+
+
+User = get_user_model()
+
+SEED_PREFIX = 'seed-'
+SEED_ADMIN_USERNAME = f'{SEED_PREFIX}admin'
+SEED_TABLE_NUMBERS_START = 100_000
+
+ACTIVE_STATUSES = [
+    OrderStatus.CREATED,
+    OrderStatus.IN_PREPARATION,
+    OrderStatus.READY,
+    OrderStatus.DELIVERED,
+]
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """
+    Lets bulk_create keep the created_at / updated_at values it is given
+    instead of stamping every row with now().
+    """
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    flags = [(field.auto_now, field.auto_now_add) for field in fields]
+
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, flags):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+
+    help = (
+        'Seeds a restaurant dataset with bulk_create: users, tables, products '
+        'and closed orders with their items spread over the last --days, plus '
+        'one active order on some tables. Seeded rows are recognised by the '
+        f'`{SEED_PREFIX}` prefix and removed with --flush.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tables', type=int, default=200)
+        parser.add_argument('--products', type=int, default=2000)
+        parser.add_argument('--orders', type=int, default=1_000_000)
+        parser.add_argument('--items-per-order', type=int, default=3)
+        parser.add_argument('--waiters', type=int, default=10)
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument(
+            '--active-tables',
+            type=float,
+            default=0.5,
+            help='Share of the tables that get an active order'
+        )
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, for identical datasets')
+        parser.add_argument('--flush', action='store_true', help='Remove the rows of a previous seed first')
+
+    def handle(self, *args, **options):
+        if options['items_per_order'] > options['products']:
+            raise CommandError('--items-per-order cannot exceed --products')
+
+        if options['flush']:
+            self.flush()
+        elif User.objects.filter(username=SEED_ADMIN_USERNAME).exists():
+            raise CommandError('A seeded dataset exists, pass --flush to replace it')
+
+        self.random = random.Random(options['seed'])
+        self.now = timezone.now()
+        self.batch_size = options['batch_size']
+
+        with transaction.atomic():
+            users = self.seed_users(options['waiters'])
+            tables = self.seed_tables(options['tables'], users[0])
+            products = self.seed_products(options['products'], users[0])
+
+        active_tables = tables[:int(len(tables) * options['active_tables'])]
+
+        closed = self.seed_orders(
+            options['orders'] - len(active_tables),
+            options['items_per_order'],
+            options['days'],
+            users,
+            tables,
+            products,
+            active_tables=[],
+        )
+        active = self.seed_orders(
+            len(active_tables),
+            options['items_per_order'],
+            0,
+            users,
+            tables,
+            products,
+            active_tables=active_tables,
+        )
+
+        # Seeded orders bypass pay_order, and a flush leaves stale rollups
+        call_command('rebuild_sales_rollups', stdout=self.stdout)
+
+        self.stdout.write(
+            f'Seeded {len(users)} users, {len(tables)} tables, {len(products)} products '
+            f'and {closed + active} orders ({active} active). '
+            f'Benchmark as {SEED_ADMIN_USERNAME}.'
+        )
+
+    def flush(self):
+        # Orders and their items go with the users that created them
+        Table.objects.filter(number__gte=SEED_TABLE_NUMBERS_START).delete()
+        Product.objects.filter(name__startswith=SEED_PREFIX).delete()
+        User.objects.filter(username__startswith=SEED_PREFIX).delete()
+
+    def seed_users(self, waiters):
+        admin = User.objects.create_user(
+            email=f'{SEED_ADMIN_USERNAME}@example.com',
+            username=SEED_ADMIN_USERNAME,
+            is_staff=True,
+            is_superuser=True,
+        )
+        waiters = User.objects.bulk_create(
+            User(
+                email=f'{SEED_PREFIX}waiter-{index}@example.com',
+                username=f'{SEED_PREFIX}waiter-{index}',
+                password='!',
+            )
+            for index in range(waiters)
+        )
+        return [admin, *waiters]
+
+    def seed_tables(self, tables, admin):
+        return Table.objects.bulk_create(
+            Table(
+                number=SEED_TABLE_NUMBERS_START + index,
+                capacity=self.random.choice([2, 4, 4, 6, 8]),
+                modified_by_id=admin.pk,
+            )
+            for index in range(tables)
+        )
+
+    def seed_products(self, products, admin):
+        return Product.objects.bulk_create(
+            (
+                Product(
+                    name=f'{SEED_PREFIX}product-{index}',
+                    price=Decimal(self.random.randrange(1_000, 50_000)) / 1000,
+                    created_by_id=admin.pk,
+                )
+                for index in range(products)
+            ),
+            batch_size=self.batch_size,
+        )
+
+    def seed_orders(self, count, items_per_order, days, users, tables, products, active_tables):
+        """
+        Creates `count` orders with their items, one batch per transaction.
+        Closed orders go to random tables; with `active_tables`, each of them
+        gets one active order.
+        """
+        created = 0
+
+        while created < count:
+            size = min(self.batch_size, count - created)
+
+            orders = [
+                self.build_order(
+                    users,
+                    active_tables[created + index] if active_tables else self.random.choice(tables),
+                    days,
+                    active=bool(active_tables),
+                )
+                for index in range(size)
+            ]
+            items = [
+                item
+                for order in orders
+                for item in self.build_items(order, products, items_per_order)
+            ]
+
+            with transaction.atomic(), explicit_timestamps(Order, OrderItem):
+                # Items pick up the order ids bulk_create sets
+                Order.objects.bulk_create(orders)
+                OrderItem.objects.bulk_create(items)
+
+            created += size
+
+            if not active_tables:
+                self.stdout.write(f'{created}/{count} closed orders', ending='\r')
+
+        if not active_tables and count:
+            self.stdout.write('')
+
+        return created
+
+    def build_order(self, users, table, days, active):
+        if active:
+            status = self.random.choice(ACTIVE_STATUSES)
+            created_at = self.now - timedelta(minutes=self.random.randrange(90))
+        else:
+            status = OrderStatus.CANCELLED if self.random.random() < 0.05 else OrderStatus.PAID
+            created_at = self.now - timedelta(seconds=self.random.randrange(max(days, 1) * 86_400))
+
+        # Orders created within the last two hours are not paid in the future
+        updated_at = min(created_at + timedelta(minutes=self.random.randrange(10, 120)), self.now)
+
+        return Order(
+            table=table,
+            created_by_id=self.random.choice(users).pk,
+            status=status,
+            created_at=created_at,
+            updated_at=updated_at,
+            paid_at=updated_at if status == OrderStatus.PAID else None,
+        )
+
+    def build_items(self, order, products, items_per_order):
+        items = [
+            OrderItem(
+                order=order,
+                product=product,
+                product_name=product.name,
+                unit_price=product.price,
+                quantity=self.random.randint(1, 4),
+                created_at=order.created_at,
+                updated_at=order.created_at,
+            )
+            for product in self.random.sample(products, items_per_order)
+        ]
+
+        order.item_count = sum(item.quantity for item in items)
+        order.total = sum(item.quantity * item.unit_price for item in items)
+
+        return items
@@ -0,0 +1,28 @@
+# Generated by Django 6.1.2 on 2026-10-18 18:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_order_item_count_total'),
+        ('tables', '0005_alter_table_modified_by'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['table', 'status'], name='order_table_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_at', 'id'], name='order_created_at_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status__in', ['PAID', 'CANCELLED']), _negated=True), fields=['table'], name='order_active_table_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 6.1.2 on 2026-10-18 18:28
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_one_active_order_per_table(apps, schema_editor):
+    # Which order to close is a business decision, so stop and let someone make it
+    Order = apps.get_model('orders', 'Order')
+
+    active_orders = Order.objects.exclude(status__in=['PAID', 'CANCELLED'])
+    tables = active_orders.values('table').annotate(count=Count('id')).filter(count__gt=1).values('table')
+
+    duplicates = defaultdict(list)
+
+    for table_id, order_id in active_orders.filter(table__in=tables).order_by('table', 'created_at').values_list('table', 'id'):
+        duplicates[table_id].append(order_id)
+
+    if duplicates:
+        details = '; '.join(
+            f"table {table_id}: orders {', '.join(map(str, order_ids))}"
+            for table_id, order_ids in duplicates.items()
+        )
+        raise RuntimeError(
+            'Cannot add unique_active_order_per_table, some tables have more than one '
+            f'active order ({details}). Pay or cancel all but one order of each table, '
+            'then migrate again.'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_order_indexes'),
+        ('tables', '0005_alter_table_modified_by'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(check_one_active_order_per_table, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='order',
+            name='order_active_table_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='order',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['PAID', 'CANCELLED']), _negated=True), fields=('table',), name='unique_active_order_per_table'),
+        ),
+    ]
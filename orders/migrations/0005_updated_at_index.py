@@ -0,0 +1,20 @@
+# Generated by Django 6.1.2 on 2026-10-18 19:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_unique_active_order_per_table'),
+        ('tables', '0005_alter_table_modified_by'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['updated_at'], name='order_updated_at_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 6.1.2 on 2026-10-18 19:36
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_paid_at(apps, schema_editor):
+    # Best guess for orders paid before the column existed
+    apps.get_model('orders', 'Order').objects.filter(
+        status='PAID'
+    ).update(
+        paid_at=F('updated_at')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_updated_at_index'),
+        ('tables', '0005_alter_table_modified_by'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='paid_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_paid_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['paid_at'], name='order_paid_at_idx'),
+        ),
+    ]
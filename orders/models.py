@@ -2,6 +2,8 @@ from django.db import models
 
 from django.core.exceptions import ValidationError
 
+from django.utils import timezone
+
 from tables.models import Table
 
 from accounts.models import User
@@ -24,6 +26,14 @@ class Order(models.Model):
     created_by = models.ForeignKey(User, related_name='orders_created_by_user', on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Set by the transition to PAID; updated_at keeps moving on later edits
+    paid_at = models.DateTimeField(null=True, blank=True)
+    item_count = models.PositiveIntegerField(default=0)
+    total = models.DecimalField(
+        max_digits=12,
+        decimal_places=3,
+        default=0
+    )
 
     VALID_TRANSITIONS = {
         OrderStatus.CREATED: {OrderStatus.IN_PREPARATION, OrderStatus.CANCELLED},
@@ -36,17 +46,81 @@ class Order(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['table', 'status'], name='order_table_status_idx'),
+            models.Index(fields=['created_at', 'id'], name='order_created_at_id_idx'),
+            # MAX(updated_at) of the conditional GET probes
+            models.Index(fields=['updated_at'], name='order_updated_at_idx'),
+            # Payment time, for rebuilding the sales rollups
+            models.Index(fields=['paid_at'], name='order_paid_at_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['table'],
+                condition=~models.Q(status__in=['PAID', 'CANCELLED']),
+                name='unique_active_order_per_table'
+            ),
+        ]
 
     @property
     def is_active(self):
         return self.status not in [OrderStatus.PAID, OrderStatus.CANCELLED]
 
+    @classmethod
+    def get_previous_statuses(cls, new_status):
+        return [
+            status for status, next_statuses in cls.VALID_TRANSITIONS.items()
+            if new_status in next_statuses
+        ]
+
+    @classmethod
+    def get_transition_values(cls, new_status, now):
+        values = {'status': new_status, 'updated_at': now}
+
+        if new_status == OrderStatus.PAID:
+            values['paid_at'] = now
+
+        return values
+
     def change_status(self, new_status):
+        """
+        Moves the order with one conditional UPDATE. The view transitions
+        cost two queries: get_object(), which also loads the table and the
+        creator the response shows, then this UPDATE. It uses no RETURNING:
+        every column it changes is set on the instance from the values
+        written, and RETURNING could not bring back the joined rows.
+        """
+        values = self.get_transition_values(new_status, timezone.now())
+
+        updated = self.get_transition_queryset(new_status).update(**values)
+
+        self.apply_transition(updated, new_status, values)
+
+    async def achange_status(self, new_status):
+        values = self.get_transition_values(new_status, timezone.now())
+
+        updated = await self.get_transition_queryset(new_status).aupdate(**values)
+
+        self.apply_transition(updated, new_status, values)
+
+    def get_transition_queryset(self, new_status):
         if new_status not in self.VALID_TRANSITIONS[self.status]:
             raise ValidationError(
                 f'Cannot change status from {self.status} to {new_status}'
             )
 
-        self.status = new_status
-        self.save(update_fields=['status'])
-    
+        # Compare-and-swap: only moves the row if nobody changed its status meanwhile
+        return Order.objects.filter(
+            pk=self.pk,
+            status__in=self.get_previous_statuses(new_status)
+        )
+
+    def apply_transition(self, updated, new_status, values):
+        if not updated:
+            raise ValidationError(
+                f'Cannot change status from {self.status} to {new_status}, '
+                'the order was modified by another request'
+            )
+
+        for field, value in values.items():
+            setattr(self, field, value)
@@ -4,9 +4,23 @@ from tables.models import Table
 
 
 def get_orders():
-    return Order.objects.all()
+    return Order.objects.select_related(
+        'table',
+        'created_by'
+    ).only(
+        'status',
+        'created_at',
+        'updated_at',
+        'item_count',
+        'total',
+        'table__number',
+        'created_by__username',
+    )
 
 def get_active_orders_of_table(table: Table):
     return Order.objects.filter(table=table).exclude(
         status__in = [OrderStatus.PAID, OrderStatus.CANCELLED]
-    )
\ No newline at end of file
+    )
+
+def get_statuses_of_orders(order_ids):
+    return Order.objects.filter(pk__in=order_ids).values_list('pk', 'status', 'table_id')
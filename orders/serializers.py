@@ -1,6 +1,8 @@
 from rest_framework import serializers
 
-from .models import Order
+from config.serializers import ValuesField, ValuesSerializer
+
+from .models import Order, OrderStatus
 
 from .services import create_order
 
@@ -24,6 +26,8 @@ class OrderDetailSerializer(serializers.ModelSerializer):
     created_by = serializers.CharField(source='created_by.username', read_only=True)
     created_at = serializers.ReadOnlyField()
     updated_at = serializers.ReadOnlyField()
+    item_count = serializers.ReadOnlyField()
+    total = serializers.DecimalField(max_digits=12, decimal_places=3, read_only=True)
 
     class Meta:
         model = Order
@@ -32,7 +36,9 @@ class OrderDetailSerializer(serializers.ModelSerializer):
             'status',
             'created_by',
             'created_at',
-            'updated_at'
+            'updated_at',
+            'item_count',
+            'total',
         ]
 
     def get_table(self, obj):
@@ -41,3 +47,23 @@ class OrderDetailSerializer(serializers.ModelSerializer):
             'number': obj.table.number
         }
 
+
+class OrderBulkTransitionSerializer(serializers.Serializer):
+
+    status = serializers.ChoiceField(choices=OrderStatus.choices)
+    ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=500
+    )
+
+
+class OrderDetailValuesSerializer(ValuesSerializer):
+
+    serializer_class = OrderDetailSerializer
+
+    table = ValuesField(
+        'table_id',
+        'table__number',
+        to_representation=lambda table_id, number: {'id': table_id, 'number': number}
+    )
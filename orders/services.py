@@ -1,58 +1,133 @@
+from asgiref.sync import sync_to_async
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+
+from django.db import IntegrityError, transaction
+
+from django.db.models import F
+
+from django.utils import timezone
+
 from rest_framework.exceptions import ValidationError
 
+from .events import (
+    ORDER_CREATED,
+    ORDER_STATUS_CHANGED,
+    publish_committed_order_event,
+    publish_order_event,
+)
+
+from .exceptions import OrderStatusConflict
+
 from .models import Order, OrderStatus
 
-from tables.models import Table
+from .selectors import get_active_orders_of_table, get_statuses_of_orders
 
-from .selectors import get_active_orders_of_table
+from reports.services import record_sales
+
+from tables.models import Table
 
 
 def create_order(table: Table, user):
-    
-    has_active_order = get_active_orders_of_table(table).exists()
 
-    if has_active_order:
-        raise ValidationError('This table has an active order')
+    if not table.is_active:
+        raise ValidationError('This table is not active')
+
+    try:
+        with transaction.atomic():
+            order = Order.objects.create(
+                table=table,
+                created_by_id=user.pk,
+            )
+    except IntegrityError:
+        # Backends name the failed constraint differently, so look for the
+        # active order itself; any other integrity error is not the client's
+        if get_active_orders_of_table(table).exists():
+            raise ValidationError('This table has an active order')
+        raise
+
+    publish_order_event(ORDER_CREATED, order.pk, order.table_id, order.status)
+
+    return order
+
+async def acreate_order(table: Table, user):
 
     if not table.is_active:
         raise ValidationError('This table is not active')
 
-    return Order.objects.create(
-        table=table,
-        created_by=user,
-    )   
+    try:
+        order = await Order.objects.acreate(
+            table=table,
+            created_by_id=user.pk,
+        )
+    except IntegrityError:
+        if await get_active_orders_of_table(table).aexists():
+            raise ValidationError('This table has an active order')
+        raise
 
-def change_status(order: Order, new_status):
-    order.change_status(new_status)
+    publish_committed_order_event(ORDER_CREATED, order.pk, order.table_id, order.status)
 
-def start_preparation(order: Order):
+    return order
+
+def update_order_totals(order: Order, quantity: int, amount):
+    Order.objects.filter(pk=order.pk).update(
+        item_count=F('item_count') + quantity,
+        total=F('total') + amount,
+        updated_at=timezone.now(),
+    )
+
+def change_status(order: Order, new_status):
+    previous_status = order.status
+
+    try:
+        order.change_status(new_status)
+    except DjangoValidationError as error:
+        raise OrderStatusConflict(error.messages[0])
+
+    publish_order_event(
+        ORDER_STATUS_CHANGED,
+        order.pk,
+        order.table_id,
+        order.status,
+        previous_status=previous_status
+    )
+
+async def achange_status(order: Order, new_status):
+    previous_status = order.status
+
+    try:
+        await order.achange_status(new_status)
+    except DjangoValidationError as error:
+        raise OrderStatusConflict(error.messages[0])
+
+    publish_committed_order_event(
+        ORDER_STATUS_CHANGED,
+        order.pk,
+        order.table_id,
+        order.status,
+        previous_status=previous_status
+    )
+
+def check_can_start_preparation(order: Order):
     if not order.is_active:
         raise ValidationError('Cannot start preparation. The order is already closed.')
-    
-    order.change_status(OrderStatus.IN_PREPARATION)
 
-def mark_ready(order: Order):
+def check_can_mark_ready(order: Order):
     if not order.is_active:
         raise ValidationError(f'Cannot mark as ready. The order is already closed.')
-    
-    order.change_status(OrderStatus.READY)
 
-def deliver(order: Order):
+def check_can_deliver(order: Order):
     if not order.is_active:
         raise ValidationError(f'Cannot deliver. The order is already closed.')
-    
-    order.change_status(OrderStatus.DELIVERED)
 
-def pay_order(order: Order):
+def check_can_pay(order: Order):
     if not order.is_active:
         raise ValidationError('Order is already closed')
-    
+
     if order.status != OrderStatus.DELIVERED:
         raise ValidationError('Only delivered orders can be paid')
 
-    order.change_status(OrderStatus.PAID)
-
-def cancel_order(order: Order):
+def check_can_cancel(order: Order):
     if not order.is_active:
         raise ValidationError('Order is already closed')
 
@@ -61,4 +136,95 @@ def cancel_order(order: Order):
             'Only orders that have not started preparation can be cancelled'
         )
 
-    order.change_status(OrderStatus.CANCELLED)
\ No newline at end of file
+def start_preparation(order: Order):
+    check_can_start_preparation(order)
+    change_status(order, OrderStatus.IN_PREPARATION)
+
+def mark_ready(order: Order):
+    check_can_mark_ready(order)
+    change_status(order, OrderStatus.READY)
+
+def deliver(order: Order):
+    check_can_deliver(order)
+    change_status(order, OrderStatus.DELIVERED)
+
+@transaction.atomic
+def pay_order(order: Order):
+    check_can_pay(order)
+    change_status(order, OrderStatus.PAID)
+    record_sales([order.pk], order.paid_at)
+
+def cancel_order(order: Order):
+    check_can_cancel(order)
+    change_status(order, OrderStatus.CANCELLED)
+
+async def astart_preparation(order: Order):
+    check_can_start_preparation(order)
+    await achange_status(order, OrderStatus.IN_PREPARATION)
+
+async def amark_ready(order: Order):
+    check_can_mark_ready(order)
+    await achange_status(order, OrderStatus.READY)
+
+async def adeliver(order: Order):
+    check_can_deliver(order)
+    await achange_status(order, OrderStatus.DELIVERED)
+
+async def apay_order(order: Order):
+    # The async ORM has no transactions, and the sales rollups must be
+    # updated in the payment's one
+    await sync_to_async(pay_order)(order)
+
+async def acancel_order(order: Order):
+    check_can_cancel(order)
+    await achange_status(order, OrderStatus.CANCELLED)
+
+@transaction.atomic
+def change_orders_status(order_ids, new_status):
+
+    orders = {
+        order_id: (status, table_id)
+        for order_id, status, table_id in get_statuses_of_orders(order_ids).select_for_update()
+    }
+    previous_statuses = Order.get_previous_statuses(new_status)
+
+    moved = []
+    rejected = []
+
+    for order_id in dict.fromkeys(order_ids):
+        current_status, table_id = orders.get(order_id, (None, None))
+
+        if current_status is None:
+            rejected.append({'id': order_id, 'detail': 'Order not found'})
+        elif current_status not in previous_statuses:
+            rejected.append({
+                'id': order_id,
+                'detail': f'Cannot change status from {current_status} to {new_status}'
+            })
+        else:
+            moved.append(order_id)
+
+    if moved:
+        now = timezone.now()
+
+        Order.objects.filter(
+            pk__in=moved,
+            status__in=previous_statuses
+        ).update(
+            **Order.get_transition_values(new_status, now)
+        )
+
+        if new_status == OrderStatus.PAID:
+            record_sales(moved, now)
+
+    for order_id in moved:
+        current_status, table_id = orders[order_id]
+        publish_order_event(
+            ORDER_STATUS_CHANGED,
+            order_id,
+            table_id,
+            new_status,
+            previous_status=current_status
+        )
+
+    return moved, rejected
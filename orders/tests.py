@@ -1,15 +1,76 @@
+import json
+import time
+
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+
 from rest_framework import status
 
 from django.contrib.auth import get_user_model
 
+from django.core.management import call_command
+
+from django.core.management.base import CommandError
+
+from django.db import IntegrityError, connection
+
+from django.db.models import Count, F, Sum
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from django.test.utils import CaptureQueriesContext
+
 from django.urls import reverse
 
+from django.utils import timezone
+
+from django.utils.http import http_date
+
+from rest_framework.exceptions import ValidationError as DRFValidationError
+
 from rest_framework.test import APITestCase
 
+from order_items.models import OrderItem
+
+from order_items.services import create_order_item
+
+from order_items.selectors import get_items_of_order, get_order_items_by_user
+
+from products.models import Product
+
+from reports.models import DailySales
+
 from tables.models import Table
 
+from tables.selectors import get_active_orders, get_available_tables, get_floor, get_tables
+
+from .events import (
+    ORDER_CREATED,
+    ORDER_ITEMS_CHANGED,
+    ORDER_STATUS_CHANGED,
+    OrderEventBroker,
+    broker,
+)
+
+from .exceptions import OrderStatusConflict
+
 from .models import Order, OrderStatus
 
+from .selectors import get_active_orders_of_table, get_orders
+
+from .management.commands.replay_traffic import Command as ReplayTrafficCommand, IdMap
+
+from .management.commands.seed_restaurant import SEED_PREFIX, SEED_TABLE_NUMBERS_START
+
+from .views import OrderViewSet
+
+from .services import astart_preparation, cancel_order, create_order, start_preparation
+
 User = get_user_model()
 
 
@@ -288,3 +349,1036 @@ class OrdersTest(APITestCase):
 
     
         
+
+class OrdersQueryCountTest(APITestCase):
+
+    def setUp(self):
+
+        self.admin_user = User.objects.create_user(
+            email='testadmin@email.com',
+            username='testadminuser',
+            password='testadminpassword',
+            is_staff=True,
+            is_superuser=True
+        )
+
+        self.client.force_authenticate(self.admin_user)
+
+        self.create_orders(start=1, count=3)
+
+    def create_orders(self, start, count):
+
+        for number in range(start, start + count):
+            table = Table.objects.create(number=number, capacity=4)
+            user = User.objects.create_user(
+                email=f'waiter{number}@email.com',
+                username=f'waiter{number}',
+                password='testuserpassword',
+            )
+            Order.objects.create(table=table, created_by=user)
+
+    # Reads cost the two ETag probe queries plus the query for the rows
+    def test_list_orders_query_count_does_not_grow_with_orders(self):
+
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('orders-list'))
+
+        self.assertEqual(len(response.data['results']), 3)
+
+        self.create_orders(start=10, count=10)
+
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('orders-list'))
+
+        self.assertEqual(len(response.data['results']), 13)
+
+    def test_retrieve_order_query_count(self):
+
+        order = Order.objects.first()
+
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('orders-detail', kwargs={'pk': order.pk}))
+
+        self.assertEqual(response.data['table']['number'], order.table.number)
+        self.assertEqual(response.data['created_by'], order.created_by.username)
+
+    def test_transition_actions_query_count(self):
+
+        order = Order.objects.first()
+
+        for action in ['prepare', 'ready', 'deliver']:
+            with self.assertNumQueries(2):
+                response = self.client.post(reverse(f'orders-{action}', kwargs={'pk': order.pk}))
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['table']['number'], order.table.number)
+
+        # Paying also adds the order to the sales rollups: savepoints, the
+        # sales of the order, then a lookup and a write per rollup
+        with self.assertNumQueries(11):
+            response = self.client.post(reverse('orders-pay', kwargs={'pk': order.pk}))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_create_order_does_not_pre_check_active_orders(self):
+
+        table = Table.objects.create(number=50, capacity=2)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('orders-list'), {'table': table.pk})
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [query['sql'] for query in queries if 'orders_order' in query['sql']],
+            [query['sql'] for query in queries if query['sql'].startswith('INSERT')]
+        )
+
+    def test_create_order_for_a_table_with_active_order_is_rejected_by_constraint(self):
+
+        order = Order.objects.first()
+
+        response = self.client.post(reverse('orders-list'), {'table': order.table.pk})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], 'This table has an active order')
+        self.assertEqual(Order.objects.filter(table=order.table).count(), 1)
+
+    def test_other_integrity_errors_are_not_reported_as_an_active_order(self):
+
+        table = Table.objects.create(number=50, capacity=2)
+
+        with (
+            patch.object(Order.objects, 'create', side_effect=IntegrityError('FOREIGN KEY constraint failed')),
+            self.assertRaises(IntegrityError),
+        ):
+            create_order(table, self.admin_user)
+
+    def test_closed_orders_do_not_block_a_new_order(self):
+
+        order = Order.objects.first()
+        Order.objects.filter(pk=order.pk).update(status=OrderStatus.PAID)
+
+        response = self.client.post(reverse('orders-list'), {'table': order.table.pk})
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_cancel_order_query_count(self):
+
+        order = Order.objects.first()
+
+        with self.assertNumQueries(2):
+            response = self.client.post(reverse('orders-cancel', kwargs={'pk': order.pk}))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], OrderStatus.CANCELLED)
+
+
+    def test_values_serializer_output_is_identical_to_model_serializer(self):
+
+        Order.objects.filter(pk=Order.objects.first().pk).update(total=Decimal('12.5'))
+
+        response = self.client.get(reverse('orders-list'), {'page_size': 2})
+
+        with patch.object(OrderViewSet, 'values_serializer_class', None):
+            baseline = self.client.get(reverse('orders-list'), {'page_size': 2})
+
+        self.assertEqual(response.content, baseline.content)
+
+        next_page = self.client.get(response.data['next'])
+
+        with patch.object(OrderViewSet, 'values_serializer_class', None):
+            next_baseline = self.client.get(response.data['next'])
+
+        self.assertEqual(next_page.content, next_baseline.content)
+
+    def test_streamed_list_matches_paginated_list(self):
+
+        self.create_orders(start=10, count=6)
+
+        paginated = self.client.get(reverse('orders-list'), {'page_size': 100})
+
+        with patch.object(OrderViewSet, 'stream_chunk_size', 4):
+            # Probes plus one query for the rows, whatever the number of chunks
+            with self.assertNumQueries(3):
+                response = self.client.get(reverse('orders-list'), {'stream': 1})
+                content = b''.join(response.streaming_content)
+
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(content), json.loads(paginated.content)['results'])
+        self.assertEqual(len(json.loads(content)), 9)
+
+    def test_streamed_list_of_no_rows_is_an_empty_array(self):
+
+        Order.objects.all().delete()
+
+        response = self.client.get(reverse('orders-list'), {'stream': 'true'})
+
+        self.assertEqual(b''.join(response.streaming_content), b'[]')
+
+
+@override_settings(PAGINATION_MAX_PAGE_SIZE=4)
+class OrdersPaginationTest(APITestCase):
+
+    def setUp(self):
+
+        self.admin_user = User.objects.create_user(
+            email='testadmin@email.com',
+            username='testadminuser',
+            password='testadminpassword',
+            is_staff=True,
+            is_superuser=True
+        )
+
+        self.client.force_authenticate(self.admin_user)
+
+        for number in range(1, 8):
+            table = Table.objects.create(number=number, capacity=4)
+            Order.objects.create(table=table, created_by=self.admin_user)
+
+        # Same timestamp for several rows so the id tiebreaker is exercised
+        same_time = Order.objects.order_by('id')[2].created_at
+        Order.objects.filter(id__in=Order.objects.order_by('id').values('id')[2:6]).update(
+            created_at=same_time
+        )
+
+        self.expected_tables = list(
+            Order.objects.order_by('-created_at', '-id').values_list('table__number', flat=True)
+        )
+
+    def collect_pages(self, url):
+        numbers = []
+        pages = 0
+
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            numbers += [order['table']['number'] for order in response.data['results']]
+            url = response.data['next']
+            pages += 1
+
+        return numbers, pages
+
+    def test_pages_follow_created_at_and_id_without_gaps_or_duplicates(self):
+
+        numbers, pages = self.collect_pages(reverse('orders-list') + '?page_size=3')
+
+        self.assertEqual(numbers, self.expected_tables)
+        self.assertEqual(pages, 3)
+
+    def test_previous_link_returns_the_previous_page(self):
+
+        first_page = self.client.get(reverse('orders-list') + '?page_size=3')
+        second_page = self.client.get(first_page.data['next'])
+
+        self.assertIsNone(first_page.data['previous'])
+
+        previous_page = self.client.get(second_page.data['previous'])
+
+        self.assertEqual(previous_page.data['results'], first_page.data['results'])
+        self.assertIsNone(previous_page.data['previous'])
+
+    def test_page_size_is_capped_by_setting(self):
+
+        response = self.client.get(reverse('orders-list') + '?page_size=1000')
+
+        self.assertEqual(len(response.data['results']), 4)
+
+    def test_page_and_its_etag_probe_are_keyset_queries(self):
+
+        first_page = self.client.get(reverse('orders-list') + '?page_size=2')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(first_page.data['next'])
+
+        page_queries = [query['sql'] for query in queries if 'orders_order' in query['sql']]
+
+        self.assertEqual(len(page_queries), 2)
+
+        for sql in page_queries:
+            self.assertIn('LIMIT 3', sql)
+            self.assertNotIn('OFFSET', sql)
+            self.assertNotIn('COUNT', sql)
+            self.assertNotIn('MAX', sql)
+
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_page_etag_changes_only_with_its_rows(self):
+
+        first_page = self.client.get(reverse('orders-list') + '?page_size=2')
+        second_page = self.client.get(first_page.data['next'])
+        # On the second page, past the row the first page's probe reads
+        changed = Order.objects.order_by('-created_at', '-id')[3]
+
+        Order.objects.filter(pk=changed.pk).update(total=Decimal('5.000'), updated_at=timezone.now())
+
+        response = self.client.get(reverse('orders-list') + '?page_size=2', HTTP_IF_NONE_MATCH=first_page['ETag'])
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(first_page.data['next'], HTTP_IF_NONE_MATCH=second_page['ETag'])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_invalid_cursor_returns_404(self):
+
+        response = self.client.get(reverse('orders-list') + '?cursor=not-a-cursor')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class SelectorQueryPlanTest(TestCase):
+
+    # Tables that grow with every shift and must always be reached through an index
+    HOT_TABLES = ['orders_order', 'order_items_orderitem']
+
+    def setUp(self):
+
+        self.user = User.objects.create_user(
+            email='testuser@email.com',
+            username='testuser',
+            password='testuserpassword',
+        )
+
+        self.table = Table.objects.create(number=1, capacity=4)
+        self.order = Order.objects.create(table=self.table, created_by=self.user)
+        self.product = Product.objects.create(name='chuleta de cerdo', price=Decimal('10.000'))
+
+    def get_query_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertUsesIndexes(self, queryset):
+        plan = self.get_query_plan(queryset)
+
+        for detail in plan:
+            if not detail.startswith('SCAN ') or 'USING' in detail:
+                continue
+
+            scanned = detail.split()[1]
+            self.assertNotIn(scanned, self.HOT_TABLES, f'Table scan on {scanned}: {plan}')
+            self.assertFalse(scanned.startswith('U'), f'Table scan in subquery: {plan}')
+
+    def test_get_orders_page_uses_created_at_index(self):
+
+        queryset = get_orders().order_by('-created_at', '-id')[:50]
+
+        self.assertUsesIndexes(queryset)
+        self.assertIn(
+            'SCAN orders_order USING INDEX order_created_at_id_idx',
+            self.get_query_plan(queryset)
+        )
+
+    def test_get_active_orders_of_table_uses_index(self):
+
+        self.assertUsesIndexes(get_active_orders_of_table(self.table))
+
+    def test_get_tables_active_order_subquery_uses_index(self):
+
+        self.assertUsesIndexes(get_tables())
+
+    def test_get_available_tables_uses_index(self):
+
+        self.assertUsesIndexes(get_available_tables())
+
+    def test_get_floor_looks_up_active_orders_through_partial_index(self):
+
+        plan = self.get_query_plan(get_floor())
+        searches = [detail for detail in plan if detail.startswith('SEARCH U0')]
+
+        self.assertUsesIndexes(get_floor())
+        self.assertEqual(len(searches), 5)
+
+        for detail in searches:
+            self.assertIn('USING INDEX unique_active_order_per_table', detail)
+
+    def test_get_active_orders_uses_partial_index(self):
+
+        self.assertIn(
+            'SCAN orders_order USING INDEX unique_active_order_per_table',
+            self.get_query_plan(get_active_orders().values('pk', 'updated_at'))
+        )
+
+    def test_get_order_item_uses_unique_index(self):
+
+        queryset = OrderItem.objects.filter(order=self.order, product=self.product)
+
+        self.assertUsesIndexes(queryset)
+
+    def test_get_order_items_by_user_uses_index(self):
+
+        queryset = get_order_items_by_user(self.user).order_by('-created_at', '-id')[:50]
+
+        self.assertUsesIndexes(queryset)
+
+    def test_get_items_of_order_uses_index(self):
+
+        self.assertUsesIndexes(get_items_of_order(self.order))
+
+
+class OrderStatusTransitionTest(APITestCase):
+
+    def setUp(self):
+
+        self.admin_user = User.objects.create_user(
+            email='testadmin@email.com',
+            username='testadminuser',
+            password='testadminpassword',
+            is_staff=True,
+            is_superuser=True
+        )
+
+        self.client.force_authenticate(self.admin_user)
+
+        table = Table.objects.create(number=1, capacity=4)
+
+        self.order = Order.objects.create(table=table, created_by=self.admin_user)
+
+    def test_transition_runs_a_single_conditional_update(self):
+
+        with CaptureQueriesContext(connection) as queries:
+            start_preparation(self.order)
+
+        self.assertEqual(len(queries), 1)
+        self.assertIn('UPDATE', queries[0]['sql'])
+        self.assertIn('"status" IN', queries[0]['sql'])
+
+        self.order.refresh_from_db()
+
+        self.assertEqual(self.order.status, OrderStatus.IN_PREPARATION)
+
+    def test_transition_view_costs_get_object_and_the_update(self):
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('orders-prepare', kwargs={'pk': self.order.pk}))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], OrderStatus.IN_PREPARATION)
+        self.assertEqual(len(queries), 2)
+        self.assertTrue(queries[0]['sql'].startswith('SELECT'))
+        self.assertTrue(queries[1]['sql'].startswith('UPDATE'))
+
+    def test_transition_updates_updated_at(self):
+
+        previous_updated_at = self.order.updated_at
+
+        start_preparation(self.order)
+
+        updated_at = self.order.updated_at
+        self.order.refresh_from_db()
+
+        self.assertGreater(self.order.updated_at, previous_updated_at)
+        self.assertEqual(self.order.updated_at, updated_at)
+
+    def test_stale_transition_raises_conflict(self):
+
+        kitchen_copy = Order.objects.get(pk=self.order.pk)
+        waiter_copy = Order.objects.get(pk=self.order.pk)
+
+        cancel_order(waiter_copy)
+
+        with self.assertRaises(OrderStatusConflict):
+            start_preparation(kitchen_copy)
+
+        self.order.refresh_from_db()
+
+        self.assertEqual(self.order.status, OrderStatus.CANCELLED)
+
+    def test_invalid_transition_returns_409(self):
+
+        response = self.client.post(reverse('orders-ready', kwargs={'pk': self.order.pk}))
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        self.order.refresh_from_db()
+
+        self.assertEqual(self.order.status, OrderStatus.CREATED)
+
+
+class OrderBulkTransitionTest(APITestCase):
+
+    def setUp(self):
+
+        self.user = User.objects.create_user(
+            email='testuser@email.com',
+            username='testuser',
+            password='testuserpassword',
+        )
+
+        self.client.force_authenticate(self.user)
+
+        self.create_orders(start=1, count=4, order_status=OrderStatus.IN_PREPARATION)
+
+    def create_orders(self, start, count, order_status):
+
+        return [
+            Order.objects.create(
+                table=Table.objects.create(number=number, capacity=4),
+                created_by=self.user,
+                status=order_status
+            )
+            for number in range(start, start + count)
+        ]
+
+    def test_transition_moves_valid_orders_and_rejects_the_rest(self):
+
+        preparing = list(Order.objects.order_by('pk'))
+        created = self.create_orders(start=10, count=2, order_status=OrderStatus.CREATED)
+
+        ids = [order.pk for order in preparing + created] + [9999]
+
+        response = self.client.post(
+            reverse('orders-transition'),
+            {'status': OrderStatus.READY, 'ids': ids},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['moved'], [order.pk for order in preparing])
+        self.assertEqual(
+            [rejected['id'] for rejected in response.data['rejected']],
+            [order.pk for order in created] + [9999]
+        )
+        self.assertEqual(
+            response.data['rejected'][0]['detail'],
+            'Cannot change status from CREATED to READY'
+        )
+        self.assertEqual(response.data['rejected'][-1]['detail'], 'Order not found')
+        self.assertEqual(Order.objects.filter(status=OrderStatus.READY).count(), 4)
+        self.assertEqual(Order.objects.filter(status=OrderStatus.CREATED).count(), 2)
+
+    def test_transition_query_count_does_not_grow_with_orders(self):
+
+        few_ids = list(Order.objects.values_list('pk', flat=True))
+
+        with CaptureQueriesContext(connection) as few_orders:
+            self.client.post(
+                reverse('orders-transition'),
+                {'status': OrderStatus.READY, 'ids': few_ids},
+                format='json'
+            )
+
+        many_ids = [
+            order.pk for order in
+            self.create_orders(start=10, count=40, order_status=OrderStatus.READY)
+        ]
+
+        with CaptureQueriesContext(connection) as many_orders:
+            response = self.client.post(
+                reverse('orders-transition'),
+                {'status': OrderStatus.DELIVERED, 'ids': few_ids + many_ids},
+                format='json'
+            )
+
+        self.assertEqual(len(response.data['moved']), 44)
+        self.assertEqual(len(many_orders), len(few_orders))
+
+    def test_cancel_stale_created_orders(self):
+
+        created = self.create_orders(start=10, count=3, order_status=OrderStatus.CREATED)
+
+        response = self.client.post(
+            reverse('orders-transition'),
+            {'status': OrderStatus.CANCELLED, 'ids': [order.pk for order in created]},
+            format='json'
+        )
+
+        self.assertEqual(len(response.data['moved']), 3)
+        self.assertEqual(response.data['rejected'], [])
+
+    def test_transition_with_invalid_status_returns_400(self):
+
+        response = self.client.post(
+            reverse('orders-transition'),
+            {'status': 'EATEN', 'ids': [1]},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class OrderConditionalGetTest(APITestCase):
+
+    def setUp(self):
+
+        self.user = User.objects.create_user(
+            email='testuser@email.com',
+            username='testuser',
+            password='testuserpassword',
+        )
+
+        self.client.force_authenticate(self.user)
+
+        self.order = Order.objects.create(
+            table=Table.objects.create(number=1, capacity=4),
+            created_by=self.user
+        )
+
+    def test_list_returns_304_when_etag_matches(self):
+
+        response = self.client.get(reverse('orders-list'))
+
+        with CaptureQueriesContext(connection) as queries:
+            not_modified = self.client.get(
+                reverse('orders-list'),
+                headers={'If-None-Match': response['ETag']}
+            )
+
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertFalse(any('INNER JOIN' in query['sql'] for query in queries))
+
+    def test_list_etag_changes_after_transition(self):
+
+        response = self.client.get(reverse('orders-list'))
+
+        self.client.post(reverse('orders-prepare', kwargs={'pk': self.order.pk}))
+
+        modified = self.client.get(
+            reverse('orders-list'),
+            headers={'If-None-Match': response['ETag']}
+        )
+
+        self.assertEqual(modified.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(modified['ETag'], response['ETag'])
+
+    def test_list_etag_depends_on_page(self):
+
+        first = self.client.get(reverse('orders-list'))
+        smaller = self.client.get(reverse('orders-list') + '?page_size=1')
+
+        self.assertNotEqual(first['ETag'], smaller['ETag'])
+
+    def test_detail_returns_304_for_etag(self):
+
+        url = reverse('orders-detail', kwargs={'pk': self.order.pk})
+        response = self.client.get(url)
+
+        by_etag = self.client.get(url, headers={'If-None-Match': response['ETag']})
+
+        self.assertEqual(by_etag.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_ignores_if_modified_since_because_of_the_table(self):
+
+        # The table number comes from a dependency the row's date does not cover
+        Order.objects.filter(pk=self.order.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        url = reverse('orders-detail', kwargs={'pk': self.order.pk})
+
+        response = self.client.get(url)
+        by_date = self.client.get(url, headers={'If-Modified-Since': http_date(time.time())})
+
+        self.assertNotIn('Last-Modified', response)
+        self.assertEqual(by_date.status_code, status.HTTP_200_OK)
+
+    def test_detail_etag_changes_when_items_change(self):
+
+        url = reverse('orders-detail', kwargs={'pk': self.order.pk})
+        response = self.client.get(url)
+
+        product = Product.objects.create(name='chuleta de cerdo', price=Decimal('10.000'))
+        self.client.post(
+            reverse('items-list'),
+            {'order': self.order.pk, 'product': product.pk, 'quantity': 1}
+        )
+
+        modified = self.client.get(url, headers={'If-None-Match': response['ETag']})
+
+        self.assertEqual(modified.status_code, status.HTTP_200_OK)
+        self.assertEqual(modified.data['item_count'], 1)
+
+    def test_detail_of_missing_order_returns_404(self):
+
+        response = self.client.get(reverse('orders-detail', kwargs={'pk': 9999}))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class OrderEventBrokerTest(SimpleTestCase):
+
+    def subscribe(self, broker, last_event_id=None):
+
+        async def subscribe():
+            subscription, replay = broker.subscribe(last_event_id)
+            subscription.close()
+            return replay
+
+        return async_to_sync(subscribe)()
+
+    def test_resume_replays_events_after_last_event_id(self):
+
+        broker = OrderEventBroker()
+
+        first = broker.publish(ORDER_CREATED, {'order': 1, 'table': 1, 'status': 'CREATED'})
+        second = broker.publish(ORDER_STATUS_CHANGED, {'order': 1, 'table': 1, 'status': 'READY'})
+
+        self.assertEqual(self.subscribe(broker, first.id), [second])
+        self.assertEqual(self.subscribe(broker, second.id), [])
+        self.assertEqual(self.subscribe(broker), [])
+
+    def test_unknown_or_expired_event_id_asks_for_reset(self):
+
+        broker = OrderEventBroker(history_size=2)
+
+        first = broker.publish(ORDER_CREATED, {'order': 1})
+
+        for order in range(2, 5):
+            broker.publish(ORDER_CREATED, {'order': order})
+
+        self.assertIsNone(self.subscribe(broker, first.id))
+        self.assertIsNone(self.subscribe(broker, 'otherprocess-1'))
+        self.assertIsNone(self.subscribe(broker, f'{broker.epoch}-99'))
+
+    def test_event_matches_status_and_table_filters(self):
+
+        event = OrderEventBroker().publish(
+            ORDER_STATUS_CHANGED,
+            {'order': 1, 'table': 3, 'status': 'READY'}
+        )
+
+        self.assertTrue(event.matches())
+        self.assertTrue(event.matches({'READY', 'DELIVERED'}, 3))
+        self.assertFalse(event.matches({'CREATED'}))
+        self.assertFalse(event.matches(table=4))
+
+
+class OrderEventStreamTest(TestCase):
+
+    def setUp(self):
+
+        self.user = User.objects.create_user(
+            email='testuser@email.com',
+            username='testuser',
+            password='testuserpassword',
+        )
+
+        self.table = Table.objects.create(number=1, capacity=4)
+
+    def get_events_since(self, last_event_id):
+
+        async def replay():
+            subscription, events = broker.subscribe(last_event_id)
+            subscription.close()
+            return events
+
+        return async_to_sync(replay)()
+
+    def test_services_publish_events_on_commit(self):
+
+        last_event_id = broker.last_event_id
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order = create_order(self.table, self.user)
+            product = Product.objects.create(name='chuleta de cerdo', price=Decimal('10.000'))
+            create_order_item(order, product, 2)
+            start_preparation(order)
+
+        events = self.get_events_since(last_event_id)
+
+        self.assertEqual(
+            [(event.type, event.data['status']) for event in events],
+            [
+                (ORDER_CREATED, OrderStatus.CREATED),
+                (ORDER_ITEMS_CHANGED, OrderStatus.CREATED),
+                (ORDER_STATUS_CHANGED, OrderStatus.IN_PREPARATION),
+            ]
+        )
+        self.assertEqual(events[2].data['previous_status'], OrderStatus.CREATED)
+        self.assertEqual(events[2].data['table'], self.table.pk)
+
+    def test_rolled_back_changes_publish_nothing(self):
+
+        last_event_id = broker.last_event_id
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_order(self.table, self.user)
+
+            with self.assertRaises(DRFValidationError):
+                create_order(self.table, self.user)
+
+        self.assertEqual(len(self.get_events_since(last_event_id)), 1)
+
+    async def test_stream_requires_authentication(self):
+
+        response = await self.async_client.get('/orders/events/')
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    async def test_stream_sends_filtered_events_and_resumes_from_last_event_id(self):
+
+        await self.async_client.aforce_login(self.user)
+
+        response = await self.async_client.get('/orders/events/?status=READY')
+        stream = aiter(response.streaming_content)
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(await anext(stream), b'retry: 3000\n\n')
+
+        broker.publish(ORDER_STATUS_CHANGED, {'order': 1, 'table': 1, 'status': 'IN_PREPARATION'})
+        ready = broker.publish(ORDER_STATUS_CHANGED, {'order': 1, 'table': 1, 'status': 'READY'})
+
+        self.assertEqual(await anext(stream), ready.encode().encode())
+
+        await stream.aclose()
+
+        delivered = broker.publish(ORDER_STATUS_CHANGED, {'order': 2, 'table': 1, 'status': 'DELIVERED'})
+
+        resumed = await self.async_client.get(
+            '/orders/events/',
+            headers={'Last-Event-ID': ready.id}
+        )
+        resumed_stream = aiter(resumed.streaming_content)
+
+        await anext(resumed_stream)
+
+        self.assertEqual(await anext(resumed_stream), delivered.encode().encode())
+
+        await resumed_stream.aclose()
+
+
+class AsyncOrderViewsTest(TestCase):
+
+    def setUp(self):
+
+        self.user = User.objects.create_user(
+            email='testuser@email.com',
+            username='testuser',
+            password='testuserpassword',
+        )
+
+        self.table = Table.objects.create(number=1, capacity=4)
+        self.other_table = Table.objects.create(number=2, capacity=4)
+
+        self.order = Order.objects.create(table=self.table, created_by=self.user)
+
+    async def test_async_views_require_authentication(self):
+
+        response = await self.async_client.get('/async/orders/')
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    async def test_async_list_matches_sync_list(self):
+
+        await self.async_client.aforce_login(self.user)
+
+        async_response = await self.async_client.get('/async/orders/')
+        sync_response = await self.async_client.get(reverse('orders-list'))
+
+        self.assertEqual(async_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(async_response.json(), sync_response.json())
+
+    async def test_async_create_and_retrieve(self):
+
+        await self.async_client.aforce_login(self.user)
+
+        response = await self.async_client.post(
+            '/async/orders/',
+            {'table': self.other_table.pk},
+            content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json(), {'table': self.other_table.pk})
+
+        order = await Order.objects.aget(table=self.other_table)
+        response = await self.async_client.get(f'/async/orders/{order.pk}/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['table']['number'], 2)
+        self.assertEqual(response.json()['created_by'], 'testuser')
+
+    async def test_async_create_rejects_unknown_table(self):
+
+        await self.async_client.aforce_login(self.user)
+
+        response = await self.async_client.post(
+            '/async/orders/',
+            {'table': 999},
+            content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('table', response.json())
+
+    async def test_async_retrieve_missing_order_returns_404(self):
+
+        await self.async_client.aforce_login(self.user)
+
+        response = await self.async_client.get('/async/orders/999/')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_async_transitions(self):
+
+        await self.async_client.aforce_login(self.user)
+
+        response = await self.async_client.post(f'/async/orders/{self.order.pk}/prepare/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['status'], OrderStatus.IN_PREPARATION)
+
+        response = await self.async_client.post(f'/async/orders/{self.order.pk}/cancel/')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = await self.async_client.post(f'/async/orders/{self.order.pk}/unknown/')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        order = await Order.objects.aget(pk=self.order.pk)
+
+        self.assertEqual(order.status, OrderStatus.IN_PREPARATION)
+
+    async def test_async_transition_reports_concurrent_change_as_conflict(self):
+
+        await self.async_client.aforce_login(self.user)
+
+        stale = await Order.objects.aget(pk=self.order.pk)
+        await Order.objects.filter(pk=self.order.pk).aupdate(status=OrderStatus.IN_PREPARATION)
+
+        with self.assertRaises(OrderStatusConflict):
+            await astart_preparation(stale)
+
+
+
+
+
+
+class SeedRestaurantTest(TestCase):
+
+    SIZES = [
+        '--tables', '4',
+        '--products', '6',
+        '--orders', '30',
+        '--items-per-order', '2',
+        '--waiters', '2',
+        '--days', '30',
+        '--batch-size', '7',
+    ]
+
+    def seed(self, *args):
+        call_command('seed_restaurant', *self.SIZES, *args, stdout=StringIO())
+
+    def get_seeded_orders(self):
+        return Order.objects.filter(table__number__gte=SEED_TABLE_NUMBERS_START)
+
+    def test_seeds_the_requested_rows(self):
+
+        self.seed()
+
+        orders = self.get_seeded_orders()
+
+        self.assertEqual(User.objects.filter(username__startswith=SEED_PREFIX).count(), 3)
+        self.assertEqual(Table.objects.filter(number__gte=SEED_TABLE_NUMBERS_START).count(), 4)
+        self.assertEqual(Product.objects.filter(name__startswith=SEED_PREFIX).count(), 6)
+        self.assertEqual(orders.count(), 30)
+        self.assertEqual(OrderItem.objects.filter(order__in=orders).count(), 60)
+
+    def test_order_totals_match_their_items(self):
+
+        self.seed()
+
+        orders = self.get_seeded_orders().annotate(
+            items_quantity=Sum('order_items__quantity'),
+            items_total=Sum(F('order_items__quantity') * F('order_items__unit_price')),
+        )
+
+        for order in orders:
+            with self.subTest(order=order.pk):
+                self.assertEqual(order.item_count, order.items_quantity)
+                self.assertEqual(order.total, order.items_total)
+
+    def test_explicit_timestamps_are_kept(self):
+
+        start = timezone.now()
+        self.seed()
+
+        orders = self.get_seeded_orders()
+
+        self.assertTrue(orders.filter(created_at__lt=start - timedelta(days=1)).exists())
+        self.assertFalse(orders.filter(updated_at__lt=F('created_at')).exists())
+        self.assertFalse(orders.filter(updated_at__gt=timezone.now()).exists())
+        self.assertTrue(orders.filter(updated_at__gte=F('created_at') + timedelta(minutes=10)).exists())
+        self.assertFalse(OrderItem.objects.filter(order__in=orders).exclude(created_at=F('order__created_at')).exists())
+        self.assertFalse(orders.filter(status=OrderStatus.PAID).exclude(paid_at=F('updated_at')).exists())
+
+    def test_active_tables_get_one_active_order_each(self):
+
+        self.seed('--active-tables', '0.5')
+
+        active_orders = get_active_orders().filter(table__number__gte=SEED_TABLE_NUMBERS_START)
+        orders_per_table = active_orders.values('table').annotate(count=Count('id'))
+
+        self.assertEqual(len(orders_per_table), 2)
+        self.assertEqual({row['count'] for row in orders_per_table}, {1})
+
+    def test_sales_rollups_are_rebuilt(self):
+
+        self.seed()
+
+        paid = self.get_seeded_orders().filter(status=OrderStatus.PAID).aggregate(
+            order_count=Count('id'),
+            item_count=Sum('item_count'),
+            revenue=Sum('total'),
+        )
+        rollups = DailySales.objects.aggregate(
+            order_count=Sum('order_count'),
+            item_count=Sum('item_count'),
+            revenue=Sum('revenue'),
+        )
+
+        self.assertGreater(paid['order_count'], 0)
+        self.assertEqual(rollups, paid)
+
+    def test_flush_replaces_only_the_seeded_rows(self):
+
+        user = User.objects.create_user(username='waiter', email='waiter@email.com', password='waiterpassword')
+        table = Table.objects.create(number=1, capacity=4)
+        product = Product.objects.create(name='chuleta de cerdo', price=Decimal('10.000'))
+        order = Order.objects.create(table=table, created_by=user)
+        create_order_item(order, product, 2)
+
+        self.seed()
+        self.seed('--flush', '--seed', '1')
+
+        self.assertEqual(self.get_seeded_orders().count(), 30)
+        self.assertEqual(Table.objects.filter(number__gte=SEED_TABLE_NUMBERS_START).count(), 4)
+        self.assertEqual(Product.objects.filter(name__startswith=SEED_PREFIX).count(), 6)
+        self.assertEqual(User.objects.filter(username__startswith=SEED_PREFIX).count(), 3)
+        self.assertTrue(User.objects.filter(pk=user.pk).exists())
+        self.assertTrue(Table.objects.filter(pk=table.pk).exists())
+        self.assertTrue(Product.objects.filter(pk=product.pk).exists())
+        self.assertEqual(OrderItem.objects.get(order=order).quantity, 2)
+
+    def test_refuses_to_seed_twice_without_flush(self):
+
+        self.seed()
+
+        with self.assertRaises(CommandError):
+            self.seed()
+
+
+class ReplayTrafficTest(SimpleTestCase):
+
+    def test_replay_remaps_created_ids(self):
+
+        entries = [
+            {'created': [['orders.order', 7]]},
+            {'created': [['order_items.orderitem', 30], ['order_items.orderitem', 31]]},
+        ]
+        id_map = IdMap(entries, timeout=0)
+        id_map.add(entries[0]['created'], [['orders.order', 70]])
+        id_map.add(entries[1]['created'], [['order_items.orderitem', 300]])
+
+        command = ReplayTrafficCommand()
+        prepare = {'route': 'orders-prepare', 'kwargs': {'pk': '7'}, 'path': '/orders/7/prepare/'}
+        ready = {'route': 'async/orders/<int:pk>/<str:transition>/', 'kwargs': {'pk': 7}, 'path': '/async/orders/7/ready/'}
+
+        self.assertEqual(command.remap_path(prepare, id_map), '/orders/70/prepare/')
+        self.assertEqual(command.remap_path(ready, id_map), '/async/orders/70/ready/')
+        self.assertEqual(
+            command.remap_body([{'order': 7, 'product': 3}, {'ids': [7, 8], 'status': 'CANCELLED'}], id_map),
+            [{'order': 70, 'product': 3}, {'ids': [70, 8], 'status': 'CANCELLED'}]
+        )
+        # A create that failed during the replay keeps its recorded id
+        self.assertEqual(id_map.resolve('order_items.orderitem', 31), 31)
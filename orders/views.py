@@ -5,26 +5,41 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 
+from config.mixins import ConditionalGetMixin, ReplicaListMixin, StreamingListMixin
+
+from tables.models import Table
+
 from .permissions import IsRestaurantAdmin
 
 from .selectors import get_orders
 
-from .serializers import OrderCreateSerializer, OrderDetailSerializer
+from .serializers import (
+    OrderBulkTransitionSerializer,
+    OrderCreateSerializer,
+    OrderDetailSerializer,
+    OrderDetailValuesSerializer,
+)
 
-from .services import start_preparation, mark_ready, deliver, pay_order, cancel_order
+from .services import start_preparation, mark_ready, deliver, pay_order, cancel_order, change_orders_status
 
 
-class OrderViewSet(ModelViewSet):
+class OrderViewSet(ReplicaListMixin, ConditionalGetMixin, StreamingListMixin, ModelViewSet):
 
     serializer_class = OrderDetailSerializer
+    values_serializer_class = OrderDetailValuesSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         return get_orders()
 
+    def get_conditional_dependencies(self):
+        return [Table.objects.all()]
+
     def get_serializer_class(self):
         if self.action == 'create':
             return OrderCreateSerializer
+        if self.action == 'transition':
+            return OrderBulkTransitionSerializer
         return super().get_serializer_class()
 
     def get_permissions(self):
@@ -66,10 +81,15 @@ class OrderViewSet(ModelViewSet):
         cancel_order(order)
         serializer = OrderDetailSerializer(order)
         return Response(serializer.data, status=status.HTTP_200_OK)
-    
-    
 
-    
-    
+    @action(methods=['POST'], detail=False)
+    def transition(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        moved, rejected = change_orders_status(
+            serializer.validated_data['ids'],
+            serializer.validated_data['status']
+        )
 
-    
\ No newline at end of file
+        return Response({'moved': moved, 'rejected': rejected}, status=status.HTTP_200_OK)
@@ -0,0 +1,35 @@
+import time
+
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+
+MENU_VERSION_KEY = 'products:menu-version'
+
+
+def get_menu_version():
+    version = cache.get(MENU_VERSION_KEY)
+
+    if version is None:
+        # A fresh starting point so entries cached before an eviction are never reused
+        cache.add(MENU_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(MENU_VERSION_KEY)
+
+    return version
+
+def bump_menu_version():
+    try:
+        cache.incr(MENU_VERSION_KEY)
+    except ValueError:
+        cache.add(MENU_VERSION_KEY, time.time_ns(), timeout=None)
+
+def get_menu_cache_key(request):
+    url = md5(request.build_absolute_uri().encode()).hexdigest()
+    return f'products:menu:{get_menu_version()}:{url}'
+
+def get_cached_menu(key):
+    return cache.get(key)
+
+def set_cached_menu(key, data):
+    cache.set(key, data, timeout=settings.MENU_CACHE_TIMEOUT)
@@ -2,6 +2,8 @@ from rest_framework import serializers
 
 from rest_framework.exceptions import ValidationError
 
+from config.serializers import ValuesSerializer
+
 from .models import Product
 
 class ProductCreateSerializer(serializers.ModelSerializer):
@@ -36,4 +38,9 @@ class ProductDetailSerializer(serializers.ModelSerializer):
             'created_by',
             'created_at',
             'updated_at',
-        ]
\ No newline at end of file
+        ]
+
+
+class ProductDetailValuesSerializer(ValuesSerializer):
+
+    serializer_class = ProductDetailSerializer
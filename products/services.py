@@ -2,6 +2,8 @@ from rest_framework.exceptions import ValidationError
 
 from accounts.models import User
 
+from .cache import bump_menu_version
+
 from .models import Product
 
 def activate_product(product: Product, user: User):
@@ -10,14 +12,18 @@ def activate_product(product: Product, user: User):
         raise ValidationError('Product is already activated')
 
     product.is_active = True
-    product.modified_by = user
+    product.modified_by_id = user.pk
     product.save()
 
+    bump_menu_version()
+
 def deactivate_product(product: Product, user: User):
 
     if not product.is_active:
         raise ValidationError('Product is already deactivated')
 
     product.is_active = False
-    product.modified_by = user
+    product.modified_by_id = user.pk
     product.save()
+
+    bump_menu_version()
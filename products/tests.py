@@ -1,5 +1,11 @@
+import json
+import time
+
+from datetime import timedelta
 from decimal import Decimal
 
+from unittest.mock import patch
+
 from rest_framework import status
 
 from django.urls import reverse
@@ -8,14 +14,24 @@ from rest_framework.test import APITestCase
 
 from django.contrib.auth import get_user_model
 
+from django.core.cache import cache
+
+from django.utils import timezone
+
+from django.utils.http import http_date
+
 from .models import Product
 
+from .views import ProductViewSet
+
 User = get_user_model()
 
 class ProductTest(APITestCase):
 
     def setUp(self):
 
+        cache.clear()
+
         self.admin_user = User.objects.create_user(
             email='testadmin@email.com',
             username='testadminuser',
@@ -249,6 +265,30 @@ class ProductTest(APITestCase):
         response = self.client.post(reverse('products-list'), product)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
     
+    def test_detail_returns_304_for_last_modified(self):
+
+        self.client.force_authenticate(self.user)
+        Product.objects.filter(pk=self.products[0].pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        url = reverse('products-detail', kwargs={'pk': self.products[0].pk})
+
+        response = self.client.get(url)
+        by_date = self.client.get(url, headers={'If-Modified-Since': response['Last-Modified']})
+
+        self.assertEqual(by_date.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_sends_no_last_modified_in_the_second_of_a_write(self):
+
+        self.client.force_authenticate(self.user)
+        Product.objects.filter(pk=self.products[0].pk).update(updated_at=timezone.now() + timedelta(seconds=5))
+        url = reverse('products-detail', kwargs={'pk': self.products[0].pk})
+
+        # Another write in the same second would keep the same HTTP date
+        response = self.client.get(url)
+        by_date = self.client.get(url, headers={'If-Modified-Since': http_date(time.time() + 5)})
+
+        self.assertNotIn('Last-Modified', response)
+        self.assertEqual(by_date.status_code, status.HTTP_200_OK)
+
     def test_active_products_endpoint_returns_only_active_products(self):
 
         self.client.force_authenticate(self.user)
@@ -256,7 +296,151 @@ class ProductTest(APITestCase):
         response = self.client.get(reverse('products-active'))
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertTrue(response.data[0]['is_active'])
-        self.assertEqual(response.data[0]['name'], 'chuleta de cerdo')
-        names = [p['name'] for p in response.data]
+        self.assertTrue(response.data['results'][0]['is_active'])
+        self.assertEqual(response.data['results'][0]['name'], 'chuleta de cerdo')
+        names = [p['name'] for p in response.data['results']]
         self.assertNotIn('coca cola 500 Ml', names)
+
+
+class ProductMenuCacheTest(APITestCase):
+
+    def setUp(self):
+
+        cache.clear()
+
+        self.admin_user = User.objects.create_user(
+            email='testadmin@email.com',
+            username='testadminuser',
+            password='testadminpassword',
+            is_staff=True,
+            is_superuser=True
+        )
+
+        self.client.force_authenticate(self.admin_user)
+
+        self.product = Product.objects.create(
+            name='chuleta de cerdo',
+            price=Decimal('10.000'),
+            created_by=self.admin_user
+        )
+
+    def get_menu_names(self, url_name):
+        response = self.client.get(reverse(url_name))
+        return [product['name'] for product in response.data['results']]
+
+    def assertMenuChangesAfter(self, mutate, url_name='products-list'):
+        before = self.get_menu_names(url_name)
+
+        mutate()
+
+        self.assertNotEqual(self.get_menu_names(url_name), before)
+
+    def test_values_serializer_output_is_identical_to_model_serializer(self):
+
+        Product.objects.create(name='coca cola 500 Ml', price=Decimal('7.5'), is_active=False)
+
+        for url_name in ['products-list', 'products-active']:
+            response = self.client.get(reverse(url_name))
+
+            cache.clear()
+
+            with patch.object(ProductViewSet, 'values_serializer_class', None):
+                baseline = self.client.get(reverse(url_name))
+
+            self.assertEqual(response.content, baseline.content)
+
+    def test_streamed_menu_is_not_cached(self):
+
+        self.client.get(reverse('products-list'), {'stream': 1})
+
+        Product.objects.create(name='consome de pollo', price=Decimal('8.000'))
+
+        response = self.client.get(reverse('products-list'), {'stream': 1})
+        products = json.loads(b''.join(response.streaming_content))
+
+        self.assertEqual([product['name'] for product in products], ['consome de pollo', 'chuleta de cerdo'])
+        self.assertEqual(products[1]['price'], '10.000')
+
+    def test_cache_hit_skips_database(self):
+
+        first_response = self.client.get(reverse('products-active'))
+
+        with self.assertNumQueries(0):
+            second_response = self.client.get(reverse('products-active'))
+
+        self.assertEqual(second_response.data, first_response.data)
+
+    def test_cache_is_keyed_on_query_string(self):
+
+        Product.objects.create(name='consome de pollo', price=Decimal('8.000'))
+
+        full_page = self.client.get(reverse('products-list'))
+        small_page = self.client.get(reverse('products-list') + '?page_size=1')
+
+        self.assertEqual(len(full_page.data['results']), 2)
+        self.assertEqual(len(small_page.data['results']), 1)
+
+    def test_create_invalidates_menu(self):
+
+        self.assertMenuChangesAfter(lambda: self.client.post(
+            reverse('products-list'),
+            {'name': 'consome de pollo', 'price': '8.000'}
+        ))
+
+    def test_update_invalidates_menu(self):
+
+        self.assertMenuChangesAfter(lambda: self.client.put(
+            reverse('products-detail', kwargs={'pk': self.product.pk}),
+            {'name': 'chuleta apanada', 'price': '12.000', 'is_active': True}
+        ))
+
+    def test_partial_update_invalidates_menu(self):
+
+        self.assertMenuChangesAfter(lambda: self.client.patch(
+            reverse('products-detail', kwargs={'pk': self.product.pk}),
+            {'name': 'chuleta apanada'}
+        ))
+
+    def test_destroy_invalidates_menu(self):
+
+        self.assertMenuChangesAfter(lambda: self.client.delete(
+            reverse('products-detail', kwargs={'pk': self.product.pk})
+        ))
+
+    def test_deactivate_invalidates_active_menu(self):
+
+        self.assertMenuChangesAfter(
+            lambda: self.client.post(reverse('products-deactivate', kwargs={'pk': self.product.pk})),
+            url_name='products-active'
+        )
+
+    def test_activate_invalidates_active_menu(self):
+
+        self.product.is_active = False
+        self.product.save()
+
+        self.assertMenuChangesAfter(
+            lambda: self.client.post(reverse('products-activate', kwargs={'pk': self.product.pk})),
+            url_name='products-active'
+        )
+
+    def test_menu_returns_304_without_queries_when_etag_matches(self):
+
+        response = self.client.get(reverse('products-active'))
+
+        with self.assertNumQueries(0):
+            not_modified = self.client.get(
+                reverse('products-active'),
+                headers={'If-None-Match': response['ETag']}
+            )
+
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.post(reverse('products-deactivate', kwargs={'pk': self.product.pk}))
+
+        modified = self.client.get(
+            reverse('products-active'),
+            headers={'If-None-Match': response['ETag']}
+        )
+
+        self.assertEqual(modified.status_code, status.HTTP_200_OK)
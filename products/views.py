@@ -1,3 +1,5 @@
+from functools import partial
+
 from rest_framework import status
 
 from rest_framework.decorators import action
@@ -7,14 +9,28 @@ from rest_framework.permissions import IsAuthenticated, IsAdminUser
 
 from rest_framework.viewsets import ModelViewSet
 
+from config.mixins import ConditionalGetMixin, ReplicaListMixin, StreamingListMixin, ValuesListMixin
+
+from config.routers import replica_reads
+
+from .cache import (
+    bump_menu_version,
+    get_cached_menu,
+    get_menu_cache_key,
+    get_menu_version,
+    set_cached_menu,
+)
+
 from .selectors import get_products, get_active_products
 
 from .services import activate_product, deactivate_product
 
-from .serializers import ProductCreateSerializer, ProductDetailSerializer
+from .serializers import ProductCreateSerializer, ProductDetailSerializer, ProductDetailValuesSerializer
+
 
+class ProductViewSet(ReplicaListMixin, ConditionalGetMixin, StreamingListMixin, ModelViewSet):
 
-class ProductViewSet(ModelViewSet):
+    values_serializer_class = ProductDetailValuesSerializer
 
     def get_queryset(self):
         return get_products()
@@ -37,7 +53,52 @@ class ProductViewSet(ModelViewSet):
         return [IsAuthenticated()]
 
     def perform_create(self, serializer):
-        serializer.save(created_by=self.request.user)
+        serializer.save(created_by_id=self.request.user.pk)
+        bump_menu_version()
+
+    def perform_update(self, serializer):
+        serializer.save()
+        bump_menu_version()
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        bump_menu_version()
+
+    def get_cached_menu_response(self, request, build_response):
+        key = get_menu_cache_key(request)
+        data = get_cached_menu(key)
+
+        if data is not None:
+            return Response(data, status=status.HTTP_200_OK)
+
+        # From the primary: a lagging replica read right after a bump would
+        # be cached under the new menu version until the next one
+        with replica_reads(False):
+            response = build_response()
+
+        if response.status_code == status.HTTP_200_OK:
+            set_cached_menu(key, response.data)
+
+        return response
+
+    def get_list_etag(self, request, queryset):
+        # The menu version changes on every product write, no probe query needed
+        return self.make_etag(request, f'menu:{get_menu_version()}')
+
+    def list(self, request, *args, **kwargs):
+        if self.is_streaming_request(request):
+            # Streamed bodies are not cached, so they read from the replica;
+            # the queryset keeps the database chosen here
+            with self.read_from_replica(request):
+                build_response = partial(self.get_streaming_response, self.get_streaming_queryset())
+        else:
+            build_response = partial(
+                self.get_cached_menu_response,
+                request,
+                partial(ValuesListMixin.list, self, request, *args, **kwargs)
+            )
+
+        return self.get_conditional_list_response(request, None, build_response)
 
     @action(methods=['POST'], detail=True)
     def activate(self, request, pk=None):
@@ -61,10 +122,13 @@ class ProductViewSet(ModelViewSet):
 
     @action(methods=['GET'], detail=False)
     def active(self, request):
-        products = get_active_products()
-
-        serializer = self.get_serializer(products, many=True)
-
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return self.get_conditional_list_response(
+            request,
+            None,
+            partial(self.get_cached_menu_response, request, self.get_active_response)
+        )
+
+    def get_active_response(self):
+        return self.get_list_response(get_active_products())
     
 
@@ -0,0 +1,60 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from django.utils import timezone
+
+from reports.models import DailySales, HourlySales, ProductDailySales
+
+from reports.selectors import get_paid_orders_period
+
+from reports.services import rebuild_sales
+
+
+class Command(BaseCommand):
+
+    help = (
+        'Recomputes the sales rollups from the paid orders, one transaction '
+        'per --chunk-days. Without --from / --to, every rollup is rebuilt.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', type=date.fromisoformat, help='First day, YYYY-MM-DD')
+        parser.add_argument('--to', dest='date_to', type=date.fromisoformat, help='Last day, YYYY-MM-DD')
+        parser.add_argument('--chunk-days', type=int, default=31)
+
+    def handle(self, *args, **options):
+        if options['chunk_days'] < 1:
+            raise CommandError('--chunk-days must be positive')
+
+        date_from, date_to = options['date_from'], options['date_to']
+
+        if date_from is None or date_to is None:
+            period = get_paid_orders_period()
+
+            if date_from is None and date_to is None:
+                # Also drops the rollups of days that have no paid orders left
+                for model in [DailySales, HourlySales, ProductDailySales]:
+                    model.objects.all().delete()
+
+            if period['first'] is None:
+                self.stdout.write(self.style.SUCCESS('No paid orders to roll up'))
+                return
+
+            date_from = date_from or timezone.localdate(period['first'])
+            date_to = date_to or timezone.localdate(period['last'])
+
+        if date_from > date_to:
+            raise CommandError('--from cannot be after --to')
+
+        chunk = timedelta(days=options['chunk_days'])
+        start = date_from
+
+        while start <= date_to:
+            end = min(start + chunk - timedelta(days=1), date_to)
+            rebuild_sales(start, end)
+            self.stdout.write(f'Rebuilt {start} to {end}', ending='\r')
+            start = end + timedelta(days=1)
+
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the sales rollups from {date_from} to {date_to}'))
@@ -0,0 +1,56 @@
+# Generated by Django 6.1.2 on 2026-10-18 19:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('item_count', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=3, default=0, max_digits=14)),
+                ('date', models.DateField(unique=True)),
+            ],
+            options={
+                'ordering': ['date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='HourlySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('item_count', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=3, default=0, max_digits=14)),
+                ('date', models.DateField()),
+                ('hour', models.PositiveSmallIntegerField()),
+            ],
+            options={
+                'ordering': ['date', 'hour'],
+                'constraints': [models.UniqueConstraint(fields=('date', 'hour'), name='unique_hourly_sales')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductDailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('product_name', models.CharField(max_length=100)),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=3, default=0, max_digits=14)),
+            ],
+            options={
+                'ordering': ['date', 'product_name'],
+                'constraints': [models.UniqueConstraint(fields=('date', 'product_name'), name='unique_product_daily_sales')],
+            },
+        ),
+    ]
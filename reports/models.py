@@ -0,0 +1,67 @@
+from django.db import models
+
+
+class SalesRollup(models.Model):
+
+    """
+    Sales of paid orders, added to by the payment itself (see
+    reports.services.record_sales) and recomputed by rebuild_sales_rollups.
+    Dates and hours are in TIME_ZONE, at the time of payment.
+    """
+
+    order_count = models.PositiveIntegerField(default=0)
+    item_count = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(
+        max_digits=14,
+        decimal_places=3,
+        default=0
+    )
+
+    class Meta:
+        abstract = True
+
+
+class DailySales(SalesRollup):
+
+    date = models.DateField(unique=True)
+
+    class Meta:
+        ordering = ['date']
+
+
+class HourlySales(SalesRollup):
+
+    date = models.DateField()
+    hour = models.PositiveSmallIntegerField()
+
+    class Meta:
+        ordering = ['date', 'hour']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'hour'],
+                name='unique_hourly_sales'
+            ),
+        ]
+
+
+class ProductDailySales(models.Model):
+
+    # Keyed by the name order items keep, so sales of deleted or renamed
+    # products stay as they were sold
+    date = models.DateField()
+    product_name = models.CharField(max_length=100)
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(
+        max_digits=14,
+        decimal_places=3,
+        default=0
+    )
+
+    class Meta:
+        ordering = ['date', 'product_name']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'product_name'],
+                name='unique_product_daily_sales'
+            ),
+        ]
@@ -0,0 +1,98 @@
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Max, Min, Sum
+
+from django.db.models.functions import TruncHour
+
+from archive.models import ArchivedOrder, ArchivedOrderItem
+
+from order_items.models import OrderItem
+
+from orders.models import Order, OrderStatus
+
+from .models import DailySales, HourlySales, ProductDailySales
+
+REVENUE = Sum(
+    ExpressionWrapper(F('quantity') * F('unit_price'), output_field=DecimalField(max_digits=14, decimal_places=3))
+)
+
+def get_sales_of_orders(order_ids):
+    return OrderItem.objects.filter(
+        order_id__in=order_ids
+    ).values(
+        'product_name'
+    ).annotate(
+        # Before `quantity` shadows the field REVENUE multiplies
+        revenue=REVENUE,
+        quantity=Sum('quantity'),
+    ).order_by()
+
+def get_paid_orders_by_hour(start, end):
+    # Archived orders stay in the reports
+    return paid_orders_by_hour(Order, start, end).union(
+        paid_orders_by_hour(ArchivedOrder, start, end),
+        all=True
+    ).order_by()
+
+def paid_orders_by_hour(model, start, end):
+    return model.objects.filter(
+        status=OrderStatus.PAID,
+        paid_at__gte=start,
+        paid_at__lt=end,
+    ).values(
+        hour=TruncHour('paid_at')
+    ).annotate(
+        order_count=Count('id')
+    ).order_by()
+
+def get_paid_items_by_hour(start, end):
+    return paid_items_by_hour(OrderItem, start, end).union(
+        paid_items_by_hour(ArchivedOrderItem, start, end),
+        all=True
+    ).order_by()
+
+def paid_items_by_hour(model, start, end):
+    return model.objects.filter(
+        order__status=OrderStatus.PAID,
+        order__paid_at__gte=start,
+        order__paid_at__lt=end,
+    ).values(
+        'product_name',
+        hour=TruncHour('order__paid_at'),
+    ).annotate(
+        # Before `quantity` shadows the field REVENUE multiplies
+        revenue=REVENUE,
+        quantity=Sum('quantity'),
+    ).order_by()
+
+def get_paid_orders_period():
+    periods = [
+        model.objects.filter(
+            status=OrderStatus.PAID
+        ).aggregate(
+            first=Min('paid_at'),
+            last=Max('paid_at'),
+        )
+        for model in [Order, ArchivedOrder]
+    ]
+    firsts = [period['first'] for period in periods if period['first'] is not None]
+    lasts = [period['last'] for period in periods if period['last'] is not None]
+
+    return {
+        'first': min(firsts, default=None),
+        'last': max(lasts, default=None),
+    }
+
+def get_daily_sales(date_from, date_to):
+    return DailySales.objects.filter(date__range=(date_from, date_to))
+
+def get_hourly_sales(date_from, date_to):
+    return HourlySales.objects.filter(date__range=(date_from, date_to))
+
+def get_product_sales(date_from, date_to):
+    return ProductDailySales.objects.filter(
+        date__range=(date_from, date_to)
+    ).values(
+        'product_name'
+    ).annotate(
+        quantity=Sum('quantity'),
+        revenue=Sum('revenue'),
+    ).order_by('-revenue', 'product_name')
@@ -0,0 +1,54 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from rest_framework import serializers
+
+from .models import DailySales, HourlySales
+
+SALES_REPORT_DEFAULT_DAYS = 30
+
+
+class SalesQuerySerializer(serializers.Serializer):
+
+    # Both dates included, the last 30 days by default
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+
+    def validate(self, data):
+        date_to = data.get('date_to') or timezone.localdate()
+        date_from = data.get('date_from') or date_to - timedelta(days=SALES_REPORT_DEFAULT_DAYS - 1)
+
+        if date_from > date_to:
+            raise serializers.ValidationError('date_from cannot be after date_to')
+
+        return {'date_from': date_from, 'date_to': date_to}
+
+class DailySalesSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = DailySales
+        fields = [
+            'date',
+            'order_count',
+            'item_count',
+            'revenue',
+        ]
+
+class HourlySalesSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = HourlySales
+        fields = [
+            'date',
+            'hour',
+            'order_count',
+            'item_count',
+            'revenue',
+        ]
+
+class ProductSalesSerializer(serializers.Serializer):
+
+    product_name = serializers.CharField()
+    quantity = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=3)
@@ -0,0 +1,139 @@
+import operator
+
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from functools import reduce
+
+from django.db import IntegrityError, transaction
+
+from django.db.models import F, Q
+
+from django.utils import timezone
+
+from .models import DailySales, HourlySales, ProductDailySales
+
+from .selectors import get_paid_items_by_hour, get_paid_orders_by_hour, get_sales_of_orders
+
+
+def record_sales(order_ids, paid_at):
+    """
+    Adds orders that were just paid to the sales rollups. Runs inside the
+    payment's transaction, so the rollups always agree with the orders.
+    """
+    sales = list(get_sales_of_orders(order_ids))
+    paid_at = timezone.localtime(paid_at)
+    date = paid_at.date()
+
+    totals = {
+        'order_count': len(order_ids),
+        'item_count': sum(sale['quantity'] for sale in sales),
+        'revenue': sum((sale['revenue'] for sale in sales), Decimal(0)),
+    }
+
+    add_to_rollups([
+        (DailySales, ['date'], {(date,): totals}),
+        (HourlySales, ['date', 'hour'], {(date, paid_at.hour): totals}),
+        (
+            ProductDailySales,
+            ['date', 'product_name'],
+            {
+                (date, sale['product_name']): {'quantity': sale['quantity'], 'revenue': sale['revenue']}
+                for sale in sales
+            }
+        ),
+    ])
+
+
+def add_to_rollups(rollups):
+    """
+    Adds amounts to rollup rows, creating the missing ones. Takes
+    (model, key fields, {key: {field: amount}}) triples.
+    """
+    try:
+        write_rollups(rollups)
+    except IntegrityError:
+        # A concurrent payment created one of the rows, add to it instead
+        write_rollups(rollups)
+
+
+@transaction.atomic
+def write_rollups(rollups):
+
+    for model, key_fields, amounts in rollups:
+        if not amounts:
+            continue
+
+        keys = reduce(operator.or_, (Q(**dict(zip(key_fields, key))) for key in amounts))
+
+        existing_rows = {
+            tuple(getattr(row, field) for field in key_fields): row
+            for row in model.objects.filter(keys).select_for_update()
+        }
+
+        new_rows = []
+
+        for key, values in amounts.items():
+            row = existing_rows.get(key)
+
+            if row is None:
+                new_rows.append(model(**dict(zip(key_fields, key)), **values))
+                continue
+
+            for field, amount in values.items():
+                setattr(row, field, F(field) + amount)
+
+        if existing_rows:
+            model.objects.bulk_update(existing_rows.values(), list(next(iter(amounts.values()))))
+
+        if new_rows:
+            model.objects.bulk_create(new_rows)
+
+
+def get_day_start(date):
+    return timezone.make_aware(datetime.combine(date, time.min))
+
+
+@transaction.atomic
+def rebuild_sales(date_from, date_to):
+    """
+    Recomputes the rollups of the days from date_from to date_to, both
+    included, from the paid orders.
+    """
+    for model in [DailySales, HourlySales, ProductDailySales]:
+        model.objects.filter(date__range=(date_from, date_to)).delete()
+
+    start = get_day_start(date_from)
+    end = get_day_start(date_to + timedelta(days=1))
+
+    empty_totals = lambda: {'order_count': 0, 'item_count': 0, 'revenue': Decimal(0)}
+    daily = defaultdict(empty_totals)
+    hourly = defaultdict(empty_totals)
+    products = defaultdict(lambda: {'quantity': 0, 'revenue': Decimal(0)})
+
+    for row in get_paid_orders_by_hour(start, end):
+        hour = timezone.localtime(row['hour'])
+
+        daily[hour.date()]['order_count'] += row['order_count']
+        hourly[(hour.date(), hour.hour)]['order_count'] += row['order_count']
+
+    for row in get_paid_items_by_hour(start, end):
+        hour = timezone.localtime(row['hour'])
+
+        for totals in [daily[hour.date()], hourly[(hour.date(), hour.hour)]]:
+            totals['item_count'] += row['quantity']
+            totals['revenue'] += row['revenue']
+
+        product = products[(hour.date(), row['product_name'])]
+        product['quantity'] += row['quantity']
+        product['revenue'] += row['revenue']
+
+    DailySales.objects.bulk_create(
+        DailySales(date=date, **totals) for date, totals in daily.items()
+    )
+    HourlySales.objects.bulk_create(
+        HourlySales(date=date, hour=hour, **totals) for (date, hour), totals in hourly.items()
+    )
+    ProductDailySales.objects.bulk_create(
+        ProductDailySales(date=date, product_name=name, **totals) for (date, name), totals in products.items()
+    )
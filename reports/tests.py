@@ -0,0 +1,188 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from asgiref.sync import async_to_sync
+
+from rest_framework import status
+
+from django.contrib.auth import get_user_model
+
+from django.core.management import call_command
+
+from django.urls import reverse
+
+from django.utils import timezone
+
+from rest_framework.test import APITestCase
+
+from order_items.services import create_order_item
+
+from orders.models import Order, OrderStatus
+
+from orders.services import apay_order, change_orders_status, pay_order
+
+from products.models import Product
+
+from tables.models import Table
+
+from .models import DailySales, HourlySales, ProductDailySales
+
+User = get_user_model()
+
+
+class SalesRollupTest(APITestCase):
+
+    def setUp(self):
+
+        self.admin_user = User.objects.create_user(
+            email='testadmin@email.com',
+            username='testadminuser',
+            password='testadminpassword',
+            is_staff=True,
+            is_superuser=True
+        )
+
+        self.client.force_authenticate(self.admin_user)
+
+        self.steak = Product.objects.create(name='chuleta de cerdo', price=Decimal('10.000'))
+        self.salad = Product.objects.create(name='ensalada', price=Decimal('4.500'))
+
+    def create_delivered_order(self, number, lines):
+
+        order = Order.objects.create(
+            table=Table.objects.create(number=number, capacity=4),
+            created_by=self.admin_user
+        )
+
+        for product, quantity in lines:
+            create_order_item(order, product, quantity)
+
+        Order.objects.filter(pk=order.pk).update(status=OrderStatus.DELIVERED)
+        order.refresh_from_db()
+
+        return order
+
+    def get_rollups(self):
+
+        return {
+            'daily': list(DailySales.objects.values('date', 'order_count', 'item_count', 'revenue')),
+            'hourly': list(HourlySales.objects.values('date', 'hour', 'order_count', 'item_count', 'revenue')),
+            'products': list(ProductDailySales.objects.values('date', 'product_name', 'quantity', 'revenue')),
+        }
+
+    def test_paying_adds_the_order_to_the_rollups(self):
+
+        pay_order(self.create_delivered_order(1, [(self.steak, 2), (self.salad, 1)]))
+        order = self.create_delivered_order(2, [(self.steak, 1)])
+        pay_order(order)
+
+        paid_at = timezone.localtime(order.paid_at)
+        daily = DailySales.objects.get()
+
+        self.assertEqual(daily.date, paid_at.date())
+        self.assertEqual(daily.order_count, 2)
+        self.assertEqual(daily.item_count, 4)
+        self.assertEqual(daily.revenue, Decimal('34.500'))
+        self.assertEqual(HourlySales.objects.get(hour=paid_at.hour).revenue, Decimal('34.500'))
+        self.assertEqual(
+            list(ProductDailySales.objects.values_list('product_name', 'quantity', 'revenue')),
+            [('chuleta de cerdo', 3, Decimal('30.000')), ('ensalada', 1, Decimal('4.500'))]
+        )
+
+    def test_async_pay_and_bulk_transition_add_to_the_rollups(self):
+
+        async_to_sync(apay_order)(self.create_delivered_order(1, [(self.steak, 1)]))
+
+        orders = [
+            self.create_delivered_order(number, [(self.salad, 2)])
+            for number in [2, 3]
+        ]
+        change_orders_status([order.pk for order in orders], OrderStatus.PAID)
+
+        daily = DailySales.objects.get()
+
+        self.assertEqual(daily.order_count, 3)
+        self.assertEqual(daily.item_count, 5)
+        self.assertEqual(daily.revenue, Decimal('28.000'))
+
+    def test_failed_payment_leaves_the_rollups_unchanged(self):
+
+        order = self.create_delivered_order(1, [(self.steak, 1)])
+        Order.objects.filter(pk=order.pk).update(status=OrderStatus.PAID)
+
+        response = self.client.post(reverse('orders-pay', kwargs={'pk': order.pk}))
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(DailySales.objects.exists())
+
+    def test_rebuild_matches_the_incremental_rollups(self):
+
+        for number in range(1, 4):
+            pay_order(self.create_delivered_order(number, [(self.steak, number), (self.salad, 1)]))
+
+        incremental = self.get_rollups()
+
+        # A stale row of a day without paid orders goes away too
+        DailySales.objects.create(date=timezone.localdate() - timedelta(days=400), order_count=1)
+        DailySales.objects.update(revenue=0)
+
+        call_command('rebuild_sales_rollups', '--chunk-days', '1', stdout=StringIO())
+
+        self.assertEqual(self.get_rollups(), incremental)
+
+    def test_rebuild_keeps_orders_edited_after_payment_on_their_payment_day(self):
+
+        pay_order(self.create_delivered_order(1, [(self.steak, 2)]))
+        incremental = self.get_rollups()
+
+        # Any later save of the closed order moves updated_at
+        Order.objects.update(updated_at=timezone.now() + timedelta(days=2))
+
+        call_command('rebuild_sales_rollups', stdout=StringIO())
+
+        self.assertEqual(self.get_rollups(), incremental)
+
+    def test_sales_report_reads_the_rollups(self):
+
+        today = timezone.localdate()
+        pay_order(self.create_delivered_order(1, [(self.steak, 2), (self.salad, 2)]))
+        DailySales.objects.create(date=today - timedelta(days=1), order_count=1, item_count=1, revenue=10)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('sales-list'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([day['date'] for day in response.data['results']], [str(today - timedelta(days=1)), str(today)])
+        self.assertEqual(response.data['totals']['order_count'], 2)
+        self.assertEqual(response.data['totals']['revenue'], '39.000')
+
+        response = self.client.get(reverse('sales-products'), {'date_from': str(today), 'date_to': str(today)})
+
+        self.assertEqual(
+            [(product['product_name'], product['revenue']) for product in response.data['results']],
+            [('chuleta de cerdo', '20.000'), ('ensalada', '9.000')]
+        )
+
+        response = self.client.get(reverse('sales-hourly'), {'date_from': str(today)})
+
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_sales_report_is_restricted_to_admins(self):
+
+        waiter = User.objects.create_user(
+            email='testuser@email.com',
+            username='testuser',
+            password='testuserpassword',
+        )
+        self.client.force_authenticate(waiter)
+
+        response = self.client.get(reverse('sales-list'))
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_sales_report_rejects_reversed_dates(self):
+
+        response = self.client.get(reverse('sales-list'), {'date_from': '2026-02-01', 'date_to': '2026-01-01'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
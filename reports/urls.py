@@ -0,0 +1,8 @@
+from rest_framework.routers import DefaultRouter
+
+from .views import SalesReportViewSet
+
+router = DefaultRouter()
+router.register('sales', SalesReportViewSet, basename='sales')
+
+urlpatterns = router.urls
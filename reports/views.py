@@ -0,0 +1,67 @@
+from decimal import Decimal
+
+from rest_framework.decorators import action
+
+from rest_framework.permissions import IsAuthenticated
+
+from rest_framework.response import Response
+
+from rest_framework.viewsets import ViewSet
+
+from orders.permissions import IsRestaurantAdmin
+
+from .selectors import get_daily_sales, get_hourly_sales, get_product_sales
+
+from .serializers import (
+    DailySalesSerializer,
+    HourlySalesSerializer,
+    ProductSalesSerializer,
+    SalesQuerySerializer,
+)
+
+
+class SalesReportViewSet(ViewSet):
+
+    """
+    Sales of paid orders between ?date_from and ?date_to, read from the
+    rollup tables only.
+    """
+
+    permission_classes = [IsAuthenticated, IsRestaurantAdmin]
+
+    def get_dates(self, request):
+        serializer = SalesQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data['date_from'], serializer.validated_data['date_to']
+
+    def get_response(self, date_from, date_to, results):
+        return Response({
+            'date_from': date_from,
+            'date_to': date_to,
+            'results': results,
+        })
+
+    def list(self, request):
+        date_from, date_to = self.get_dates(request)
+        days = DailySalesSerializer(get_daily_sales(date_from, date_to), many=True).data
+
+        response = self.get_response(date_from, date_to, days)
+        response.data['totals'] = {
+            'order_count': sum(day['order_count'] for day in days),
+            'item_count': sum(day['item_count'] for day in days),
+            'revenue': str(sum((Decimal(day['revenue']) for day in days), Decimal('0.000'))),
+        }
+
+        return response
+
+    @action(detail=False, methods=['GET'])
+    def hourly(self, request):
+        date_from, date_to = self.get_dates(request)
+        hours = get_hourly_sales(date_from, date_to)
+        return self.get_response(date_from, date_to, HourlySalesSerializer(hours, many=True).data)
+
+    @action(detail=False, methods=['GET'])
+    def products(self, request):
+        date_from, date_to = self.get_dates(request)
+        products = get_product_sales(date_from, date_to)
+        return self.get_response(date_from, date_to, ProductSalesSerializer(products, many=True).data)
@@ -1,4 +1,6 @@
-from django.db.models import Exists, OuterRef
+from django.db.models import Exists, F, OuterRef, Subquery
+
+from django.db.models.lookups import Lookup
 
 from orders.models import Order
 
@@ -6,22 +8,63 @@ from .models import Table
 
 FINAL_STATUSES = ['PAID', 'CANCELLED']
 
+
+class NotInLiterals(Lookup):
+
+    """
+    NOT (lhs IN (...)) with the string values inlined instead of bound: SQLite
+    only uses a partial index when the query repeats its predicate literally.
+    """
+
+    prepare_rhs = False
+
+    def as_sql(self, compiler, connection):
+        lhs, params = self.process_lhs(compiler, connection)
+        values = ', '.join("'{}'".format(value.replace("'", "''")) for value in self.rhs)
+        return f'NOT ({lhs} IN ({values}))', params
+
+
+def get_active_orders():
+    # The predicate of unique_active_order_per_table, so reads go through
+    # that partial index
+    return Order.objects.filter(
+        NotInLiterals(F('status'), FINAL_STATUSES)
+    ).order_by()
+
+def get_active_orders_subquery():
+    return get_active_orders().filter(
+        table=OuterRef('pk')
+    )
+
 def get_tables():
-    return Table.objects.all()
+    return Table.objects.annotate(
+        active_order_exists=Exists(get_active_orders_subquery())
+    )
 
 def get_active_tables():
     return Table.objects.all(is_active=True)
 
 def get_available_tables():
-    
-    active_orders = Order.objects.filter(
-        table=OuterRef('pk')
-    ).exclude(
-        status__in=FINAL_STATUSES
-    )
 
-    return Table.objects.filter(
-        is_active=True
-    ).exclude(
-        Exists(active_orders)
+    return get_tables().filter(
+        is_active=True,
+        active_order_exists=False
     )
+
+def get_floor():
+    # unique_active_order_per_table allows one active order per table, and
+    # each column is looked up through that partial index
+    active_order = get_active_orders_subquery()
+
+    return Table.objects.values(
+        'id',
+        'number',
+        'capacity',
+        'is_active',
+    ).annotate(
+        order_id=Subquery(active_order.values('id')[:1]),
+        order_status=Subquery(active_order.values('status')[:1]),
+        seated_at=Subquery(active_order.values('created_at')[:1]),
+        item_count=Subquery(active_order.values('item_count')[:1]),
+        total=Subquery(active_order.values('total')[:1]),
+    ).order_by('number')
@@ -1,5 +1,7 @@
 from rest_framework import serializers
 
+from config.serializers import ValuesField, ValuesSerializer
+
 from .models import Table
 
 class TableCreateSerializer(serializers.ModelSerializer):
@@ -15,7 +17,7 @@ class TableDetailSerializer(serializers.ModelSerializer):
 
     number = serializers.ReadOnlyField()
     capacity = serializers.ReadOnlyField()
-    has_active_order = serializers.ReadOnlyField()
+    has_active_order = serializers.SerializerMethodField()
     created_at = serializers.ReadOnlyField()
     updated_at = serializers.ReadOnlyField()
     is_active = serializers.ReadOnlyField()
@@ -31,6 +33,12 @@ class TableDetailSerializer(serializers.ModelSerializer):
             'is_active',
         ]
 
+    def get_has_active_order(self, obj):
+        annotated = getattr(obj, 'active_order_exists', None)
+        if annotated is not None:
+            return annotated
+        return obj.has_active_order
+
 class TableUpdateSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -38,4 +46,33 @@ class TableUpdateSerializer(serializers.ModelSerializer):
         fields = [
             'capacity',
             'is_active'
-        ]
\ No newline at end of file
+        ]
+
+
+class TableDetailValuesSerializer(ValuesSerializer):
+
+    serializer_class = TableDetailSerializer
+
+    has_active_order = ValuesField('active_order_exists')
+
+
+class FloorOrderSerializer(serializers.Serializer):
+
+    id = serializers.IntegerField(source='order_id')
+    status = serializers.CharField(source='order_status')
+    seated_at = serializers.DateTimeField()
+    item_count = serializers.IntegerField()
+    total = serializers.DecimalField(max_digits=12, decimal_places=3)
+
+class FloorTableSerializer(serializers.Serializer):
+
+    id = serializers.IntegerField()
+    number = serializers.IntegerField()
+    capacity = serializers.IntegerField()
+    is_active = serializers.BooleanField()
+    active_order = serializers.SerializerMethodField()
+
+    def get_active_order(self, row):
+        if row['order_id'] is None:
+            return None
+        return FloorOrderSerializer(row).data
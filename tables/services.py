@@ -10,7 +10,7 @@ def activate_table(table: Table, user: User):
         raise ValidationError(f'Table is already activated')
 
     table.is_active = True
-    table.modified_by = user
+    table.modified_by_id = user.pk
     table.save()
 
 def deactivate_table(table: Table, user: User):
@@ -22,7 +22,7 @@ def deactivate_table(table: Table, user: User):
         raise ValidationError(f'Cannot deactivate a table with active orders')
 
     table.is_active = False
-    table.modified_by = user
+    table.modified_by_id = user.pk
     table.save()
 
 
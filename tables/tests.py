@@ -1,15 +1,38 @@
+import time
+
+from datetime import timedelta
+from decimal import Decimal
+
+from unittest.mock import patch
+
 from rest_framework import status
 
 from django.urls import reverse
 
 from django.contrib.auth import get_user_model
 
+from django.core.exceptions import ImproperlyConfigured
+
+from django.utils import timezone
+
+from django.utils.http import http_date
+
 from rest_framework.test import APITestCase
 
-from orders.models import Order
+from order_items.services import create_order_item
+
+from orders.models import Order, OrderStatus
+
+from products.models import Product
+
+from config.serializers import ValuesSerializer
 
 from .models import Table
 
+from .serializers import TableDetailSerializer
+
+from .views import TableViewSet
+
 
 User = get_user_model()
 
@@ -233,9 +256,9 @@ class TableTest(APITestCase):
         response = self.client.get(reverse('tables-available'))
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['number'], 11)
-        self.assertTrue(response.data[0]['is_active'])
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['number'], 11)
+        self.assertTrue(response.data['results'][0]['is_active'])
     
     def test_table_has_active_order_returns_true(self):
 
@@ -278,4 +301,272 @@ class TableTest(APITestCase):
         
         table.refresh_from_db()
 
-        self.assertEqual(table.modified_by, self.admin_user)
\ No newline at end of file
+        self.assertEqual(table.modified_by, self.admin_user)
+
+class TableQueryCountTest(APITestCase):
+
+    def setUp(self):
+
+        self.admin_user = User.objects.create_user(
+            email='testadmin@email.com',
+            username='testadminuser',
+            password='testadminpassword',
+            is_staff=True,
+            is_superuser=True
+        )
+
+        self.client.force_authenticate(self.admin_user)
+
+        self.create_tables(start=1, count=5)
+
+    def create_tables(self, start, count):
+
+        for number in range(start, start + count):
+            table = Table.objects.create(number=number, capacity=4)
+
+            if number % 2 == 0:
+                Order.objects.create(table=table, created_by=self.admin_user)
+
+    # Reads cost the two ETag probe queries plus the query for the rows
+    def test_list_tables_query_count_does_not_grow_with_tables(self):
+
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('tables-list'))
+
+        self.assertEqual(len(response.data['results']), 5)
+
+        self.create_tables(start=100, count=20)
+
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('tables-list'))
+
+        self.assertEqual(len(response.data['results']), 25)
+
+    def test_list_available_tables_query_count_does_not_grow_with_tables(self):
+
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('tables-available'))
+
+        self.assertEqual(len(response.data['results']), 3)
+
+        self.create_tables(start=100, count=20)
+
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('tables-available'))
+
+        self.assertEqual(len(response.data['results']), 13)
+
+    def test_list_tables_returns_has_active_order_from_queryset(self):
+
+        response = self.client.get(reverse('tables-list'))
+
+        has_active_order = {
+            table['number']: table['has_active_order'] for table in response.data['results']
+        }
+
+        self.assertEqual(
+            has_active_order,
+            {1: False, 2: True, 3: False, 4: True, 5: False}
+        )
+
+    def test_values_serializer_output_is_identical_to_model_serializer(self):
+
+        for url_name in ['tables-list', 'tables-available']:
+            response = self.client.get(reverse(url_name), {'page_size': 2})
+
+            with patch.object(TableViewSet, 'values_serializer_class', None):
+                baseline = self.client.get(reverse(url_name), {'page_size': 2})
+
+            self.assertEqual(response.content, baseline.content)
+            self.assertIsNotNone(response.data['next'])
+
+    def test_values_serializer_requires_method_fields_to_be_declared(self):
+
+        class IncompleteSerializer(ValuesSerializer):
+            serializer_class = TableDetailSerializer
+
+        with self.assertRaises(ImproperlyConfigured):
+            IncompleteSerializer.get_plan()
+
+    def test_retrieve_table_query_count(self):
+
+        table = Table.objects.get(number=2)
+
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('tables-detail', kwargs={'pk': table.pk}))
+
+        self.assertTrue(response.data['has_active_order'])
+
+    def test_create_table_query_count(self):
+
+        with self.assertNumQueries(2):
+            response = self.client.post(reverse('tables-list'), {'number': 50, 'capacity': 2})
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_update_table_query_count(self):
+
+        table = Table.objects.get(number=1)
+
+        with self.assertNumQueries(2):
+            response = self.client.patch(
+                reverse('tables-detail', kwargs={'pk': table.pk}),
+                {'capacity': 8}
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_activate_table_query_count(self):
+
+        table = Table.objects.create(number=60, capacity=2, is_active=False)
+
+        with self.assertNumQueries(2):
+            response = self.client.post(reverse('tables-activate', kwargs={'pk': table.pk}))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['has_active_order'])
+
+    def test_deactivate_table_query_count(self):
+
+        table = Table.objects.get(number=1)
+
+        with self.assertNumQueries(3):
+            response = self.client.post(reverse('tables-deactivate', kwargs={'pk': table.pk}))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_destroy_table_query_count(self):
+
+        table = Table.objects.get(number=1)
+
+        # The delete also cascades to the table's archived orders
+        with self.assertNumQueries(4):
+            response = self.client.delete(reverse('tables-detail', kwargs={'pk': table.pk}))
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_detail_if_modified_since_sees_a_new_active_order(self):
+
+        table = Table.objects.get(number=1)
+        Table.objects.filter(pk=table.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        url = reverse('tables-detail', kwargs={'pk': table.pk})
+
+        response = self.client.get(url)
+
+        Order.objects.create(table=table, created_by=self.admin_user)
+
+        modified = self.client.get(url, headers={'If-Modified-Since': http_date(time.time())})
+
+        self.assertFalse(response.data['has_active_order'])
+        self.assertEqual(modified.status_code, status.HTTP_200_OK)
+        self.assertTrue(modified.data['has_active_order'])
+
+    def test_list_etag_changes_when_an_order_is_created(self):
+
+        response = self.client.get(reverse('tables-available'))
+
+        Order.objects.create(table=Table.objects.get(number=1), created_by=self.admin_user)
+
+        modified = self.client.get(
+            reverse('tables-available'),
+            headers={'If-None-Match': response['ETag']}
+        )
+
+        self.assertEqual(modified.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(modified.data['results']), 2)
+
+        not_modified = self.client.get(
+            reverse('tables-available'),
+            headers={'If-None-Match': modified['ETag']}
+        )
+
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+class TableFloorTest(APITestCase):
+
+    def setUp(self):
+
+        self.user = User.objects.create_user(
+            email='testuser@email.com',
+            username='testuser',
+            password='testuserpassword',
+        )
+
+        self.client.force_authenticate(self.user)
+
+        self.tables = [Table.objects.create(number=number, capacity=4) for number in [1, 2, 3]]
+        self.product = Product.objects.create(name='chuleta de cerdo', price=Decimal('10.000'))
+
+        Order.objects.create(table=self.tables[0], created_by=self.user, status=OrderStatus.PAID)
+        self.order = Order.objects.create(table=self.tables[0], created_by=self.user)
+        create_order_item(self.order, self.product, 2)
+
+        Order.objects.create(table=self.tables[1], created_by=self.user, status=OrderStatus.CANCELLED)
+
+    # The two ETag probe queries plus the snapshot
+    def test_floor_returns_every_table_with_its_active_order(self):
+
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('tables-floor'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([table['number'] for table in response.data], [1, 2, 3])
+
+        self.order.refresh_from_db()
+
+        self.assertEqual(
+            response.data[0]['active_order'],
+            {
+                'id': self.order.pk,
+                'status': OrderStatus.CREATED,
+                'seated_at': self.order.created_at.isoformat().replace('+00:00', 'Z'),
+                'item_count': 2,
+                'total': '20.000',
+            }
+        )
+        self.assertIsNone(response.data[1]['active_order'])
+        self.assertIsNone(response.data[2]['active_order'])
+
+        Table.objects.create(number=4, capacity=2)
+
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('tables-floor'))
+
+        self.assertEqual(len(response.data), 4)
+
+    def test_floor_supports_conditional_get(self):
+
+        etag = self.client.get(reverse('tables-floor'))['ETag']
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('tables-floor'), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        create_order_item(self.order, self.product, 1)
+
+        response = self.client.get(reverse('tables-floor'), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['active_order']['item_count'], 3)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_floor_requires_authentication(self):
+
+        self.client.force_authenticate(None)
+
+        response = self.client.get(reverse('tables-floor'))
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_floor_etag_changes_when_an_order_is_paid(self):
+
+        etag = self.client.get(reverse('tables-floor'))['ETag']
+
+        Order.objects.filter(pk=self.order.pk).update(status=OrderStatus.PAID)
+
+        response = self.client.get(reverse('tables-floor'), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data[0]['active_order'])
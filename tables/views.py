@@ -1,3 +1,7 @@
+from functools import partial
+
+from django.utils.cache import get_conditional_response
+
 from rest_framework import status
 
 from rest_framework.decorators import action
@@ -8,18 +12,34 @@ from rest_framework.response import Response
 
 from rest_framework.viewsets import ModelViewSet
 
-from .selectors import get_tables, get_available_tables
+from config.mixins import ConditionalGetMixin, ReplicaListMixin, ValuesListMixin
+
+from .models import Table
+
+from .selectors import get_active_orders, get_available_tables, get_floor, get_tables
 
-from .serializers import TableDetailSerializer, TableCreateSerializer, TableUpdateSerializer
+from .serializers import (
+    FloorTableSerializer,
+    TableCreateSerializer,
+    TableDetailSerializer,
+    TableDetailValuesSerializer,
+    TableUpdateSerializer,
+)
 
 from .services import activate_table, deactivate_table
 
 
-class TableViewSet(ModelViewSet):
+class TableViewSet(ReplicaListMixin, ConditionalGetMixin, ValuesListMixin, ModelViewSet):
+
+    values_serializer_class = TableDetailValuesSerializer
 
     def get_queryset(self):
         return get_tables()
 
+    def get_conditional_dependencies(self):
+        # has_active_order only changes with the active orders
+        return [get_active_orders()]
+
     def get_serializer_class(self):
         if self.action == 'create':
             return TableCreateSerializer
@@ -28,7 +48,7 @@ class TableViewSet(ModelViewSet):
         return TableDetailSerializer
 
     def get_permissions(self):
-        if self.action in ['list', 'retrieve', 'available']: 
+        if self.action in ['list', 'retrieve', 'available', 'floor']:
             return [IsAuthenticated()]
         return [IsAuthenticated(), IsAdminUser()]
 
@@ -49,5 +69,36 @@ class TableViewSet(ModelViewSet):
     @action(detail=False, methods=['GET'])
     def available(self, request):
         available_tables = get_available_tables()
-        serializer = self.get_serializer(available_tables, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+
+        with self.read_from_replica(request):
+            return self.get_conditional_list_response(
+                request,
+                available_tables,
+                partial(self.get_available_response, available_tables)
+            )
+
+    def get_available_response(self, available_tables):
+        return self.get_list_response(available_tables)
+
+    @action(detail=False, methods=['GET'])
+    def floor(self, request):
+        """
+        Every table with its active order. The ETag comes from probes of the
+        tables and of the active orders, both cheap, so polling clients get
+        a 304 before the snapshot is read.
+        """
+        with self.read_from_replica(request):
+            etag = self.make_etag(
+                request,
+                f'{self.get_probe(Table.objects.all())}:{self.get_probe(get_active_orders())}'
+            )
+            not_modified = get_conditional_response(request, etag=etag)
+
+            if not_modified is not None:
+                return not_modified
+
+            response = Response(FloorTableSerializer(get_floor(), many=True).data)
+
+        response['ETag'] = etag
+
+        return response